@@ -35,6 +35,50 @@ def crossover_uniforme(pai1_bin, pai2_bin, taxa_crossover=1.0):
     filho2 = np.where(mask, pai2_bin, pai1_bin)
     return filho1, filho2
 
+def trocar_blocos(blocos_pai1, blocos_pai2, mascara):
+    """
+    Kernel do crossover por blocos: filho1 recebe o bloco do pai1 onde a máscara é True e o
+    do pai2 onde é False (filho2 o contrário). A máscara é propagada pelos bits de cada
+    bloco, então serve para um par (blocos × bits) ou um lote de pares (pares × blocos × bits).
+    """
+    return np.where(mascara, blocos_pai1, blocos_pai2), np.where(mascara, blocos_pai2, blocos_pai1)
+
+def crossover_binario_lote(pais1_bin, pais2_bin, bits_por_elemento, tipo='uniforme', taxa_crossover=1.0, rng=None):
+    """
+    crossover_binario para todos os pares de uma geração de uma vez.
+    Os pais são matrizes pares × bits (mesmo tamanho, múltiplo de bits_por_elemento),
+    tratadas como um array pares × blocos × bits: os cortes (one_point, two_point) ou a
+    máscara de Bernoulli por bloco (uniforme) são sorteados para todos os pares juntos
+    e aplicados com trocar_blocos. Pares sorteados acima de taxa_crossover são copiados.
+    Args:
+        rng: np.random.Generator (None = gerador global do numpy)
+    Returns:
+        (filhos1, filhos2): matrizes pares × bits
+    """
+    gerador = np.random if rng is None else rng
+    pais1_bin, pais2_bin = np.asarray(pais1_bin), np.asarray(pais2_bin)
+    n_pares, n_bits = pais1_bin.shape
+    n_blocos = n_bits // bits_por_elemento
+    blocos_pai1 = pais1_bin.reshape(n_pares, n_blocos, bits_por_elemento)
+    blocos_pai2 = pais2_bin.reshape(n_pares, n_blocos, bits_por_elemento)
+
+    indices = np.arange(n_blocos)
+    if tipo == 'one_point':
+        point = 1 + (gerador.random(n_pares) * (n_blocos - 2)).astype(int)  # Em [1, n_blocos-2], como crossover_binario
+        mask = indices < point[:, None]
+    elif tipo == 'two_point':
+        # Dois cortes distintos em [1, n_blocos-1]: ordena as duas menores chaves aleatórias
+        cortes = np.sort(np.argsort(gerador.random((n_pares, n_blocos - 1)), axis=1)[:, :2] + 1, axis=1)
+        mask = (indices < cortes[:, :1]) | (indices >= cortes[:, 1:])
+    elif tipo == 'uniforme':
+        mask = gerador.random((n_pares, n_blocos)) < 0.5
+    else:
+        raise ValueError(f"Tipo de crossover '{tipo}' não suportado")
+    mask |= (gerador.random(n_pares) > taxa_crossover)[:, None]  # Sem crossover: filho1 = pai1
+
+    filhos1, filhos2 = trocar_blocos(blocos_pai1, blocos_pai2, mask[:, :, None])
+    return filhos1.reshape(n_pares, n_bits), filhos2.reshape(n_pares, n_bits)
+
 def crossover_binario(pai1_bin, pai2_bin, bits_por_elemento, tipo='one_point', taxa_crossover=1):
     """
     Versão modificada que respeita a estrutura de blocos de bits
@@ -61,20 +105,54 @@ def crossover_binario(pai1_bin, pai2_bin, bits_por_elemento, tipo='one_point', t
         filho2 = np.vstack([blocos_pai2[:point1], blocos_pai1[point1:point2], blocos_pai2[point2:]])
     
     elif tipo == 'uniforme':
-        # Para cada bloco, decide qual pai usar
-        mask = 0
-        if len(blocos_pai1) > len(blocos_pai2):
-            mask = np.random.randint(0, 2, size=len(blocos_pai2)).astype(bool)
-        else:
-            mask = np.random.randint(0, 2, size=len(blocos_pai1)).astype(bool)
-        filho1 = np.vstack([blocos_pai1[i] if mask[i] else blocos_pai2[i] for i in range(len(mask))]) #[0,1,1,0,1]
-        filho2 = np.vstack([blocos_pai2[i] if mask[i] else blocos_pai1[i] for i in range(len(mask))])
+        # Para cada bloco (dos blocos em comum), decide qual pai usar
+        n_blocos = min(len(blocos_pai1), len(blocos_pai2))
+        mask = np.random.randint(0, 2, size=n_blocos).astype(bool)
+        filho1, filho2 = trocar_blocos(blocos_pai1[:n_blocos], blocos_pai2[:n_blocos], mask[:, None]) #[0,1,1,0,1]
     
     # Retorna a forma linear
     return filho1.flatten(), filho2.flatten()
 
+def mascara_crossover_blocos(n_blocos, bits_por_elemento, tipo='one_point', n_blocos_corte=None):
+    """
+    Máscara de bits do crossover por blocos (True = bit do pai1 no filho1), com os mesmos
+    cortes de crossover_binario. n_blocos_corte limita os pontos de corte (tamanho do pai1
+    quando os pais têm tamanhos diferentes).
+    """
+    n_blocos_corte = n_blocos if n_blocos_corte is None else n_blocos_corte
+    indices = np.arange(n_blocos)
+    if tipo == 'one_point':
+        point = np.random.randint(1, n_blocos_corte-1)
+        blocos = indices < point
+    elif tipo == 'two_point':
+        point1, point2 = sorted(np.random.choice(range(1, n_blocos_corte), size=2, replace=False))
+        blocos = (indices < point1) | (indices >= point2)
+    elif tipo == 'uniforme':
+        blocos = np.random.randint(0, 2, size=n_blocos).astype(bool)
+    else:
+        raise ValueError(f"Tipo de crossover '{tipo}' não suportado")
+    return np.repeat(blocos, bits_por_elemento)
+
+def crossover_binario_compactado(pai1, pai2, n_bits, bits_por_elemento, tipo='one_point', taxa_crossover=1, n_blocos_corte=None):
+    """
+    crossover_binario sobre cromossomos compactados (compactar_binario) de n_bits bits:
+    a máscara de blocos é empacotada e os filhos saem de operações bit a bit nos bytes,
+    (pai1 & m) | (pai2 & ~m) e (pai2 & m) | (pai1 & ~m), sem expandir os bits.
+    """
+    if np.random.rand() > taxa_crossover:
+        return pai1.copy(), pai2.copy()
+    
+    mascara = compactar_binario(mascara_crossover_blocos(n_bits // bits_por_elemento, bits_por_elemento, tipo, n_blocos_corte))
+    filho1 = (pai1 & mascara) | (pai2 & ~mascara)
+    filho2 = (pai2 & mascara) | (pai1 & ~mascara)
+    return filho1, filho2
+
+def _ajustar_bits(codigo, n_bits):
+    """Corta ou completa com zeros (blocos de ID 0, descartados no reparo) até n_bits bits."""
+    return np.pad(codigo[:n_bits], (0, max(0, n_bits - len(codigo))))
+
 def crossover_completo(pais, evrp_data, n_filhos, num_rotas_min=3, 
-                     tipo_crossover='one_point', taxa_crossover=0.8, estacao=False):
+                     tipo_crossover='one_point', taxa_crossover=0.8, estacao=False, compactado=True):
     """
     Executa o crossover completo controlando o número de filhos gerados.
     
@@ -86,6 +164,8 @@ def crossover_completo(pais, evrp_data, n_filhos, num_rotas_min=3,
         tipo_crossover: Tipo de crossover ('one_point', 'two_point', 'uniforme')
         taxa_crossover: Probabilidade de aplicar crossover (0 a 1)
         estacao: Se True, considera estações de recarga como nós válidos
+        compactado: Se True, os pais são empacotados (8 bits por byte) e o crossover é feito
+            sobre os bytes (crossover_binario_compactado)
     
     Returns:
         filhos_reparados: Lista com exatamente n_filhos rotas filhas válidas
@@ -100,6 +180,11 @@ def crossover_completo(pais, evrp_data, n_filhos, num_rotas_min=3,
     # Repete a lista de pais se necessário
     pais_ampliados = (pais * ((n_pares // len(pais)) + 1))[:n_pares*2]
     
+    # Bits por elemento da codificação binária
+    bits_cidade = max(5, (evrp_data['DIMENSION']).bit_length())
+    bits_deposito = 1
+    bits_por_elemento = bits_cidade + bits_deposito
+    
     for i in range(0, min(len(pais_ampliados), n_pares*2), 2):
         if len(filhos_reparados) >= n_filhos:
             break
@@ -107,21 +192,32 @@ def crossover_completo(pais, evrp_data, n_filhos, num_rotas_min=3,
         pai1 = pais_ampliados[i]
         pai2 = pais_ampliados[i+1]
         
-        # 1. Codifica para binário (calculando bits_por_elemento)
-        bits_cidade = max(5, (evrp_data['DIMENSION']).bit_length())
-        bits_deposito = 1
-        bits_por_elemento = bits_cidade + bits_deposito
-        
+        # 1. Codifica para binário (codec vetorizado)
         pai1_bin = codificar_rota_binaria(pai1, evrp_data,bits_cidade)
         pai2_bin = codificar_rota_binaria(pai2, evrp_data,bits_cidade)
         
         # 2. Aplica crossover com controle de blocos
-        filho1_bin, filho2_bin = crossover_binario(
-            pai1_bin, pai2_bin,
-            bits_por_elemento=bits_por_elemento,
-            tipo=tipo_crossover,
-            taxa_crossover=taxa_crossover
-        )
+        if compactado:
+            # Pais de tamanhos diferentes: completa o menor com blocos zerados (o uniforme,
+            # como em crossover_binario, fica só com os blocos em comum)
+            n_bits = (min if tipo_crossover == 'uniforme' else max)(len(pai1_bin), len(pai2_bin))
+            filho1_bin, filho2_bin = crossover_binario_compactado(
+                compactar_binario(_ajustar_bits(pai1_bin, n_bits)),
+                compactar_binario(_ajustar_bits(pai2_bin, n_bits)),
+                n_bits, bits_por_elemento,
+                tipo=tipo_crossover,
+                taxa_crossover=taxa_crossover,
+                n_blocos_corte=len(pai1_bin) // bits_por_elemento
+            )
+            filho1_bin = descompactar_binario(filho1_bin, n_bits)
+            filho2_bin = descompactar_binario(filho2_bin, n_bits)
+        else:
+            filho1_bin, filho2_bin = crossover_binario(
+                pai1_bin, pai2_bin,
+                bits_por_elemento=bits_por_elemento,
+                tipo=tipo_crossover,
+                taxa_crossover=taxa_crossover
+            )
         
         # 3. Decodifica
         filho1 = decodificar_rota_binaria(filho1_bin, evrp_data,bits_cidade)
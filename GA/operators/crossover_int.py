@@ -3,6 +3,138 @@ import random
 from ..utils.export import *
 from copy import deepcopy
 
+def _fora_do_segmento(sequencia, segmento, n_nos):
+    """Nós de sequencia (em ordem) que não estão em segmento, com uma máscara de presença."""
+    no_segmento = np.zeros(n_nos, dtype=bool)
+    no_segmento[np.asarray(segmento, dtype=np.int64)] = True
+    sequencia = np.asarray(sequencia, dtype=np.int64)
+    return sequencia[~no_segmento[sequencia]].tolist()
+
+def _nos_em_comum(seq1, seq2):
+    """Primeira ocorrência de cada nó presente nas duas sequências, na ordem de cada uma."""
+    seq1, seq2 = np.asarray(seq1, dtype=np.int64), np.asarray(seq2, dtype=np.int64)
+    if len(seq1) == 0 or len(seq2) == 0:
+        return seq1[:0], seq2[:0]
+    n_nos = max(seq1.max(), seq2.max()) + 1
+    em1, em2 = np.zeros(n_nos, dtype=bool), np.zeros(n_nos, dtype=bool)
+    em1[seq1], em2[seq2] = True, True
+    unicos = []
+    for seq in (seq1, seq2):
+        _, primeiras = np.unique(seq, return_index=True)
+        seq = seq[np.sort(primeiras)]
+        unicos.append(seq[em1[seq] & em2[seq]])
+    return unicos[0], unicos[1]
+
+def _mapa_posicoes(sequencia, n_nos):
+    """Vetor indexado pelo ID do nó com a posição do nó na sequência (O(n))."""
+    posicao = np.empty(n_nos, dtype=np.int64)
+    posicao[sequencia] = np.arange(len(sequencia))
+    return posicao
+
+def crossover_pmx(pai1, pai2, inicio=None, fim=None):
+    """
+    Partially mapped crossover (PMX) em O(n) para duas permutações dos mesmos nós.
+    O filho recebe pai1[inicio:fim] e o resto de pai2; cada nó de pai2 deslocado pelo
+    trecho vai para a posição obtida seguindo o mapeamento pai1[i] -> pai2[i] (mapa de
+    posições de pai2) até sair do trecho.
+    """
+    pai1, pai2 = np.asarray(pai1), np.asarray(pai2)
+    n = len(pai1)
+    if inicio is None:
+        inicio, fim = sorted(random.sample(range(n + 1), 2))
+    n_nos = max(pai1.max(), pai2.max()) + 1 if n else 0
+    posicao2 = _mapa_posicoes(pai2, n_nos)
+    no_trecho = np.zeros(n_nos, dtype=bool)
+    no_trecho[pai1[inicio:fim]] = True
+    filho = pai2.copy()
+    filho[inicio:fim] = pai1[inicio:fim]
+    # Só os nós de pai2 no trecho que não vieram de pai1 são deslocados
+    deslocados = inicio + np.flatnonzero(~no_trecho[pai2[inicio:fim]])
+    proximo = posicao2[pai1].tolist()  # j -> posição em pai2 de pai1[j]
+    for i in deslocados.tolist():
+        j = i
+        while inicio <= j < fim:
+            j = proximo[j]
+        filho[j] = pai2[i]
+    return filho
+
+def crossover_cx(pai1, pai2):
+    """
+    Cycle crossover (CX) em O(n): os ciclos de posições (i -> posição em pai1 de pai2[i])
+    vêm alternadamente de pai1 e de pai2.
+    """
+    pai1, pai2 = np.asarray(pai1), np.asarray(pai2)
+    n = len(pai1)
+    if n == 0:
+        return pai1.copy()
+    proximo = _mapa_posicoes(pai1, max(pai1.max(), pai2.max()) + 1)[pai2].tolist()
+    ciclo = [-1] * n
+    atual = 0
+    for inicio in range(n):
+        if ciclo[inicio] != -1:
+            continue
+        i = inicio
+        while ciclo[i] == -1:
+            ciclo[i] = atual
+            i = proximo[i]
+        atual += 1
+    return np.where(np.array(ciclo) % 2 == 0, pai1, pai2)
+
+def crossover_erx(pai1, pai2):
+    """
+    Edge recombination (ERX) em O(n): parte de pai1[0] e segue para o vizinho (nos dois
+    pais, circularmente) com menos vizinhos restantes; sem vizinhos, sorteia um nó não
+    visitado. Os vizinhos ficam numa matriz nós × 4 (sem repetidos), com o grau de cada nó
+    e a máscara de visitados indexados pelo ID; os não visitados ficam num vetor com mapa
+    de posições (remoção em O(1)).
+    """
+    pai1, pai2 = np.asarray(pai1), np.asarray(pai2)
+    n = len(pai1)
+    if n == 0:
+        return pai1.copy()
+    n_nos = max(pai1.max(), pai2.max()) + 1
+    matriz = np.full((n_nos, 4), -1, dtype=np.int64)
+    matriz[pai1, 0], matriz[pai1, 1] = np.roll(pai1, 1), np.roll(pai1, -1)
+    matriz[pai2, 2], matriz[pai2, 3] = np.roll(pai2, 1), np.roll(pai2, -1)
+    matriz.sort(axis=1)
+    repetido = np.zeros_like(matriz, dtype=bool)
+    repetido[:, 1:] = matriz[:, 1:] == matriz[:, :-1]
+    matriz[repetido | (matriz == np.arange(n_nos)[:, None])] = -1
+    grau = (matriz >= 0).sum(axis=1).tolist()
+    vizinhos = [[v for v in linha if v >= 0] for linha in matriz.tolist()]
+
+    visitado = np.zeros(n_nos, dtype=bool)
+    restantes = pai1.tolist()
+    posicao = _mapa_posicoes(pai1, n_nos)
+    filho = np.empty_like(pai1)
+    atual = restantes[0]
+    for k in range(n):
+        filho[k] = atual
+        visitado[atual] = True
+        # Remove atual dos não visitados (troca com o último) e do grau dos vizinhos
+        i, ultimo = posicao[atual], restantes.pop()
+        if ultimo != atual:
+            restantes[i] = ultimo
+            posicao[ultimo] = i
+        for vizinho in vizinhos[atual]:
+            grau[vizinho] -= 1
+        if not restantes:
+            break
+        candidatos = [v for v in vizinhos[atual] if not visitado[v]]
+        if candidatos:
+            menor = min(grau[v] for v in candidatos)
+            atual = random.choice([v for v in candidatos if grau[v] == menor])
+        else:
+            atual = random.choice(restantes)
+    return filho
+
+# Crossovers de permutação usados por crossover_rotas (e pelo giant tour)
+crossovers_permutacao = {
+    'PMX': crossover_pmx,
+    'CX': crossover_cx,
+    'ERX': crossover_erx
+}
+
 def crossover_rotas(pai1, pai2, tipo='one_point', taxa_crossover=1):
     if random.random() > taxa_crossover:
         return deepcopy(pai1), deepcopy(pai2)
@@ -32,14 +164,27 @@ def crossover_rotas(pai1, pai2, tipo='one_point', taxa_crossover=1):
             segment1 = pai1_clean[point1:point2]
             segment2 = pai2_clean[point1:point2]
             
-            remaining1 = [node for node in pai2_clean[1:-1] if node not in segment1]
-            remaining2 = [node for node in pai1_clean[1:-1] if node not in segment2]
+            # Máscara de presença por ID de nó no lugar de "node not in segment" (O(n))
+            n_nos = max(max(pai1_clean), max(pai2_clean)) + 1
+            remaining1 = _fora_do_segmento(pai2_clean[1:-1], segment1, n_nos)
+            remaining2 = _fora_do_segmento(pai1_clean[1:-1], segment2, n_nos)
             
             filho1 = [1] + remaining1[:point1] + segment1 + remaining1[point1:] + [1]
             filho2 = [1] + remaining2[:point1] + segment2 + remaining2[point1:] + [1]
         else:
             filho1, filho2 = deepcopy(pai1_clean), deepcopy(pai2_clean)
     
+    elif tipo in crossovers_permutacao:
+        # Operadores de permutação: cada nó distinto presente nos dois pais (os demais,
+        # como estações que só um pai visita, são recolocados pelo reparo)
+        seq1, seq2 = _nos_em_comum(pai1_clean[1:-1], pai2_clean[1:-1])
+        if len(seq1) >= 2:
+            operador = crossovers_permutacao[tipo]
+            filho1 = [1] + operador(seq1, seq2).tolist() + [1]
+            filho2 = [1] + operador(seq2, seq1).tolist() + [1]
+        else:
+            filho1, filho2 = deepcopy(pai1_clean), deepcopy(pai2_clean)
+    
     else:  # uniforme
         filho1 = [1]
         filho2 = [1]
@@ -75,4 +220,124 @@ def crossover_completo(pais, evrp_data, n_filhos, num_rotas_min=3, tipo_crossove
         
         filhos_reparados.extend([filho1, filho2])
     
-    return filhos_reparados[:n_filhos]
\ No newline at end of file
+    return filhos_reparados[:n_filhos]
+
+def _dois_cortes(gerador, limite):
+    """Dois cortes distintos 0 <= a < b < limite por linha (linhas com limite < 2 recebem lixo)."""
+    x = (gerador.random(len(limite)) * limite).astype(np.int64)
+    y = (gerador.random(len(limite)) * (limite - 1)).astype(np.int64)
+    y += y >= x
+    return np.minimum(x, y), np.maximum(x, y)
+
+def _ox_lote(X, Y, mY, a, b, n_nos):
+    """
+    OX em lote: filho = R[:a] + X[a:b] + R[a:], onde R são os nós de Y (na ordem de Y)
+    que não estão no segmento X[a:b]. Os nós do segmento são marcados numa matriz
+    linhas × nós e os restantes são compactados à esquerda com um argsort estável.
+    Returns: (filhos, comprimentos)
+    """
+    n, L = X.shape
+    j = np.arange(L)
+    linhas = np.arange(n)[:, None]
+    segmento = (j >= a[:, None]) & (j < b[:, None]) & (X != 0)
+    no_segmento = np.zeros((n, n_nos), dtype=bool)
+    no_segmento[np.broadcast_to(linhas, X.shape)[segmento], X[segmento]] = True
+    resta = (j < mY[:, None]) & ~no_segmento[linhas, Y]
+    R = np.take_along_axis(Y, np.argsort(~resta, axis=1, kind='stable'), axis=1)
+    r = resta.sum(axis=1)
+
+    tamanho = b - a
+    inicio = np.minimum(a, r)  # Se sobram menos de a nós, o segmento vem logo depois deles
+    k = np.arange(2 * L)
+    de_R = (k < inicio[:, None]) | (k >= (inicio + tamanho)[:, None])
+    indice_R = np.clip(np.where(k < inicio[:, None], k, k - tamanho[:, None]), 0, L - 1)
+    indice_X = np.clip(k - inicio[:, None] + a[:, None], 0, L - 1)
+    filhos = np.where(de_R, np.take_along_axis(R, indice_R, axis=1), np.take_along_axis(X, indice_X, axis=1))
+    return filhos, r + tamanho
+
+def crossover_lote(pais, tipo='one_point', taxa_crossover=1.0, rng=None):
+    """
+    crossover_rotas para todos os pares (pais[0], pais[1]), (pais[2], pais[3]), ... de uma vez.
+    Os depósitos internos são removidos e as sequências empilhadas numa matriz preenchida
+    com 0 (empacotar_populacao); cada tipo ('one_point', 'two_point', 'OX', 'uniforme') é só
+    aritmética de índices sobre a matriz de pares. Os crossovers de permutação ('PMX', 'CX',
+    'ERX') seguem mapas de posições nó a nó e são feitos par a par com crossover_rotas.
+    Args:
+        rng: np.random.Generator (None = gerador global do numpy)
+    Returns:
+        (filhos, comprimentos): matriz preenchida com os filhos já com os depósitos inicial e
+        final (linhas 2i e 2i+1 vêm do par i) e o tamanho de cada filho
+    """
+    gerador = np.random if rng is None else rng
+    n_pares = len(pais) // 2
+    sequencias = []
+    for pai in pais[:2 * n_pares]:
+        pai = np.asarray(pai)
+        sequencias.append(pai[1:-1][pai[1:-1] != 1])
+    S, m = empacotar_populacao(sequencias)
+    A, B = S[0::2], S[1::2]
+    mA, mB = m[0::2], m[1::2]
+    L = S.shape[1]
+    j = np.arange(L)
+    cruza = gerador.random(n_pares) < taxa_crossover
+
+    if tipo in crossovers_permutacao:
+        filhos = []
+        for k in range(n_pares):
+            pai1 = np.concatenate([[1], sequencias[2*k], [1]])
+            pai2 = np.concatenate([[1], sequencias[2*k+1], [1]])
+            filhos.extend(crossover_rotas(pai1, pai2, tipo) if cruza[k] else (pai1, pai2))
+        return empacotar_populacao(filhos)
+
+    if tipo == 'one_point':
+        menor = np.minimum(mA, mB)
+        corte = (gerador.random(n_pares) * menor).astype(np.int64)
+        cruza &= menor > 0
+        do_primeiro = (j < corte[:, None]) | ~cruza[:, None]
+        F1, F2 = np.where(do_primeiro, A, B), np.where(do_primeiro, B, A)
+        c1, c2 = np.where(cruza, mB, mA), np.where(cruza, mA, mB)
+    elif tipo == 'two_point':
+        a, b = _dois_cortes(gerador, mA)
+        cruza &= mA >= 2
+        trocado = (j >= a[:, None]) & (j < b[:, None]) & cruza[:, None]
+        F1, F2 = np.where(trocado, B, A), np.where(trocado, A, B)
+        c1, c2 = mA, np.where(cruza, np.maximum(mB, b), mB)
+    elif tipo == 'OX':
+        a, b = _dois_cortes(gerador, mA)
+        cruza &= mA >= 2
+        n_nos = S.max(initial=0) + 1
+        O1, o1 = _ox_lote(A, B, mB, a, b, n_nos)
+        O2, o2 = _ox_lote(B, A, mA, a, np.minimum(b, np.maximum(mB, a)), n_nos)
+        F1 = np.where(cruza[:, None], O1, np.pad(A, ((0, 0), (0, L))))
+        F2 = np.where(cruza[:, None], O2, np.pad(B, ((0, 0), (0, L))))
+        c1, c2 = np.where(cruza, o1, mA), np.where(cruza, o2, mB)
+    elif tipo == 'uniforme':
+        menor = np.minimum(mA, mB)
+        do_primeiro = (gerador.random((n_pares, L)) < 0.5) | ~cruza[:, None]
+        F1, F2 = np.where(do_primeiro, A, B), np.where(do_primeiro, B, A)
+        c1, c2 = np.where(cruza, menor, mA), np.where(cruza, menor, mB)
+    else:
+        raise ValueError(f"Tipo de crossover '{tipo}' não suportado")
+
+    # Intercala os filhos dos pares e recoloca os depósitos inicial e final
+    largura = F1.shape[1]
+    comprimentos = np.empty(2 * n_pares, dtype=np.int64)
+    comprimentos[0::2], comprimentos[1::2] = c1, c2
+    filhos = np.zeros((2 * n_pares, largura + 2), dtype=np.int64)
+    filhos[0::2, 1:largura+1], filhos[1::2, 1:largura+1] = F1, F2
+    filhos[np.arange(largura + 2) > comprimentos[:, None]] = 0
+    filhos[:, 0] = 1
+    filhos[np.arange(2 * n_pares), comprimentos + 1] = 1
+    return filhos, comprimentos + 2
+
+def crossover_completo_lote(pais, evrp_data, n_filhos, num_rotas_min=3, tipo_crossover='one_point', taxa_crossover=0.8, estacao=False, rng=None):
+    """
+    Versão em lote de crossover_completo (mesmo contrato): todos os pares são cruzados
+    por crossover_lote e os filhos passam juntos pela etapa de reparo (reparar_lote).
+    """
+    n_pares = min(len(pais) // 2, (n_filhos + 1) // 2)
+    pais = pais[:2 * n_pares]
+    if n_pares == 0:
+        return []
+    filhos, comprimentos = crossover_lote(pais, tipo_crossover, taxa_crossover, rng)
+    return reparar_lote(filhos, comprimentos, pais, evrp_data, num_rotas_min, estacao)[:n_filhos]
@@ -1,63 +1,220 @@
-import math
+import numpy as np
+from collections import OrderedDict
+from ..utils.file import compilar_instancia
+from ..utils.visao import visao_rota
+from ..utils.auxiliares import empacotar_populacao
 
-def avaliacao_distancia_pura(populacao, data):
+def avaliar_distancias_lote(populacao, data):
     """
-    Calcula fitness como o inverso da distância total percorrida.
-    - Quanto menor a distância, maior o fitness.
-    - Retorna: {rota_tuple: fitness}
+    Calcula a distância total de todas as rotas da população de uma vez:
+    um único gather na matriz de distâncias seguido de uma soma por linha.
+    - Retorna: array de distâncias alinhado com os índices da população
     """
-    fitness = {}
-    for rota in populacao:
-        rota_tuple = tuple(int(node) for node in rota)
-        distancia_total = 0.0
-        for i in range(len(rota) - 1):
-            x1, y1 = data['NODE_COORD_SECTION'][rota[i]]
-            x2, y2 = data['NODE_COORD_SECTION'][rota[i + 1]]
-            distancia_total += math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-        fitness[rota_tuple] = 1 / (distancia_total + 1e-6)  # +1e-6 evita divisão por zero
-    return fitness
+    if len(populacao) == 0:
+        return np.zeros(0)
+    distancias = compilar_instancia(data).distancias
+    matriz, tamanhos = empacotar_populacao(populacao)
+    arcos = distancias[matriz[:, :-1], matriz[:, 1:]]
+    arcos[np.arange(arcos.shape[1]) >= (tamanhos - 1)[:, None]] = 0.0  # Ignora o preenchimento
+    return arcos.sum(axis=1)
 
-def avaliacao_com_penalidades(populacao, data):
-    fitness = {}
-    for rota in populacao:
-        rota_tuple = tuple(rota)
-        distancia_total = 0.0
-        penalidade = 0
-        
-        # Verifica clientes não visitados
-        clientes_visitados = set(node for node in rota if node not in data['STATIONS_COORD_SECTION'] and node != 1)
-        clientes_faltantes = len([i for i in range(2, data['DIMENSION'] + 1) if i not in clientes_visitados])
-        penalidade += 1000 * clientes_faltantes  # Penalidade alta por cliente faltante
-
-        # Verifica bateria e carga
-        carga_atual = data['CAPACITY']
-        bateria_atual = data['ENERGY_CAPACITY']
-        for i in range(len(rota) - 1):
-            origem, destino = rota[i], rota[i+1]
-            x1, y1 = data['NODE_COORD_SECTION'][origem]
-            x2, y2 = data['NODE_COORD_SECTION'][destino]
-            distancia = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-            distancia_total += distancia
-            
-            # Atualiza bateria e carga
-            if destino != 1 and destino not in data['STATIONS_COORD_SECTION']:
-                carga_atual -= data['DEMAND_SECTION'][destino]
-            bateria_atual -= data['ENERGY_CONSUMPTION'] * distancia
-            
-            # Penaliza se bateria/carga ficar negativa
-            if carga_atual < 0:
-                penalidade += 1000  # Penalidade por excesso de carga
-            if bateria_atual < 0:
-                penalidade += 1000  # Penalidade por bateria insuficiente
-            
-            # Recarrega se chegar a uma estação ou depósito
-            if destino in data['STATIONS_COORD_SECTION'] + [1]:
-                bateria_atual = data['ENERGY_CAPACITY']
-        
-        fitness[rota_tuple] = 1 / (distancia_total + penalidade + 1e-6)  # Evita divisão por zero
+def fitness_alinhado(populacao, fitness):
+    """
+    Converte o fitness em um array alinhado com os índices da população.
+    Aceita o array das avaliações em lote ou o formato antigo {rota_tuple: fitness}.
+    """
+    if isinstance(fitness, dict):
+        return np.array([fitness[tuple(int(node) for node in rota)] for rota in populacao], dtype=float)
+    return np.asarray(fitness, dtype=float)
+
+class CacheAvaliacao:
+    """
+    Cache LRU limitado de objetivos de rotas, chaveado pelos bytes da rota (ndarray.tobytes()).
+    - tamanho_max: número máximo de rotas guardadas (as menos usadas recentemente são descartadas)
+    - canonico: se True, a chave ignora a ordem das sub-rotas e o sentido de cada uma. Só é exato
+      para objetivos simétricos, como a distância pura: as violações por arco das penalidades
+      podem mudar quando uma sub-rota é percorrida ao contrário.
+    - hits / misses: contadores de consultas atendidas pelo cache e de rotas realmente avaliadas
+    """
+    def __init__(self, tamanho_max=50000, canonico=False):
+        self.tamanho_max = tamanho_max
+        self.canonico = canonico
+        self.hits = 0
+        self.misses = 0
+        self._dados = OrderedDict()
+
+    def __len__(self):
+        return len(self._dados)
+
+    @property
+    def taxa_acerto(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def limpar(self):
+        self._dados.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def chave(self, rota):
+        rota = np.asarray(rota, dtype=np.int64)
+        if not self.canonico:
+            return rota.tobytes()
+        # Forma canônica: cada sub-rota no sentido lexicograficamente menor, sub-rotas ordenadas
+        depositos = np.flatnonzero(rota == 1)
+        subrotas = []
+        for inicio, fim in zip(depositos[:-1], depositos[1:]):
+            subrota = tuple(rota[inicio + 1:fim].tolist())
+            if subrota:
+                subrotas.append(min(subrota, subrota[::-1]))
+        subrotas.sort()
+        canonica = [1]
+        for subrota in subrotas:
+            canonica.extend(subrota)
+            canonica.append(1)
+        return np.array(canonica, dtype=np.int64).tobytes()
+
+    def avaliar(self, populacao, objetivo, data):
+        """
+        Retorna o objetivo de cada rota (array alinhado com a população), chamando
+        objetivo(rotas, data) em lote só para as rotas que não estão no cache.
+        """
+        resultado = np.empty(len(populacao))
+        faltando = {}  # chave -> índices das rotas com essa chave
+        for i, rota in enumerate(populacao):
+            chave = (objetivo.__name__, self.chave(rota))
+            valor = self._dados.get(chave)
+            if valor is None:
+                faltando.setdefault(chave, []).append(i)
+            else:
+                self._dados.move_to_end(chave)
+                resultado[i] = valor
+                self.hits += 1
+
+        if faltando:
+            self.misses += len(faltando)
+            self.hits += sum(len(indices) - 1 for indices in faltando.values())  # Repetidas no mesmo lote
+            valores = objetivo([populacao[indices[0]] for indices in faltando.values()], data)
+            for (chave, indices), valor in zip(faltando.items(), valores):
+                resultado[indices] = valor
+                self._dados[chave] = float(valor)
+            while len(self._dados) > self.tamanho_max:
+                self._dados.popitem(last=False)
+        return resultado
+
+def _objetivos(populacao, data, objetivo, cache):
+    if cache is None:
+        return objetivo(populacao, data)
+    return cache.avaliar(populacao, objetivo, data)
+
+def fitness_inverso(objetivos):
+    """Fitness como o inverso do objetivo (distância, com ou sem penalidades)."""
+    return 1 / (np.asarray(objetivos, dtype=float) + 1e-6)  # +1e-6 evita divisão por zero
+
+def fitness_por_rankeamento(objetivos):
+    """
+    Fitness baseado na posição no ranking dos objetivos (menor objetivo = melhor).
+    - O melhor recebe N², o segundo (N-1)², ...; normalizado para somar 1.
+    """
+    objetivos = np.asarray(objetivos, dtype=float)
+    
+    # Ordena pelo objetivo (menor = melhor)
+    ordem = np.argsort(objetivos, kind='stable')
+    
+    # Atribui fitness baseado no ranking (melhor rank = maior fitness)
+    fitness = np.empty(len(objetivos))
+    fitness[ordem] = (len(objetivos) - np.arange(len(objetivos))) ** 2  # Quadrado do ranking inverso
+    
+    # Normaliza para somar 1 (opcional)
+    total = fitness.sum()
+    if total > 0:
+        fitness /= total
     
     return fitness
 
+def avaliacao_distancia_pura(populacao, data, cache=None):
+    """
+    Calcula fitness como o inverso da distância total percorrida.
+    - Quanto menor a distância, maior o fitness.
+    - cache: CacheAvaliacao opcional, consultado antes de avaliar
+    - Retorna: array de fitness alinhado com a população
+    """
+    return fitness_inverso(_objetivos(populacao, data, avaliar_distancias_lote, cache))
+
+def _acumulado_desde_reinicio(acumulado, reinicio):
+    """
+    Para cada posição, quanto de `acumulado` foi somado desde o último reinício (inclusive).
+    `acumulado` é não-decrescente ao longo de cada linha, então o valor no último
+    reinício é obtido com um máximo acumulado.
+    """
+    base = np.where(reinicio, acumulado, -np.inf)
+    base[:, 0] = acumulado[:, 0]  # Toda rota começa carregada e com a bateria cheia
+    return np.maximum.accumulate(base, axis=1)
+
+def avaliar_restricoes_lote(populacao, data):
+    """
+    Avalia distância e restrições de toda a população de uma vez, por segmentos:
+    - a carga acumulada reinicia a cada passagem pelo depósito;
+    - a energia acumulada reinicia a cada depósito/estação de recarga.
+    Cada arco em que a carga da sub-rota passa de CAPACITY ou a energia desde a última
+    recarga passa de ENERGY_CAPACITY conta como uma violação.
+    - Retorna: (distancias, clientes_faltantes, violacoes_carga, violacoes_bateria),
+      arrays alinhados com a população
+    """
+    instancia = compilar_instancia(data)
+    n = len(populacao)
+    if n == 0:
+        vazio = np.zeros(0)
+        return vazio, vazio.astype(np.int64), vazio.astype(np.int64), vazio.astype(np.int64)
+
+    matriz, tamanhos = empacotar_populacao(populacao)
+    posicao_valida = np.arange(matriz.shape[1]) < tamanhos[:, None]
+    arco_valido = posicao_valida[:, 1:]  # Arco k liga as posições k e k+1
+
+    # Distância e energia de cada arco, já zeradas no preenchimento
+    distancias = np.where(arco_valido, instancia.distancias[matriz[:, :-1], matriz[:, 1:]], 0.0)
+    energia = np.where(arco_valido, instancia.energia[matriz[:, :-1], matriz[:, 1:]], 0.0)
+
+    # Energia gasta desde a última recarga, na chegada a cada nó
+    energia_acumulada = np.zeros(matriz.shape, dtype=float)
+    np.cumsum(energia, axis=1, out=energia_acumulada[:, 1:])
+    base_energia = _acumulado_desde_reinicio(energia_acumulada, instancia.eh_recarga[matriz])
+    gasto_trecho = energia_acumulada[:, 1:] - base_energia[:, :-1]
+    violacoes_bateria = np.count_nonzero((gasto_trecho > instancia.energia_capacidade + 1e-9) & arco_valido, axis=1)
+
+    # Carga entregue desde a última passagem pelo depósito (demanda do preenchimento é 0)
+    carga_acumulada = np.cumsum(instancia.demanda[matriz], axis=1)
+    base_carga = _acumulado_desde_reinicio(carga_acumulada, matriz == instancia.deposito)
+    carga_trecho = carga_acumulada[:, 1:] - base_carga[:, :-1]
+    violacoes_carga = np.count_nonzero((carga_trecho > instancia.capacidade) & arco_valido, axis=1)
+
+    # Clientes faltantes via máscara de presença (indivíduo x nó)
+    presente = np.zeros((n, instancia.n_nos + 1), dtype=bool)
+    presente[np.repeat(np.arange(n), tamanhos), matriz[posicao_valida]] = True
+    clientes_faltantes = len(instancia.clientes) - presente[:, instancia.clientes].sum(axis=1)
+
+    return distancias.sum(axis=1), clientes_faltantes, violacoes_carga, violacoes_bateria
+
+def _objetivo_com_penalidades(populacao, data):
+    distancias, faltantes, violacoes_carga, violacoes_bateria = avaliar_restricoes_lote(populacao, data)
+    return distancias + 1000 * (faltantes + violacoes_carga + violacoes_bateria)
+
+def objetivo_com_penalidades(populacao, data, cache=None):
+    """
+    Distância + penalidades (1000 por cliente faltante e por violação de carga ou bateria,
+    ver avaliar_restricoes_lote).
+    - cache: CacheAvaliacao opcional, consultado antes de avaliar
+    - Retorna: array de objetivos (menor = melhor) alinhado com a população
+    """
+    return _objetivos(populacao, data, _objetivo_com_penalidades, cache)
+
+def avaliacao_com_penalidades(populacao, data, cache=None):
+    """
+    Calcula fitness como o inverso de distância + penalidades.
+    - Retorna: array de fitness alinhado com a população
+    """
+    return fitness_inverso(objetivo_com_penalidades(populacao, data, cache))
+
 def avaliacao_distancia_restricoes(populacao, data):
     """
     Calcula fitness considerando distância + penalidades fictícias.
@@ -81,64 +238,23 @@ def avaliacao_distancia_restricoes(populacao, data):
 
     for rota in populacao:
         rota_tuple = tuple(int(node) for node in rota)
-        rotas_individuais = [list(rota_tuple[i:j+1]) for i, j in zip([idx for idx, x in enumerate(rota_tuple) if x == 1][:-1], [idx for idx, x in enumerate(rota_tuple) if x == 1][1:])] #Divide as rotas por VE
+        visao = visao_rota(rota, data)  # Viagens por VE e suas cargas, calculadas uma vez por rota
         
         distancia_total = 0.0
-        for rot in rotas_individuais:
-            distancia_parcial = 0.0
-            gasto_capacidade = 0
-            consumo = 0
-
-            for i in range(len(rot) - 1):
-                x1, y1 = data['NODE_COORD_SECTION'][rot[i]]
-                x2, y2 = data['NODE_COORD_SECTION'][rot[i + 1]]
-                dist = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-                #consumo += 
-                distancia_parcial += dist
-
     #1.para cada rota de VE, a demanda total de clientes não excede a capacidade máxima de carga (C) do VE;
     #2. para cada rota de VE, o consumo total de energia não excede o nível máximo de carga da bateria (Q) do VE;
-            for cliente in rot:
-                gasto_capacidade += data['DEMAND_SECTION'][cliente]
-                consumo
-            if gasto_capacidade > data['CAPACITY']:
-                print(f"Erro: capacidade elevada de {gasto_capacidade} na rota: {rot}")
-                distancia_total += 800
-    
-
-
+        for k in np.flatnonzero(~visao.viavel_carga):
+            print(f"Erro: capacidade elevada de {visao.carga[k]} na rota: {visao.viagem(k).tolist()}")
+            distancia_total += 800
 
         fitness[rota_tuple] = 1 / (distancia_total + 1e-6)  # +1e-6 evita divisão por zero
     return fitness
 
-def avaliacao_rankeamento(populacao, data):
+def avaliacao_rankeamento(populacao, data, cache=None):
     """
     Calcula fitness baseado na posição no ranking de distâncias.
     - Rotas mais curtas têm fitness proporcional ao quadrado do ranking.
-    - Retorna: {rota_tuple: fitness}
+    - cache: CacheAvaliacao opcional, consultado antes de avaliar
+    - Retorna: array de fitness alinhado com a população
     """
-    distancias = {}
-    for rota in populacao:
-        rota_tuple = tuple(int(node) for node in rota)
-        distancia_total = 0.0
-        for i in range(len(rota) - 1):
-            x1, y1 = data['NODE_COORD_SECTION'][rota[i]]
-            x2, y2 = data['NODE_COORD_SECTION'][rota[i + 1]]
-            distancia_total += math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-        distancias[rota_tuple] = distancia_total
-    
-    # Ordena rotas pela distância (menor = melhor)
-    rotas_ordenadas = sorted(distancias.keys(), key=lambda x: distancias[x])
-    
-    # Atribui fitness baseado no ranking (melhor rank = maior fitness)
-    fitness = {}
-    for rank, rota in enumerate(rotas_ordenadas):
-        fitness[rota] = (len(rotas_ordenadas) - rank) ** 2  # Quadrado do ranking inverso
-    
-    # Normaliza para somar 1 (opcional)
-    total = sum(fitness.values())
-    if total > 0:
-        fitness = {rota: val / total for rota, val in fitness.items()}
-    
-    return fitness
-
+    return fitness_por_rankeamento(_objetivos(populacao, data, avaliar_distancias_lote, cache))
@@ -14,4 +14,6 @@ from .mutation import *
 from .replacement import *
 from .crossover_int import *
 from .mutation_int import *
-from .mutation_rest import *
\ No newline at end of file
+from .mutation_rest import *
+from .local_search import *
+from .giant_tour import *
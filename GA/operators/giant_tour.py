@@ -0,0 +1,115 @@
+"""
+Operadores da representação giant tour
+
+O cromossomo é uma permutação dos clientes, sem depósitos nem estações; a rota completa é
+obtida por decodificar_giant_tour (split de Prins + inserção de estações). Como toda
+permutação é válida, crossover e mutação não precisam de reparo.
+"""
+import numpy as np
+import random
+from ..utils.export import *
+from .crossover_int import crossovers_permutacao
+
+def criar_giant_tour(data):
+    """Permutação aleatória dos clientes (2 até DIMENSION)."""
+    clientes = list(range(2, data['DIMENSION'] + 1))
+    random.shuffle(clientes)
+    return np.array(clientes)
+
+def rota_para_giant_tour(rota, data):
+    """Giant tour de uma rota completa: os clientes na ordem em que aparecem (primeira ocorrência)."""
+    instancia = compilar_instancia(data)
+    vistos = set()
+    permutacao = []
+    for no in rota:
+        no = int(no)
+        if not instancia.eh_recarga[no] and no not in vistos:
+            vistos.add(no)
+            permutacao.append(no)
+    return np.array(permutacao)
+
+def crossover_ox_permutacao(pai1, pai2, saida=None):
+    """
+    Order crossover (OX) em O(n): o filho herda pai1[a..b] e completa as demais posições,
+    a partir de b+1 e circularmente, com os clientes de pai2 na ordem em que aparecem
+    a partir de b+1.
+    saida: array do tamanho dos pais que recebe o filho (ex.: linha da ArenaPopulacao)
+    """
+    n = len(pai1)
+    filho = np.empty_like(pai1) if saida is None else saida
+    if n < 2:
+        filho[:] = pai1
+        return filho
+    a, b = sorted(random.sample(range(n), 2))
+    filho[a:b+1] = pai1[a:b+1]
+    herdado = np.zeros(max(pai1.max(), pai2.max()) + 1, dtype=bool)
+    herdado[pai1[a:b+1]] = True
+
+    ordem = np.roll(pai2, -(b + 1))
+    restantes = ordem[~herdado[ordem]]
+    posicoes = (np.arange(b + 1, b + 1 + len(restantes)) % n)
+    filho[posicoes] = restantes
+    return filho
+
+def crossover_giant_tour(pais, taxa_crossover=1.0, tipo='OX', destino=None):
+    """
+    Cruza os pais dois a dois, gerando dois filhos por casal.
+    Args:
+        tipo: 'OX', 'PMX', 'CX' ou 'ERX' (crossovers_permutacao de crossover_int)
+        destino: Arrays que recebem os filhos no lugar, um por filho (ex.: linhas reservadas
+            com ArenaPopulacao.alocar); None cria arrays novos
+    """
+    operador = crossover_ox_permutacao if tipo == 'OX' else crossovers_permutacao[tipo]
+    if destino is None:
+        filhos = []
+        for pai1, pai2 in zip(pais[::2], pais[1::2]):
+            if random.random() < taxa_crossover:
+                filhos.extend([operador(pai1, pai2), operador(pai2, pai1)])
+            else:
+                filhos.extend([pai1.copy(), pai2.copy()])
+        return filhos
+
+    for k, (pai1, pai2) in enumerate(zip(pais[::2], pais[1::2])):
+        filho1, filho2 = destino[2*k], destino[2*k+1]
+        if random.random() >= taxa_crossover:
+            filho1[:], filho2[:] = pai1, pai2
+        elif tipo == 'OX':
+            crossover_ox_permutacao(pai1, pai2, filho1)
+            crossover_ox_permutacao(pai2, pai1, filho2)
+        else:
+            filho1[:] = operador(pai1, pai2)
+            filho2[:] = operador(pai2, pai1)
+    return destino
+
+def mutacao_giant_tour(permutacao, metodo='inversao', taxa_mutacao=0.1, no_lugar=False):
+    """
+    Mutação de permutação sobre o giant tour inteiro (todas as posições são clientes).
+    Args:
+        metodo: 'swap', 'inversao', 'scramble' ou 'insercao'
+        no_lugar: Se True, altera a própria permutação (ex.: linha da ArenaPopulacao) em vez de uma cópia
+    """
+    mutado = permutacao if no_lugar else permutacao.copy()
+    if random.random() > taxa_mutacao or len(mutado) < 2:
+        return mutado
+
+    i, j = sorted(random.sample(range(len(mutado)), 2))
+    if metodo == 'swap':
+        mutado[i], mutado[j] = mutado[j], mutado[i]
+    elif metodo == 'inversao':
+        mutado[i:j+1] = mutado[i:j+1][::-1]
+    elif metodo == 'scramble':
+        trecho = mutado[i:j+1]
+        np.random.shuffle(trecho)
+    elif metodo == 'insercao':
+        if random.random() < 0.5:
+            i, j = j, i
+        # Remove a posição i e insere o nó em j da permutação sem ele, deslocando o trecho entre os dois
+        no = mutado[i]
+        if i < j:
+            mutado[i:j] = mutado[i+1:j+1].copy()
+        else:
+            mutado[j+1:i+1] = mutado[j:i].copy()
+        mutado[j] = no
+    else:
+        raise ValueError(f"Método de mutação '{metodo}' não suportado para giant tour")
+    return mutado
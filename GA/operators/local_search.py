@@ -0,0 +1,229 @@
+"""
+Busca local entre sub-rotas (memética)
+
+A rota é separada nas viagens depósito -> depósito e cada cliente só tenta movimentos
+que o deixam ao lado de um dos seus k vizinhos mais próximos que está em outra viagem
+(listas granulares da instância):
+- relocate / Or-opt: move um trecho de 1 a 3 clientes para junto do vizinho
+- swap: troca o cliente com o cliente ao lado do vizinho
+- 2-opt*: troca as caudas das duas viagens, ligando o cliente ao vizinho
+
+Cada viagem é um PerfilRota (acumulados por posição de carga, número de clientes, energia desde
+a última recarga e energia até a próxima), então a distância, a capacidade e a bateria de um movimento
+são verificadas em O(1). As estações já presentes na rota ficam onde estão.
+"""
+import numpy as np
+import random
+from ..utils.export import *
+
+def separar_viagens(rota):
+    """Separa a rota nas viagens depósito -> depósito (listas que começam e terminam em 1), sem viagens vazias."""
+    viagens = []
+    atual = [1]
+    for no in list(rota)[1:]:
+        atual.append(int(no))
+        if no == 1:
+            if len(atual) > 2:
+                viagens.append(atual)
+            atual = [1]
+    return viagens
+
+def juntar_viagens(viagens):
+    """Reconstrói a rota (np.array) a partir das viagens, ignorando as que não têm clientes."""
+    rota = [1]
+    for viagem in viagens:
+        rota.extend(viagem[1:])
+    return np.array(rota)
+
+class _BuscaLocal:
+    """Estado da busca local sobre as viagens de uma rota."""
+
+    def __init__(self, viagens, data, k, num_rotas_min):
+        self.instancia = compilar_instancia(data)
+        self.distancias = self.instancia.distancias
+        self.energia = self.instancia.energia
+        self.demanda = self.instancia.demanda
+        self.eh_recarga = self.instancia.eh_recarga
+        self.capacidade = self.instancia.capacidade
+        self.bateria = self.instancia.energia_capacidade + 1e-9
+        self.vizinhos = self.instancia.vizinhos_proximos(k)
+        self.num_rotas_min = num_rotas_min
+
+        self.viagens = [PerfilRota(nos, self.instancia) for nos in viagens]
+        self.viagem_de = {}
+        self.posicao = {}
+        for v in range(len(self.viagens)):
+            self._indexar(v)
+
+    def _indexar(self, v):
+        for p, no in enumerate(self.viagens[v].nos):
+            if not self.eh_recarga[no]:
+                self.viagem_de[no] = v
+                self.posicao[no] = p
+
+    def _atualizar(self, *indices):
+        for v in indices:
+            self.viagens[v].atualizar(self.viagens[v].nos)
+            self._indexar(v)
+
+    def _pode_esvaziar(self):
+        """Uma viagem só pode ficar sem clientes se ainda sobrarem num_rotas_min viagens."""
+        return sum(viagem.n_clientes > 0 for viagem in self.viagens) > self.num_rotas_min
+
+    # ----- relocate / Or-opt -----
+    def _relocate(self, va, p, tamanho, vb, q):
+        """
+        Move os clientes A[p..p+tamanho-1] para entre B[q] e B[q+1].
+        Returns:
+            delta da distância, ou None se o movimento é inviável
+        """
+        A, B = self.viagens[va], self.viagens[vb]
+        a, b = A.nos, B.nos
+        fim = p + tamanho - 1
+        if fim >= len(a) - 1 or q >= len(b) - 1:
+            return None
+        for s in range(p, fim + 1):
+            if self.eh_recarga[a[s]]:
+                return None
+        # Viagem B com o trecho entre b[q] e b[q+1]
+        if not B.pode_inserir_trecho(q, A, p, fim):
+            return None
+        if A.n_clientes == tamanho and not self._pode_esvaziar():
+            return None
+        # Viagem A sem o trecho: a[..p-1] ligado a a[fim+1..] (a carga só diminui)
+        if not A.pode_concatenar(p - 1, A, fim + 1, capacidade=max(self.capacidade, A.carga)):
+            return None
+
+        D = self.distancias
+        return (D[a[p-1], a[fim+1]] - D[a[p-1], a[p]] - D[a[fim], a[fim+1]] +
+                D[b[q], a[p]] + D[a[fim], b[q+1]] - D[b[q], b[q+1]])
+
+    def _aplicar_relocate(self, va, p, tamanho, vb, q):
+        a, b = self.viagens[va].nos, self.viagens[vb].nos
+        trecho = a[p:p+tamanho]
+        del a[p:p+tamanho]
+        b[q+1:q+1] = trecho
+        self._atualizar(va, vb)
+
+    # ----- swap -----
+    def _swap(self, va, p, vb, q):
+        """Troca a[p] e b[q] (dois clientes de viagens diferentes). Returns: delta ou None."""
+        A, B = self.viagens[va], self.viagens[vb]
+        a, b = A.nos, B.nos
+        u, w = a[p], b[q]
+        if self.eh_recarga[w]:
+            return None
+        diferenca = self.demanda[w] - self.demanda[u]
+        if A.carga + diferenca > max(self.capacidade, A.carga) or B.carga - diferenca > max(self.capacidade, B.carga):
+            return None
+
+        D, E = self.distancias, self.energia
+        if A.energia_desde[p-1] + E[a[p-1], w] + E[w, a[p+1]] + A.energia_ate[p+1] > self.bateria:
+            return None
+        if B.energia_desde[q-1] + E[b[q-1], u] + E[u, b[q+1]] + B.energia_ate[q+1] > self.bateria:
+            return None
+
+        return (D[a[p-1], w] + D[w, a[p+1]] - D[a[p-1], u] - D[u, a[p+1]] +
+                D[b[q-1], u] + D[u, b[q+1]] - D[b[q-1], w] - D[w, b[q+1]])
+
+    def _aplicar_swap(self, va, p, vb, q):
+        a, b = self.viagens[va].nos, self.viagens[vb].nos
+        a[p], b[q] = b[q], a[p]
+        self._atualizar(va, vb)
+
+    # ----- 2-opt* -----
+    def _dois_opt_estrela(self, va, p, vb, q):
+        """
+        Troca as caudas: A' = a[..p] + b[q+1..], B' = b[..q] + a[p+1..].
+        Returns: delta ou None.
+        """
+        A, B = self.viagens[va], self.viagens[vb]
+        a, b = A.nos, B.nos
+        if p < 0 or q < 0 or p >= len(a) - 1 or q >= len(b) - 1:
+            return None
+        clientes_a = A.clientes_prefixo[p] + B.n_clientes - B.clientes_prefixo[q]
+        clientes_b = B.clientes_prefixo[q] + A.n_clientes - A.clientes_prefixo[p]
+        if (clientes_a == 0 or clientes_b == 0) and not self._pode_esvaziar():
+            return None
+        # Uma viagem já acima da capacidade pode receber a troca se não piorar
+        if not A.pode_concatenar(p, B, q + 1, capacidade=max(self.capacidade, A.carga)):
+            return None
+        if not B.pode_concatenar(q, A, p + 1, capacidade=max(self.capacidade, B.carga)):
+            return None
+
+        D = self.distancias
+        return D[a[p], b[q+1]] + D[b[q], a[p+1]] - D[a[p], a[p+1]] - D[b[q], b[q+1]]
+
+    def _aplicar_dois_opt_estrela(self, va, p, vb, q):
+        a, b = self.viagens[va].nos, self.viagens[vb].nos
+        self.viagens[va].nos, self.viagens[vb].nos = a[:p+1] + b[q+1:], b[:q+1] + a[p+1:]
+        self._atualizar(va, vb)
+
+    def melhorar_cliente(self, u, max_trecho):
+        """Aplica o primeiro movimento que melhora a distância envolvendo u. Returns: True se aplicou."""
+        va, p = self.viagem_de[u], self.posicao[u]
+        for c in self.vizinhos[u]:
+            vb = self.viagem_de.get(c)
+            if vb is None or vb == va:
+                continue
+            q = self.posicao[c]
+
+            # relocate / Or-opt: trecho começando em u para depois ou antes de c
+            for tamanho in range(1, max_trecho + 1):
+                for destino in (q, q - 1):
+                    delta = self._relocate(va, p, tamanho, vb, destino)
+                    if delta is not None and delta < -1e-9:
+                        self._aplicar_relocate(va, p, tamanho, vb, destino)
+                        return True
+
+            # swap: u ocupa o lugar do cliente ao lado de c
+            for vizinho_c in (q - 1, q + 1):
+                delta = self._swap(va, p, vb, vizinho_c)
+                if delta is not None and delta < -1e-9:
+                    self._aplicar_swap(va, p, vb, vizinho_c)
+                    return True
+
+            # 2-opt*: cria o arco u -> c ou o arco c -> u
+            for pa, pb in ((p, q - 1), (p - 1, q)):
+                delta = self._dois_opt_estrela(va, pa, vb, pb)
+                if delta is not None and delta < -1e-9:
+                    self._aplicar_dois_opt_estrela(va, pa, vb, pb)
+                    return True
+        return False
+
+def busca_local_inter_rotas(rota, data, k=10, max_trecho=3, max_passadas=20, num_rotas_min=1):
+    """
+    Busca local de primeira melhoria entre viagens (relocate, swap, 2-opt* e Or-opt).
+    Repete passadas sobre os clientes (em ordem aleatória) até uma passada sem melhoria
+    ou max_passadas. Nenhum movimento aumenta a violação de capacidade ou cria uma perna
+    acima da bateria.
+    Args:
+        k: Tamanho das listas de vizinhos candidatos
+        max_trecho: Maior trecho movido pelo Or-opt (1 = só relocate)
+        num_rotas_min: Número mínimo de viagens com clientes a manter
+    Returns:
+        Nova rota (np.array)
+    """
+    viagens = separar_viagens(rota)
+    instancia = compilar_instancia(data)
+    clientes = [no for viagem in viagens for no in viagem if not instancia.eh_recarga[no]]
+    if len(viagens) < 2 or len(set(clientes)) != len(clientes):
+        return np.array(rota)  # Nada a trocar, ou rota com clientes repetidos (sem índice único)
+
+    busca = _BuscaLocal(viagens, instancia, k, num_rotas_min)
+    for _ in range(max_passadas):
+        random.shuffle(clientes)
+        melhorou = False
+        for u in clientes:
+            while busca.melhorar_cliente(u, max_trecho):
+                melhorou = True
+        if not melhorou:
+            break
+
+    return juntar_viagens([viagem.nos for viagem in busca.viagens if viagem.n_clientes > 0])
+
+def mutacao_busca_local(rota, data, taxa_mutacao=0.3, num_rotas_min=3, k=10):
+    """Aplica busca_local_inter_rotas com probabilidade taxa_mutacao (interface das mutações)."""
+    if random.random() > taxa_mutacao:
+        return rota.copy()
+    return busca_local_inter_rotas(rota, data, k=k, num_rotas_min=num_rotas_min)
@@ -3,20 +3,32 @@ import random
 from copy import deepcopy
 from ..utils.export import *
 
-def mutacao_bit_flip(filho_bin, taxa_mutacao=0.1):
+def mutacao_bit_flip(filho_bin, taxa_mutacao=0.1, rng=None):
     """
     Aplica mutação por bit flip em um cromossomo binário.
+    A máscara de Bernoulli é sorteada de uma vez para todos os bits, então filho_bin pode
+    ser um cromossomo ou um lote inteiro (matriz filhos × bits, ou pares × blocos × bits).
     Args:
-        filho_bin: Cromossomo binário (array numpy)
+        filho_bin: Cromossomo binário (array numpy) ou lote de cromossomos
         taxa_mutacao: Probabilidade de cada bit sofrer flip
+        rng: np.random.Generator (None = gerador global do numpy)
     Returns:
-        Cromossomo mutado (array numpy)
+        Cromossomo mutado (array numpy), com a mesma forma
     """
-    mutado = deepcopy(filho_bin)
-    for i in range(len(mutado)):
-        if random.random() < taxa_mutacao:
-            mutado[i] = 1 - mutado[i]  # Flip do bit
-    return mutado
+    gerador = np.random if rng is None else rng
+    filho_bin = np.asarray(filho_bin)
+    mascara = gerador.random(filho_bin.shape) < taxa_mutacao
+    return np.where(mascara, 1 - filho_bin, filho_bin)  # Flip dos bits sorteados
+
+def mutacao_bit_flip_compactada(filho_compactado, n_bits, taxa_mutacao=0.1, rng=None):
+    """
+    Bit flip sobre um cromossomo compactado (compactar_binario), ou uma matriz deles.
+    Sorteia de uma vez quais dos n_bits bits mudam, empacota a máscara e aplica com XOR;
+    os bits de preenchimento do último byte continuam 0.
+    """
+    gerador = np.random if rng is None else rng
+    mascara = compactar_binario(gerador.random(np.shape(filho_compactado)[:-1] + (n_bits,)) < taxa_mutacao)
+    return filho_compactado ^ mascara
 
 def mutacao_swap(filho, taxa_mutacao=0.1):
     """
@@ -89,10 +101,10 @@ def aplicar_mutacao(filhos, evrp_data, num_rotas_min=3, metodo='bit_flip', taxa_
     for filho in filhos:
         # Aplica mutação conforme o método escolhido
         if metodo == 'bit_flip':
-            # Para mutação binária, codifica/decodifica
+            # Para mutação binária, codifica/decodifica (XOR sobre o cromossomo compactado)
             filho_bin = codificar_rota_binaria(filho, evrp_data)
-            filho_bin_mutado = mutacao_bit_flip(filho_bin, taxa_mutacao)
-            filho_mutado = decodificar_rota_binaria(filho_bin_mutado, evrp_data)
+            filho_compactado = mutacao_bit_flip_compactada(compactar_binario(filho_bin), len(filho_bin), taxa_mutacao)
+            filho_mutado = decodificar_rota_binaria(descompactar_binario(filho_compactado, len(filho_bin)), evrp_data)
         elif metodo == 'swap':
             filho_mutado = mutacao_swap(filho, taxa_mutacao)
         elif metodo == 'inversao':
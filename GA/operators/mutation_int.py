@@ -3,23 +3,34 @@ import random
 from copy import deepcopy
 from ..utils.export import *
 
-def mutacao_swap(filho, taxa_mutacao=0.1):
-    """Troca duas posições não-depósito."""
+def mutacao_swap(filho, taxa_mutacao=0.1, data=None):
+    """
+    Troca duas posições não-depósito.
+    Se data for informado, a troca é avaliada pelo delta de distância (O(1)) e só é
+    aplicada se não piorar a rota; rejeitada, o próprio filho é devolvido sem cópia.
+    """
     if random.random() > taxa_mutacao or len(filho) < 3:
         return deepcopy(filho)
     
+    idx1, idx2 = random.sample([i for i in range(1, len(filho)-1) if filho[i] != 1], 2)
+    if data is not None and delta_swap(filho, idx1, idx2, compilar_instancia(data).distancias) > 0:
+        return filho
     mutado = deepcopy(filho)
-    idx1, idx2 = random.sample([i for i in range(1, len(mutado)-1) if mutado[i] != 1], 2)
     mutado[idx1], mutado[idx2] = mutado[idx2], mutado[idx1]
     return mutado
 
-def mutacao_inversao(filho, taxa_mutacao=0.1):
-    """Inverte uma subsequência."""
+def mutacao_inversao(filho, taxa_mutacao=0.1, data=None):
+    """
+    Inverte uma subsequência.
+    Com data, a inversão só é aplicada se o delta de distância não for positivo.
+    """
     if random.random() > taxa_mutacao or len(filho) < 4:
         return deepcopy(filho)
     
+    start, end = sorted(random.sample(range(1, len(filho)-1), 2))
+    if data is not None and delta_inversao(filho, start, end, compilar_instancia(data).distancias) > 0:
+        return filho
     mutado = deepcopy(filho)
-    start, end = sorted(random.sample(range(1, len(mutado)-1), 2))
     mutado[start:end+1] = mutado[start:end+1][::-1]
     return mutado
 
@@ -35,36 +46,42 @@ def mutacao_scramble(filho, taxa_mutacao=0.1):
     mutado[start:end+1] = subsequence
     return mutado
 
-def mutacao_insercao(filho, taxa_mutacao=0.1):
-    """Move um nó para outra posição (compatível com numpy.ndarray)."""
+def mutacao_insercao(filho, taxa_mutacao=0.1, data=None):
+    """
+    Move um nó para outra posição (compatível com numpy.ndarray).
+    Com data, o movimento só é aplicado se o delta de distância não for positivo.
+    """
     if random.random() > taxa_mutacao or len(filho) < 3:
         return deepcopy(filho)
     
-    mutado = filho.copy()  # Cria uma cópia do array numpy
-    
     # Encontra índices válidos (não depósito)
-    indices_validos = [i for i in range(1, len(mutado)-1) if mutado[i] != 1]
+    indices_validos = [i for i in range(1, len(filho)-1) if filho[i] != 1]
     
     if not indices_validos:  # Se não há nós para mover
-        return mutado
+        return filho.copy()
     
     idx = random.choice(indices_validos)
-    node = mutado[idx]
+    node = filho[idx]
     
-    # Remove o nó da posição original (numpy não tem pop, fazemos manualmente)
-    mutado = np.concatenate([mutado[:idx], mutado[idx+1:]])
+    # Escolhe nova posição (ajustada porque o array fica menor sem o nó)
+    new_pos = random.choice([i for i in range(1, len(filho)-1) if i != idx])
+    if data is not None and delta_insercao(filho, idx, new_pos, compilar_instancia(data).distancias) > 0:
+        return filho
     
-    # Escolhe nova posição (ajustada porque o array agora é menor)
-    new_pos = random.choice([i for i in range(1, len(mutado)) if i != idx])
+    # Remove o nó da posição original (numpy não tem pop, fazemos manualmente)
+    mutado = np.concatenate([filho[:idx], filho[idx+1:]])
     
     # Insere o nó na nova posição
     mutado = np.insert(mutado, new_pos, node)
     
     return mutado
 
-def aplicar_mutacao(filhos, evrp_data, num_rotas_min=3, metodo='swap', taxa_mutacao=0.1, estacao=False):
+def aplicar_mutacao(filhos, evrp_data, num_rotas_min=3, metodo='swap', taxa_mutacao=0.1, estacao=False,
+                    somente_melhoria=False):
     """
     Aplica mutação e repara os filhos.
+    Com somente_melhoria=True, swap/inversao/insercao só aceitam movimentos que não
+    aumentam a distância (avaliados por delta, sem reavaliar a rota inteira).
     """
     mutacoes = {
         'swap': mutacao_swap,
@@ -75,8 +92,82 @@ def aplicar_mutacao(filhos, evrp_data, num_rotas_min=3, metodo='swap', taxa_muta
     
     filhos_mutados = []
     for filho in filhos:
-        filho_mutado = mutacoes[metodo](filho, taxa_mutacao)
+        if somente_melhoria and metodo != 'scramble':
+            filho_mutado = mutacoes[metodo](filho, taxa_mutacao, evrp_data)
+        else:
+            filho_mutado = mutacoes[metodo](filho, taxa_mutacao)
         filho_reparado = reparar_filho(filho_mutado, filho, evrp_data, num_rotas_min, estacao)
         filhos_mutados.append(filho_reparado)
     
-    return filhos_mutados
\ No newline at end of file
+    return filhos_mutados
+
+def mutacao_lote(rotas, comprimentos, metodo='swap', taxa_mutacao=0.1, rng=None):
+    """
+    Mutação de todas as rotas de uma matriz preenchida (empacotar_populacao) de uma vez.
+    Cada método vira uma matriz de índices de origem (take_along_axis), sem laço por rota.
+    As posições evitam o primeiro e o último nó e, no swap e na inserção, o nó movido
+    nunca é um depósito, como nas mutações individuais.
+    Args:
+        metodo: 'swap', 'inversao', 'scramble' ou 'insercao'
+        rng: np.random.Generator (None = gerador global do numpy)
+    Returns:
+        Nova matriz (os tamanhos das rotas não mudam)
+    """
+    gerador = np.random if rng is None else rng
+    rotas = np.asarray(rotas)
+    m = np.asarray(comprimentos)
+    n, L = rotas.shape
+    k = np.arange(L)
+    linhas = np.arange(n)
+    ativo = gerador.random(n) < taxa_mutacao
+    origem = np.broadcast_to(k, (n, L)).copy()
+
+    if metodo in ('swap', 'insercao'):
+        # Nó movido: posição interna que não é depósito (menor chave aleatória)
+        validas = (k >= 1) & (k < (m - 1)[:, None]) & (rotas != 1)
+        chaves = np.where(validas, gerador.random((n, L)), np.inf)
+        if metodo == 'swap':
+            ativo &= validas.sum(axis=1) >= 2
+            i, j = np.argpartition(chaves, 1, axis=1)[:, :2].T
+            origem[linhas[ativo], i[ativo]] = j[ativo]
+            origem[linhas[ativo], j[ativo]] = i[ativo]
+        else:
+            ativo &= (validas.sum(axis=1) >= 1) & (m >= 4)
+            i = np.argmin(chaves, axis=1)
+            # Nova posição (convenção de np.insert na rota sem o nó): [1, m-2] sem i
+            j = 1 + (gerador.random(n) * (m - 3)).astype(np.int64)
+            j += j >= i
+            i, j = i[:, None], j[:, None]
+            origem = np.where((j >= i) & (k >= i) & (k < j), k + 1, origem)
+            origem = np.where((j < i) & (k > j) & (k <= i), k - 1, origem)
+            origem = np.where(k == j, i, origem)
+            origem[~ativo] = k
+    elif metodo in ('inversao', 'scramble'):
+        # Trecho [a, b] com a < b sorteados em [1, m-2]
+        ativo &= m >= 4
+        a = 1 + (gerador.random(n) * (m - 2)).astype(np.int64)
+        b = 1 + (gerador.random(n) * (m - 3)).astype(np.int64)
+        b += b >= a
+        a, b = np.minimum(a, b)[:, None], np.maximum(a, b)[:, None]
+        trecho = (k >= a) & (k <= b) & ativo[:, None]
+        if metodo == 'inversao':
+            origem = np.where(trecho, a + b - k, origem)
+        else:
+            # Chaves aleatórias dentro de (a-1, b+1) só embaralham o trecho no argsort
+            chaves = np.where(trecho, a - 0.5 + gerador.random((n, L)) * (b - a + 1), k)
+            origem = np.argsort(chaves, axis=1, kind='stable')
+    else:
+        raise ValueError(f"Método de mutação '{metodo}' não suportado")
+
+    return np.take_along_axis(rotas, origem, axis=1)
+
+def aplicar_mutacao_lote(filhos, evrp_data, num_rotas_min=3, metodo='swap', taxa_mutacao=0.1, estacao=False, rng=None):
+    """
+    Versão em lote de aplicar_mutacao (mesmo contrato): os filhos são empilhados,
+    mutados juntos por mutacao_lote e reparados pela etapa de reparo (reparar_lote).
+    """
+    if not len(filhos):
+        return []
+    rotas, comprimentos = empacotar_populacao(filhos)
+    mutados = mutacao_lote(rotas, comprimentos, metodo, taxa_mutacao, rng)
+    return reparar_lote(mutados, comprimentos, filhos, evrp_data, num_rotas_min, estacao)
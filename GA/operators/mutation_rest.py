@@ -1,9 +1,13 @@
 import numpy as np
 import random
+import math
+from collections import deque
 from copy import deepcopy
 from ..utils.export import *
 
 def crossover_nn(pai1, pai2, data, matriz_prioridade, num_rotas_min = 3):
+    instancia = compilar_instancia(data)
+    distancias = instancia.distancias
     # 1. Extrai sub-rotas viáveis dos pais (já considera bateria/carga)
     subrotas_pai1 = extrair_subrotas_viáveis(pai1, data)
     subrotas_pai2 = extrair_subrotas_viáveis(pai2, data)
@@ -32,13 +36,7 @@ def crossover_nn(pai1, pai2, data, matriz_prioridade, num_rotas_min = 3):
             
             # Se não encontrar, pega a sub-rota mais próxima manualmente
             if subrota_escolhida is None:
-                distâncias = [
-                    math.sqrt(
-                        (data['NODE_COORD_SECTION'][último_ponto][0] - data['NODE_COORD_SECTION'][subrota[0]][0])**2 +
-                        (data['NODE_COORD_SECTION'][último_ponto][1] - data['NODE_COORD_SECTION'][subrota[0]][1])**2
-                    )
-                    for subrota in todas_subrotas
-                ]
+                distâncias = [distancias[último_ponto, subrota[0]] for subrota in todas_subrotas]
                 subrota_escolhida = todas_subrotas[np.argmin(distâncias)]
         
         except (ValueError, KeyError):
@@ -52,22 +50,10 @@ def crossover_nn(pai1, pai2, data, matriz_prioridade, num_rotas_min = 3):
         # Verifica se precisa inserir uma estação de recarga
         if len(filho) > 1:
             último_ponto = filho[-1]
-            dist_ao_depósito = math.sqrt(
-                (data['NODE_COORD_SECTION'][último_ponto][0] - data['NODE_COORD_SECTION'][1][0])**2 +
-                (data['NODE_COORD_SECTION'][último_ponto][1] - data['NODE_COORD_SECTION'][1][1])**2
-            )
-            consumo = data['ENERGY_CONSUMPTION'] * dist_ao_depósito
+            consumo = instancia.energia[último_ponto, 1]
             
             if consumo > data['ENERGY_CAPACITY'] * 0.8:  # Bateria crítica
-                estações = data['STATIONS_COORD_SECTION'] + [1]
-                estação_próxima = min(
-                    estações,
-                    key=lambda e: math.sqrt(
-                        (data['NODE_COORD_SECTION'][último_ponto][0] - data['NODE_COORD_SECTION'][e][0])**2 +
-                        (data['NODE_COORD_SECTION'][último_ponto][1] - data['NODE_COORD_SECTION'][e][1])**2
-                    )
-                )
-                filho.append(estação_próxima)
+                filho.append(escolher_estacao_proxima(último_ponto, data, com_deposito=True))
     
     filho.append(1)  # Fecha a rota
     # Antes do return, verifica balanceamento
@@ -96,27 +82,28 @@ def aplicar_balanceamento_light(rota, data):
     return reconstruir_rota(subrotas, data)
 
 def extrair_subrotas_viáveis(rota, data):
+    # Consumos dos arcos e demandas vêm da VisaoRota da rota (calculados uma vez por rota)
+    visao = visao_rota(rota, data)
+    nos = visao.rota.tolist()
+    consumos = visao.energia_arcos.tolist()
+    demandas = visao.instancia.demanda[visao.rota].tolist()
     subrotas = []
     subrota_atual = []
     bateria = data['ENERGY_CAPACITY']
     carga = data['CAPACITY']
     
-    for i in range(1, len(rota) - 1):
-        nó = rota[i]
-        próximo_nó = rota[i+1]
+    for i in range(1, len(nos) - 1):
+        nó = nos[i]
         
         # Calcula consumo
-        dist = math.sqrt(
-            (data['NODE_COORD_SECTION'][nó][0] - data['NODE_COORD_SECTION'][próximo_nó][0])**2 +
-            (data['NODE_COORD_SECTION'][nó][1] - data['NODE_COORD_SECTION'][próximo_nó][1])**2
-        )
-        consumo = data['ENERGY_CONSUMPTION'] * dist
+        consumo = consumos[i]
+        demanda = demandas[i+1]
         
         # Verifica viabilidade
-        if (bateria - consumo > 0) and (carga - data['DEMAND_SECTION'].get(próximo_nó, 0) > 0):
+        if (bateria - consumo > 0) and (carga - demanda > 0):
             subrota_atual.append(nó)
             bateria -= consumo
-            carga -= data['DEMAND_SECTION'].get(próximo_nó, 0)
+            carga -= demanda
         else:
             if subrota_atual:
                 subrotas.append(subrota_atual)
@@ -138,14 +125,17 @@ def crossover_balanceador(pai1, pai2, data, matriz_prioridade, num_rotas_min):
     subrotas_pai2 = extrair_subrotas_viáveis(pai2, data)
     
     # 2. Analisa desbalanceamento (rotas com muitos/poucos clientes)
-    media_clientes = (len([n for n in pai1 if n not in data['STATIONS_COORD_SECTION'] and n != 1]) + 
-                     len([n for n in pai2 if n not in data['STATIONS_COORD_SECTION'] and n != 1])) / (len(subrotas_pai1) + len(subrotas_pai2))
+    eh_recarga = compilar_instancia(data).eh_recarga
+    media_clientes = (int(np.count_nonzero(~eh_recarga[np.asarray(pai1)])) + 
+                     int(np.count_nonzero(~eh_recarga[np.asarray(pai2)]))) / (len(subrotas_pai1) + len(subrotas_pai2))
     
     # 3. Seleciona doadores (rotas com > média+1 clientes) e receptores
     doadores = [r for r in subrotas_pai1 + subrotas_pai2 if len(r) > media_clientes + 1]
     receptores = [r for r in subrotas_pai1 + subrotas_pai2 if len(r) < media_clientes]
     
-    # 4. Processa transferências
+    # 4. Processa transferências (perfis dos receptores evitam re-simular a sub-rota a cada teste)
+    deposito = compilar_instancia(data).deposito
+    perfis = {id(r): PerfilRota([deposito] + r, data) for r in receptores}
     for doador in doadores:
         if not receptores:
             break
@@ -160,9 +150,10 @@ def crossover_balanceador(pai1, pai2, data, matriz_prioridade, num_rotas_min):
         )
         
         # Transfere se mantiver viabilidade
-        if verificar_viabilidade_transferencia(cliente, doador, receptor, data):
+        if verificar_viabilidade_transferencia(cliente, doador, receptor, data, perfis[id(receptor)]):
             doador.remove(cliente)
             receptor.append(cliente)
+            perfis[id(receptor)].anexar(cliente)
             receptores.remove(receptor) if len(receptor) >= media_clientes else None
     
     # 5. Reconstrói os filhos
@@ -207,50 +198,24 @@ def calcular_custo_insercao(cliente, subrota, data):
         custos.append(calcular_distancia_subrota(nova_sub, data))
     return min(custos)
 
-def verificar_viabilidade_transferencia(cliente, doador, receptor, data):
-    """Verifica restrições de capacidade e bateria de forma robusta"""
+def verificar_viabilidade_transferencia(cliente, doador, receptor, data, perfil=None):
+    """
+    Verifica restrições de capacidade e bateria de forma robusta.
+    O receptor é simulado como depósito -> clientes -> cliente novo -> depósito, usando a energia
+    já gasta desde a última recarga (PerfilRota), então a verificação é O(1) quando o perfil
+    do receptor é informado (e atualizado com anexar a cada transferência).
+    """
     try:
-        demanda = data['DEMAND_SECTION'].get(cliente, 0)
-        
-        # Verifica capacidade (ignora estações/depósito)
-        carga_receptor = sum(data['DEMAND_SECTION'].get(c, 0) for c in receptor) + demanda
-        if carga_receptor > data['CAPACITY']:
-            return False
-        
-        # Verifica bateria (rota simulada: último ponto -> cliente -> depósito)
-        if len(receptor) > 0:
-            ultimo_ponto = receptor[-1]
-        else:
-            ultimo_ponto = 1  # Depósito
-            
-        dist1 = calcular_distancia([ultimo_ponto, cliente], data)
-        dist2 = calcular_distancia([cliente, 1], data)
-        consumo_total = data['ENERGY_CONSUMPTION'] * (dist1 + dist2)
-        
-        return consumo_total <= data['ENERGY_CAPACITY']
+        if perfil is None:
+            perfil = PerfilRota([compilar_instancia(data).deposito] + list(receptor), data)
+        return perfil.pode_anexar(cliente)
     
-    except KeyError:
+    except (KeyError, IndexError):
         return False
 
 def avaliar_viabilidade_bateria(rota, data):
-    """Verifica se uma rota é viável em termos de bateria"""
-    bateria = data['ENERGY_CAPACITY']
-    
-    for i in range(len(rota)-1):
-        origem = rota[i]
-        destino = rota[i+1]
-        distancia = calcular_distancia([origem, destino], data)
-        consumo = data['ENERGY_CONSUMPTION'] * distancia
-        
-        # Verifica se chegou em estação ou depósito
-        if destino in data['STATIONS_COORD_SECTION'] + [1]:
-            bateria = data['ENERGY_CAPACITY']  # Recarrega
-        else:
-            bateria -= consumo
-            if bateria < 0:
-                return False
-    
-    return True
+    """Verifica se uma rota é viável em termos de bateria (nenhuma perna entre recargas esgota a bateria)"""
+    return PerfilRota(rota, data).viavel_bateria
 
 def reconstruir_rota(subrotas, data):
     """Reconstrói a rota completa com recargas"""
@@ -261,7 +226,7 @@ def reconstruir_rota(subrotas, data):
         for cliente in sub:
             distancia = calcular_distancia([rota[-1], cliente], data)
             if bateria - data['ENERGY_CONSUMPTION'] * distancia < 0:
-                estacao = escolher_estacao_proxima(rota[-1], data)
+                estacao = escolher_estacao_proxima(rota[-1], data, cliente, bateria)
                 rota.append(estacao)
                 bateria = data['ENERGY_CAPACITY']
             rota.append(cliente)
@@ -280,8 +245,9 @@ def mutacao_otimiza_rota(rota, data, matriz_prioridade, taxa_mutacao=0.3, num_ro
     # 1. Extrai sub-rotas entre depósitos/estações
     subrotas = []
     subrota_atual = []
+    eh_recarga = compilar_instancia(data).eh_recarga
     for node in rota_mutada[1:-1]:  # Ignora o primeiro e último depósito
-        if node == 1 or node in data['STATIONS_COORD_SECTION']:
+        if eh_recarga[node]:
             if subrota_atual:
                 subrotas.append(subrota_atual)
                 subrota_atual = []
@@ -290,12 +256,7 @@ def mutacao_otimiza_rota(rota, data, matriz_prioridade, taxa_mutacao=0.3, num_ro
     if subrota_atual:
         subrotas.append(subrota_atual)
     
-    # 2. Otimiza cada sub-rota
-    for i in range(len(subrotas)):
-        if len(subrotas[i]) > 2:
-            subrotas[i] = aplicar_2opt(subrotas[i], data)
-    
-    # 3. Reconstrói a rota otimizada
+    # 2. Reconstrói a rota otimizada
     rota_otimizada = [1]
     bateria = data['ENERGY_CAPACITY']
     carga = data['CAPACITY']
@@ -304,8 +265,10 @@ def mutacao_otimiza_rota(rota, data, matriz_prioridade, taxa_mutacao=0.3, num_ro
         if not subrota:
             continue
             
-        # Ordena usando matriz de prioridade
+        # Ordena usando matriz de prioridade e otimiza essa ordem com 2-opt (caminho aberto)
         subrota_ordenada = ordenar_por_prioridade(rota_otimizada[-1], subrota, matriz_prioridade, data)
+        if len(subrota_ordenada) > 2:
+            subrota_ordenada = aplicar_2opt(subrota_ordenada, data)
         
         # Adiciona clientes verificando restrições
         for cliente in subrota_ordenada:
@@ -315,7 +278,7 @@ def mutacao_otimiza_rota(rota, data, matriz_prioridade, taxa_mutacao=0.3, num_ro
             
             # Verifica se precisa recarregar antes
             if bateria - consumo < 0:
-                estacao = escolher_estacao_proxima(rota_otimizada[-1], data)
+                estacao = escolher_estacao_proxima(rota_otimizada[-1], data, cliente, bateria)
                 rota_otimizada.append(estacao)
                 bateria = data['ENERGY_CAPACITY']
             
@@ -334,22 +297,82 @@ def mutacao_otimiza_rota(rota, data, matriz_prioridade, taxa_mutacao=0.3, num_ro
     rota_otimizada = aplicar_restricao(rota_otimizada, data, num_rotas_min)
     return np.array(rota_otimizada)
 
-def aplicar_2opt(subrota, data):
-    """Implementação completa do 2-opt para uma sub-rota"""
-    melhor_subrota = subrota.copy()
-    melhor_distancia = calcular_distancia_subrota(subrota, data)
-    
-    for i in range(1, len(subrota)-1):
-        for j in range(i+1, len(subrota)):
-            # Cria nova sub-rota invertendo o segmento i-j
-            nova_subrota = subrota[:i] + subrota[i:j+1][::-1] + subrota[j+1:]
-            nova_distancia = calcular_distancia_subrota(nova_subrota, data)
+def aplicar_2opt(subrota, data, k=10):
+    """
+    2-opt de primeira melhoria para uma sub-rota (caminho aberto), repetido até o ótimo local.
+    Cada nó só tenta se ligar aos seus k vizinhos mais próximos (listas da instância) e usa
+    don't-look bits: um nó só volta à fila quando um dos seus arcos muda. O ganho de cada
+    movimento vem do delta dos dois arcos trocados; a sub-rota só é alterada ao aceitar.
+    """
+    instancia = compilar_instancia(data)
+    distancias = instancia.distancias
+    vizinhos = instancia.vizinhos_proximos(k)
+    caminho = list(subrota)
+    n = len(caminho)
+    if n < 3:
+        return caminho
+    
+    posicao = {no: p for p, no in enumerate(caminho)}
+    melhorou = True
+    while melhorou:
+        # Uma inversão pode criar melhorias para nós cujos arcos não mudaram (o trecho muda
+        # de sentido), então repete rodadas com todos os nós até uma rodada sem movimentos
+        melhorou = False
+        fila = deque(caminho)
+        na_fila = set(caminho)
+        
+        while fila:
+            no = fila.popleft()
+            na_fila.discard(no)
+            movimento = _melhoria_2opt(caminho, posicao, no, distancias, vizinhos[no])
+            if movimento is None:
+                continue  # don't-look bit: o nó fica fora da fila até um arco seu mudar
             
-            if nova_distancia < melhor_distancia:
-                melhor_subrota = nova_subrota
-                melhor_distancia = nova_distancia
-    
-    return melhor_subrota
+            melhorou = True
+            i, j = movimento
+            extremos = [caminho[p] for p in (i - 1, i, j, j + 1) if 0 <= p < n]
+            caminho[i:j+1] = caminho[i:j+1][::-1]
+            for p in range(i, j + 1):
+                posicao[caminho[p]] = p
+            for extremo in extremos + [no]:
+                if extremo not in na_fila:
+                    na_fila.add(extremo)
+                    fila.append(extremo)
+    
+    return caminho
+
+def _melhoria_2opt(caminho, posicao, no, distancias, vizinhos_no):
+    """
+    Primeiro 2-opt que melhora o caminho ligando no a um dos seus vizinhos.
+    Returns:
+        (i, j) do trecho a inverter, ou None se nenhum vizinho melhora
+    """
+    n = len(caminho)
+    i = posicao[no]
+    sucessor = caminho[i + 1] if i + 1 < n else None
+    antecessor = caminho[i - 1] if i > 0 else None
+    
+    for vizinho in vizinhos_no:
+        d_novo = distancias[no, vizinho]
+        ganho_sucessor = sucessor is not None and d_novo < distancias[no, sucessor]
+        ganho_antecessor = antecessor is not None and d_novo < distancias[antecessor, no]
+        if not (ganho_sucessor or ganho_antecessor):
+            break  # Vizinhos ordenados por distância: os próximos também não ajudam
+        j = posicao.get(vizinho)
+        if j is None:
+            continue
+        
+        # Liga no -> vizinho no lugar do arco (no, sucessor)
+        if ganho_sucessor:
+            inicio, fim = (i + 1, j) if j > i else (j + 1, i)
+            if fim > inicio and delta_2opt(caminho, inicio, fim, distancias) < -1e-10:
+                return inicio, fim
+        # Liga vizinho -> no no lugar do arco (antecessor, no)
+        if ganho_antecessor:
+            inicio, fim = (j, i - 1) if j < i else (i, j - 1)
+            if fim > inicio and delta_2opt(caminho, inicio, fim, distancias) < -1e-10:
+                return inicio, fim
+    return None
 
 def precisa_recarregar(rota_parcial, data):
     """Verifica se é necessário recarregar considerando o trajeto até o depósito"""
@@ -377,21 +400,31 @@ def calcular_distancia_subrota(subrota, data):
     return distancia
 
 def calcular_distancia(par_de_pontos, data):
-    """Calcula distância entre dois pontos"""
-    x1, y1 = data['NODE_COORD_SECTION'][par_de_pontos[0]]
-    x2, y2 = data['NODE_COORD_SECTION'][par_de_pontos[1]]
-    return math.sqrt((x2-x1)**2 + (y2-y1)**2)
+    """Calcula distância entre dois pontos (consulta na matriz pré-calculada da instância)"""
+    return compilar_instancia(data).distancias[par_de_pontos[0], par_de_pontos[1]]
 
-def escolher_estacao_proxima(ponto, data):
-    """Encontra a estação de recarga mais próxima"""
-    estações = data['STATIONS_COORD_SECTION']
-    if not estações:
+def escolher_estacao_proxima(ponto, data, proximo=None, bateria=None, com_deposito=False):
+    """
+    Encontra a estação de recarga para parar depois de ponto (tabelas pré-calculadas da instância).
+    Com proximo, prefere a estação de menor desvio entre ponto e proximo quando as duas pernas
+    cabem na bateria (a ida, na bateria restante se ela for informada); senão usa a estação
+    mais próxima de ponto (ou o ponto de recarga mais próximo, com com_deposito).
+    """
+    if not data['STATIONS_COORD_SECTION']:
         return 1  # Retorna ao depósito se não houver estações
     
-    return min(
-        estações,
-        key=lambda e: calcular_distancia([ponto, e], data)
-    )
+    instancia = compilar_instancia(data)
+    if proximo is not None and instancia.volta_estacao_viavel[ponto, proximo]:
+        estacao = instancia.estacao_desvio[ponto, proximo]
+        if bateria is None:
+            ida_viavel = instancia.ida_estacao_viavel[ponto, proximo]
+        else:
+            ida_viavel = instancia.energia[ponto, estacao] <= bateria
+        if ida_viavel:
+            return int(estacao)
+    
+    mais_proxima = instancia.recarga_mais_proxima if com_deposito else instancia.estacao_mais_proxima
+    return int(mais_proxima[ponto])
 
 def ordenar_por_prioridade(ponto_inicial, clientes, matriz_prioridade, data):
     """Ordena clientes baseado na matriz de prioridade"""
@@ -419,6 +452,7 @@ def mutacao_nn(filho, data, matriz_prioridade, taxa_mutacao=0.1, num_rotas_min =
         return filho
     
     filho = filho.copy()
+    instancia = compilar_instancia(data)
     bateria = data['ENERGY_CAPACITY']
     carga = data['CAPACITY']
     
@@ -427,23 +461,12 @@ def mutacao_nn(filho, data, matriz_prioridade, taxa_mutacao=0.1, num_rotas_min =
         próximo_nó = filho[i+1]
         
         # Calcula consumo atual
-        dist = math.sqrt(
-            (data['NODE_COORD_SECTION'][nó][0] - data['NODE_COORD_SECTION'][próximo_nó][0])**2 +
-            (data['NODE_COORD_SECTION'][nó][1] - data['NODE_COORD_SECTION'][próximo_nó][1])**2
-        )
-        consumo = data['ENERGY_CONSUMPTION'] * dist
+        consumo = instancia.energia[nó, próximo_nó]
         
         # Se a bateria ficar crítica, insere uma estação
         if (bateria - consumo) < data['ENERGY_CAPACITY'] * 0.4:  # 20% de bateria restante
-            estações = data['STATIONS_COORD_SECTION'] + [1]
-            estação_próxima = min(
-                estações,
-                key=lambda e: math.sqrt(
-                    (data['NODE_COORD_SECTION'][nó][0] - data['NODE_COORD_SECTION'][e][0])**2 +
-                    (data['NODE_COORD_SECTION'][nó][1] - data['NODE_COORD_SECTION'][e][1])**2
-                )
-            )
-            filho = np.insert(filho, i+1, estação_próxima)
+            estação = escolher_estacao_proxima(nó, data, próximo_nó, bateria, com_deposito=True)
+            filho = np.insert(filho, i+1, estação)
             bateria = data['ENERGY_CAPACITY']  # Recarrega
         
         # Troca com um cliente próximo (se viável)
@@ -454,11 +477,7 @@ def mutacao_nn(filho, data, matriz_prioridade, taxa_mutacao=0.1, num_rotas_min =
             if len(idx_cliente) > 0:
                 idx_cliente = idx_cliente[0]
                 # Verifica se a troca é viável
-                dist_troca = math.sqrt(
-                    (data['NODE_COORD_SECTION'][nó][0] - data['NODE_COORD_SECTION'][cliente_próximo][0])**2 +
-                    (data['NODE_COORD_SECTION'][nó][1] - data['NODE_COORD_SECTION'][cliente_próximo][1])**2
-                )
-                if (bateria - data['ENERGY_CONSUMPTION'] * dist_troca > 0):
+                if (bateria - instancia.energia[nó, cliente_próximo] > 0):
                     filho[i], filho[idx_cliente] = filho[idx_cliente], filho[i]
         
         bateria -= consumo
@@ -493,33 +512,14 @@ def mutacao_balanceamento_carga(rota, data, matriz_prioridade, taxa_mutacao=0.3,
     return reconstruir_rota_com_estacoes([s['clientes'] for s in subrotas], data, num_rotas_min)
 
 def extrair_subrotas_com_carga(rota, data):
-    """Extrai sub-rotas com informações de carga"""
-    subrotas = []
-    subrota_atual = []
-    carga_atual = 0
-    
-    for node in rota[1:-1]:  # Ignora depósitos inicial/final
-        if node == 1 or node in data['STATIONS_COORD_SECTION']:
-            if subrota_atual:
-                subrotas.append({
-                    'clientes': subrota_atual,
-                    'carga': carga_atual,
-                    'tamanho': len(subrota_atual)
-                })
-                subrota_atual = []
-                carga_atual = 0
-        else:
-            subrota_atual.append(node)
-            carga_atual += data['DEMAND_SECTION'].get(node, 0)
-    
-    if subrota_atual:
-        subrotas.append({
-            'clientes': subrota_atual,
-            'carga': carga_atual,
-            'tamanho': len(subrota_atual)
-        })
-    
-    return subrotas
+    """Extrai sub-rotas com informações de carga (trechos de clientes entre pontos de recarga da VisaoRota)"""
+    visao = visao_rota(rota, data)
+    nos = visao.rota.tolist()
+    return [{
+                'clientes': nos[inicio:fim],
+                'carga': visao.carga_trecho(inicio, fim),
+                'tamanho': fim - inicio
+            } for inicio, fim in visao.trechos]
 
 def encontrar_par_balanceamento(subrotas, data):
     """Seleciona doador e receptor baseado em fitness probabilístico"""
@@ -614,7 +614,7 @@ def reconstruir_rota_com_estacoes(subrotas, data, num_rotas_min = 3):
             consumo = data['ENERGY_CONSUMPTION'] * distancia
             
             if bateria - consumo < 0:
-                estacao = escolher_estacao_proxima(rota[-1], data)
+                estacao = escolher_estacao_proxima(rota[-1], data, cliente, bateria)
                 rota.append(estacao)
                 bateria = data['ENERGY_CAPACITY']
             
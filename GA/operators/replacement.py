@@ -1,5 +1,33 @@
 import numpy as np
-from copy import deepcopy
+from .evaluation import fitness_alinhado
+
+def melhores_indices(fitness, k):
+    """
+    Índices dos k maiores valores de fitness, do melhor para o pior, com empates na ordem
+    dos índices (o mesmo resultado de np.argsort(-fitness, kind='stable')[:k]).
+    O corte é achado com np.partition em O(N) e só os k escolhidos são ordenados.
+    """
+    fitness = np.asarray(fitness, dtype=float)
+    k = max(0, min(k, len(fitness)))
+    if k == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(fitness):
+        limiar = -np.partition(-fitness, k - 1)[k - 1]  # k-ésimo maior fitness
+        acima = np.flatnonzero(fitness > limiar)
+        iguais = np.flatnonzero(fitness == limiar)[:k - len(acima)]
+        candidatos = np.concatenate([acima, iguais])
+    else:
+        candidatos = np.arange(len(fitness))
+    return candidatos[np.lexsort((candidatos, -fitness[candidatos]))]
+
+def juntar_sobreviventes(populacao_antiga, filhos, idx_antigos, idx_filhos):
+    """
+    Nova população a partir dos índices dos sobreviventes, sem copiar indivíduos: listas
+    recebem as referências; matrizes (um indivíduo por linha) recebem as linhas escolhidas.
+    """
+    if isinstance(populacao_antiga, np.ndarray) and isinstance(filhos, np.ndarray):
+        return np.concatenate([populacao_antiga[idx_antigos], filhos[idx_filhos]])
+    return [populacao_antiga[i] for i in idx_antigos] + [filhos[i] for i in idx_filhos]
 
 def substituicao_completa(filhos):
     """
@@ -7,12 +35,34 @@ def substituicao_completa(filhos):
     Args:
         populacao_antiga: Lista de indivíduos da geração anterior
         filhos: Lista de filhos gerados
-        fitness_antigo: Dicionário {rota: fitness} da geração anterior
-        fitness_filhos: Dicionário {rota: fitness} dos filhos
+        fitness_antigo: Fitness da geração anterior (array alinhado ou dicionário {rota: fitness})
+        fitness_filhos: Fitness dos filhos (array alinhado ou dicionário {rota: fitness})
+    Returns:
+        Nova população (lista de rotas; os filhos não são copiados)
+    """
+    return list(filhos) if not isinstance(filhos, np.ndarray) else filhos
+
+def indices_elitismo(fitness_antigo, fitness_filhos, n_elite):
+    """
+    Índices dos sobreviventes do elitismo: os n_elite melhores antigos e os melhores filhos
+    até completar o tamanho da população antiga.
+    Args:
+        fitness_antigo, fitness_filhos: Arrays de fitness alinhados com cada população
+    Returns:
+        (índices na população antiga, índices nos filhos), na ordem da nova população
+    """
+    n_filhos_needed = max(len(fitness_antigo) - n_elite, 0)
+    return melhores_indices(fitness_antigo, n_elite), melhores_indices(fitness_filhos, n_filhos_needed)
+
+def indices_steady_state(fitness_antigo, fitness_filhos, n_substituir):
+    """
+    Índices dos sobreviventes do steady-state: os (N - n_substituir) melhores antigos
+    e os n_substituir melhores filhos.
     Returns:
-        Nova população (lista de rotas)
+        (índices na população antiga, índices nos filhos), na ordem da nova população
     """
-    return deepcopy(filhos)
+    return (melhores_indices(fitness_antigo, len(fitness_antigo) - n_substituir),
+            melhores_indices(fitness_filhos, n_substituir))
 
 def substituicao_elitismo(populacao_antiga, filhos, fitness_antigo, fitness_filhos, n_elite):
     """
@@ -20,15 +70,9 @@ def substituicao_elitismo(populacao_antiga, filhos, fitness_antigo, fitness_filh
     Args:
         n_elite: Número de melhores indivíduos a preservar
     """
-    # Ordena a população antiga pelo fitness (melhores primeiro)
-    elite = sorted(populacao_antiga, key=lambda x: fitness_antigo[tuple(x)], reverse=True)[:n_elite]
-    
-    # Seleciona os melhores filhos para completar a população
-    n_filhos_needed = len(populacao_antiga) - n_elite
-    filhos_sorted = sorted(filhos, key=lambda x: fitness_filhos[tuple(x)], reverse=True)
-    
-    nova_populacao = deepcopy(elite) + deepcopy(filhos_sorted[:n_filhos_needed])
-    return nova_populacao
+    idx_antigos, idx_filhos = indices_elitismo(fitness_alinhado(populacao_antiga, fitness_antigo),
+                                               fitness_alinhado(filhos, fitness_filhos), n_elite)
+    return juntar_sobreviventes(populacao_antiga, filhos, idx_antigos, idx_filhos)
 
 def substituicao_steady_state(populacao_antiga, filhos, fitness_antigo, fitness_filhos, n_substituir):
     """
@@ -36,19 +80,35 @@ def substituicao_steady_state(populacao_antiga, filhos, fitness_antigo, fitness_
     Args:
         n_substituir: Número de piores indivíduos a substituir
     """
-    # Ordena população antiga (melhores primeiro) e filhos (melhores primeiro)
-    pop_ordenada = sorted(populacao_antiga, key=lambda x: fitness_antigo[tuple(x)], reverse=True)
-    filhos_ordenados = sorted(filhos, key=lambda x: fitness_filhos[tuple(x)], reverse=True)
-    
-    # Mantém os (N - n_substituir) melhores da população antiga
-    mantidos = pop_ordenada[:-n_substituir]
-    
-    # Adiciona os melhores filhos (até completar a população)
-    nova_populacao = deepcopy(mantidos) + deepcopy(filhos_ordenados[:n_substituir])
-    return nova_populacao
+    idx_antigos, idx_filhos = indices_steady_state(fitness_alinhado(populacao_antiga, fitness_antigo),
+                                                   fitness_alinhado(filhos, fitness_filhos), n_substituir)
+
+    # Mantém os (N - n_substituir) melhores da população antiga e adiciona os melhores filhos
+    return juntar_sobreviventes(populacao_antiga, filhos, idx_antigos, idx_filhos)
 
-def gerar_nova_populacao(populacao_antiga, filhos, fitness_antigo, fitness_filhos, metodo='steady_state', 
-                         n_pop=None, n_pais=None, n_filhos=None, n_elite=5):
+def indices_substituicao(fitness_antigo, fitness_filhos, metodo='steady_state', n_pop=None, n_filhos=None, n_elite=5):
+    """
+    Índices dos sobreviventes da estratégia de substituição, sem montar a nova população
+    (usado por gerar_nova_populacao e pela ArenaPopulacao, que copia as linhas escolhidas).
+    Args:
+        fitness_antigo, fitness_filhos: Arrays de fitness alinhados com cada população
+        metodo, n_pop, n_filhos, n_elite: Como em gerar_nova_populacao
+    Returns:
+        (índices na população antiga, índices nos filhos), na ordem da nova população
+    """
+    if metodo == 'completa':
+        return np.zeros(0, dtype=np.int64), np.arange(len(fitness_filhos))
+    if metodo == 'elitismo':
+        return indices_elitismo(fitness_antigo, fitness_filhos, n_elite)
+    if metodo == 'steady_state':
+        # Calcula quantos indivíduos substituir baseado nos parâmetros
+        n_substituir = min(len(fitness_filhos), len(fitness_antigo) - (n_pop - n_filhos))
+        return indices_steady_state(fitness_antigo, fitness_filhos, n_substituir)
+    raise ValueError("Método de substituição inválido")
+
+def gerar_nova_populacao(populacao_antiga, filhos, fitness_antigo, fitness_filhos, metodo='steady_state',
+                         n_pop=None, n_pais=None, n_filhos=None, n_elite=5,
+                         registro_antigo=None, registro_filhos=None):
     """
     Função principal que aplica a estratégia de substituição selecionada.
     Args:
@@ -57,19 +117,23 @@ def gerar_nova_populacao(populacao_antiga, filhos, fitness_antigo, fitness_filho
         n_pais: Número de pais selecionados (usado para steady-state)
         n_filhos: Número de filhos gerados (usado para steady-state)
         n_elite: Número de elites a manter (para elitismo)
+        registro_antigo, registro_filhos: Arrays opcionais com um valor por indivíduo
+            (ex.: objetivo já avaliado) que acompanham os sobreviventes
     Returns:
-        Nova população (lista de rotas)
+        Nova população (lista de rotas, ou matriz se as populações forem matrizes), ou
+        (nova população, registro da nova população) quando os registros são informados.
+        Os sobreviventes são escolhidos por índice e não são copiados.
     """
     if metodo == 'completa':
-        return substituicao_completa(filhos)
-    
-    elif metodo == 'elitismo':
-        return substituicao_elitismo(populacao_antiga, filhos, fitness_antigo, fitness_filhos, n_elite)
-    
-    elif metodo == 'steady_state':
-        # Calcula quantos indivíduos substituir baseado nos parâmetros
-        n_substituir = min(len(filhos), len(populacao_antiga) - (n_pop - n_filhos))
-        return substituicao_steady_state(populacao_antiga, filhos, fitness_antigo, fitness_filhos, n_substituir)
-    
+        idx_antigos, idx_filhos = np.zeros(0, dtype=np.int64), np.arange(len(filhos))
+        nova_populacao = substituicao_completa(filhos)
     else:
-        raise ValueError("Método de substituição inválido")
\ No newline at end of file
+        idx_antigos, idx_filhos = indices_substituicao(fitness_alinhado(populacao_antiga, fitness_antigo),
+                                                       fitness_alinhado(filhos, fitness_filhos), metodo,
+                                                       n_pop=n_pop, n_filhos=n_filhos, n_elite=n_elite)
+        nova_populacao = juntar_sobreviventes(populacao_antiga, filhos, idx_antigos, idx_filhos)
+
+    if registro_antigo is None or registro_filhos is None:
+        return nova_populacao
+    registro_novo = np.concatenate([np.asarray(registro_antigo)[idx_antigos], np.asarray(registro_filhos)[idx_filhos]])
+    return nova_populacao, registro_novo
@@ -1,4 +1,5 @@
 import numpy as np
+from .evaluation import fitness_alinhado
 
 def selecao_roleta(populacao, fitness, n_pais):
     """
@@ -6,19 +7,18 @@ def selecao_roleta(populacao, fitness, n_pais):
     
     Args:
         populacao: Lista de indivíduos (rotas).
-        fitness: Dicionário {rota: valor_fitness}.
+        fitness: Array de fitness alinhado com a população (ou dicionário {rota: valor_fitness}).
         n_pais: Número de pais a selecionar.
     
     Returns:
         Lista com os pais selecionados.
     """
-    rotas = list(fitness.keys())
-    valores_fitness = np.array([fitness[rota] for rota in rotas])
+    valores_fitness = fitness_alinhado(populacao, fitness)
     probabilidades = valores_fitness / valores_fitness.sum()
     
     # Seleciona índices ao invés de rotas diretamente
     indices_selecionados = np.random.choice(
-        len(rotas), 
+        len(populacao), 
         size=n_pais, 
         p=probabilidades,
         replace=True
@@ -29,33 +29,39 @@ def selecao_roleta(populacao, fitness, n_pais):
 def selecao_torneio(populacao, fitness, n_pais, tamanho_torneio=2):
     """
     Seleciona pais através de torneios entre indivíduos aleatórios.
+    Todos os torneios são sorteados de uma vez (matriz n_pais × tamanho_torneio de índices,
+    sem repetição dentro de cada torneio) e o vencedor de cada um sai de um argmax sobre
+    o fitness alinhado com a população.
     
     Args:
         tamanho_torneio: Número de indivíduos que competem em cada torneio.
     """
-    pais_selecionados = []
-    indices = list(range(len(populacao)))  # Trabalhamos com índices
+    valores_fitness = fitness_alinhado(populacao, fitness)
+    tamanho_torneio = min(tamanho_torneio, len(populacao))
     
-    for _ in range(n_pais):
-        # Seleciona índices dos competidores
-        competidores_idx = np.random.choice(indices, size=tamanho_torneio, replace=False)
-        
-        # Encontra o vencedor pelo fitness máximo
-        vencedor_idx = max(competidores_idx, key=lambda i: fitness[tuple(populacao[i])])
-        pais_selecionados.append(populacao[vencedor_idx])
+    # Seleciona índices dos competidores; torneios com índice repetido são sorteados de novo.
+    # Torneios grandes em relação à população usam os primeiros de uma permutação por linha
+    if 2 * tamanho_torneio > len(populacao):
+        competidores_idx = np.argsort(np.random.random((n_pais, len(populacao))), axis=1)[:, :tamanho_torneio]
+    else:
+        competidores_idx = np.random.randint(0, len(populacao), size=(n_pais, tamanho_torneio))
+    while True:
+        ordenados = np.sort(competidores_idx, axis=1)
+        repetidos = (ordenados[:, 1:] == ordenados[:, :-1]).any(axis=1)
+        if not repetidos.any():
+            break
+        competidores_idx[repetidos] = np.random.randint(0, len(populacao), size=(repetidos.sum(), tamanho_torneio))
     
-    return pais_selecionados
+    # Encontra o vencedor pelo fitness máximo (empate: o primeiro sorteado)
+    vencedores = competidores_idx[np.arange(n_pais), np.argmax(valores_fitness[competidores_idx], axis=1)]
+    return [populacao[i] for i in vencedores]
 
 def selecao_rank(populacao, fitness, n_pais):
     """
     Seleciona pais baseado no ranking (não no valor absoluto do fitness).
     """
     # Ordena a população pelo fitness (do melhor para o pior)
-    indices_ordenados = sorted(
-        range(len(populacao)), 
-        key=lambda i: fitness[tuple(populacao[i])], 
-        reverse=True
-    )
+    indices_ordenados = np.argsort(-fitness_alinhado(populacao, fitness), kind='stable')
     
     pesos = np.arange(len(populacao), 0, -1)
     probabilidades = pesos / pesos.sum()
@@ -69,15 +75,79 @@ def selecao_rank(populacao, fitness, n_pais):
     
     return [populacao[i] for i in indices_selecionados]
 
+class TabelaAlias:
+    """
+    Tabela de alias de Walker (construção de Vose em O(n)) para sortear índices com
+    probabilidade proporcional a pesos. Montada uma vez por geração; cada sorteio é O(1):
+    uma coluna uniforme e um teste contra a probabilidade da coluna.
+    """
+    def __init__(self, pesos):
+        pesos = np.asarray(pesos, dtype=float)
+        n = len(pesos)
+        total = pesos.sum()
+        escalados = (pesos * n / total).tolist() if total > 0 else [1.0] * n
+        probabilidade = [1.0] * n  # Sobras (erro de arredondamento) ficam com probabilidade 1
+        alias = list(range(n))
+        pequenos = [i for i, p in enumerate(escalados) if p < 1.0]
+        grandes = [i for i, p in enumerate(escalados) if p >= 1.0]
+        while pequenos and grandes:
+            menor, maior = pequenos.pop(), grandes.pop()
+            probabilidade[menor] = escalados[menor]
+            alias[menor] = maior
+            escalados[maior] -= 1.0 - escalados[menor]
+            (pequenos if escalados[maior] < 1.0 else grandes).append(maior)
+        self.probabilidade = np.array(probabilidade)
+        self.alias = np.array(alias)
+
+    def sortear(self, k):
+        """k índices sorteados com reposição."""
+        colunas = np.random.randint(0, len(self.probabilidade), size=k)
+        return np.where(np.random.random(k) < self.probabilidade[colunas], colunas, self.alias[colunas])
+
+def amostragem_universal(pesos, k):
+    """
+    Stochastic universal sampling: k ponteiros igualmente espaçados (um único sorteio)
+    sobre a soma acumulada dos pesos. Cada índice é escolhido floor ou ceil de k·p vezes,
+    com variância menor que k sorteios independentes. Os índices saem embaralhados.
+    """
+    pesos = np.asarray(pesos, dtype=float)
+    acumulado = np.cumsum(pesos) if pesos.sum() > 0 else np.arange(1, len(pesos) + 1, dtype=float)
+    ponteiros = (np.random.random() + np.arange(k)) * (acumulado[-1] / k)
+    indices = np.minimum(np.searchsorted(acumulado, ponteiros, side='right'), len(pesos) - 1)
+    return np.random.permutation(indices)
+
+def _pesos_rank(populacao, fitness):
+    """Pesos lineares de ranking (n para o melhor, 1 para o pior) alinhados com a população."""
+    indices_ordenados = np.argsort(-fitness_alinhado(populacao, fitness), kind='stable')
+    pesos = np.empty(len(populacao))
+    pesos[indices_ordenados] = np.arange(len(populacao), 0, -1)
+    return pesos
+
+def selecao_roleta_alias(populacao, fitness, n_pais):
+    """Roleta (proporcional ao fitness) com tabela de alias: O(1) por pai sorteado."""
+    indices_selecionados = TabelaAlias(fitness_alinhado(populacao, fitness)).sortear(n_pais)
+    return [populacao[i] for i in indices_selecionados]
+
+def selecao_rank_alias(populacao, fitness, n_pais):
+    """Seleção por ranking com tabela de alias."""
+    indices_selecionados = TabelaAlias(_pesos_rank(populacao, fitness)).sortear(n_pais)
+    return [populacao[i] for i in indices_selecionados]
+
+def selecao_sus(populacao, fitness, n_pais):
+    """Roleta por stochastic universal sampling (proporcional ao fitness, menor variância)."""
+    indices_selecionados = amostragem_universal(fitness_alinhado(populacao, fitness), n_pais)
+    return [populacao[i] for i in indices_selecionados]
+
+def selecao_rank_sus(populacao, fitness, n_pais):
+    """Seleção por ranking com stochastic universal sampling."""
+    indices_selecionados = amostragem_universal(_pesos_rank(populacao, fitness), n_pais)
+    return [populacao[i] for i in indices_selecionados]
+
 def selecao_elitismo(populacao, fitness, n_elite):
     """
     Seleciona os n_elite melhores indivíduos diretamente.
     """
     # Ordena pelo fitness (melhor primeiro)
-    indices_ordenados = sorted(
-        range(len(populacao)), 
-        key=lambda i: fitness[tuple(populacao[i])], 
-        reverse=True
-    )
+    indices_ordenados = np.argsort(-fitness_alinhado(populacao, fitness), kind='stable')
     return [populacao[i] for i in indices_ordenados[:n_elite]]
 
@@ -0,0 +1,166 @@
+"""
+Arena de população
+
+ArenaPopulacao guarda todos os indivíduos (população e filhos) em dois buffers
+pré-alocados capacidade × max_len de int16, com um vetor de comprimentos por buffer.
+A geração atual ocupa um buffer; a substituição copia as linhas dos sobreviventes para o
+outro buffer (np.take com out=, sem alocar) e troca os dois. Os indivíduos entregues aos
+operadores são views das linhas. Operadores de tamanho fixo (giant tour) escrevem os filhos
+direto em linhas reservadas com alocar; rotas de tamanho variável são copiadas para as linhas
+com adicionar. Com compartilhada=True os buffers ficam em memória compartilhada e podem ser
+abertos por outros processos.
+"""
+import numpy as np
+
+class ArenaPopulacao:
+    """
+    Buffers duplos de indivíduos com tamanho variável.
+    Args:
+        capacidade: Indivíduos por buffer (população + filhos). A arena local cresce quando
+            enche; a compartilhada tem tamanho fixo
+        max_len: Maior rota que cabe numa linha
+        dtype: Tipo dos nós (int16 aceita IDs até 32767)
+        compartilhada: Se True, usa multiprocessing.shared_memory (ver nomes / anexar)
+    """
+    def __init__(self, capacidade, max_len, dtype=np.int16, compartilhada=False, _nomes=None):
+        self.capacidade = capacidade
+        self.max_len = max_len
+        self.dtype = np.dtype(dtype)
+        self._memorias = []
+        self._buffers = []
+        self._comprimentos = []
+        tamanho_matriz = capacidade * max_len * self.dtype.itemsize
+        for b in range(2):
+            if compartilhada or _nomes is not None:
+                from multiprocessing import shared_memory
+                if _nomes is None:
+                    memoria = shared_memory.SharedMemory(create=True, size=tamanho_matriz + capacidade * 8)
+                else:
+                    memoria = shared_memory.SharedMemory(name=_nomes[b])
+                self._memorias.append(memoria)
+                self._buffers.append(np.ndarray((capacidade, max_len), dtype=self.dtype, buffer=memoria.buf))
+                self._comprimentos.append(np.ndarray(capacidade, dtype=np.int64, buffer=memoria.buf, offset=tamanho_matriz))
+            else:
+                self._buffers.append(np.zeros((capacidade, max_len), dtype=self.dtype))
+                self._comprimentos.append(np.zeros(capacidade, dtype=np.int64))
+        self.atual = 0
+        self.n = 0  # Indivíduos ocupados no buffer atual
+
+    # ----- acesso -----
+    @property
+    def matriz(self):
+        """Linhas ocupadas do buffer atual (view n × max_len)."""
+        return self._buffers[self.atual][:self.n]
+
+    @property
+    def comprimentos(self):
+        """Comprimento de cada linha ocupada do buffer atual (view)."""
+        return self._comprimentos[self.atual][:self.n]
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        """Rota i do buffer atual, como view (sem cópia)."""
+        if not -self.n <= i < self.n:
+            raise IndexError(i)
+        i %= self.n
+        return self._buffers[self.atual][i, :self._comprimentos[self.atual][i]]
+
+    def rotas(self):
+        """Lista de views das rotas do buffer atual (interface de lista dos operadores)."""
+        buffer, comprimentos = self._buffers[self.atual], self._comprimentos[self.atual]
+        return [buffer[i, :comprimentos[i]] for i in range(self.n)]
+
+    # ----- escrita -----
+    def escrever(self, i, rota):
+        """Sobrescreve a linha i do buffer atual com a rota (no lugar)."""
+        if len(rota) > self.max_len:
+            raise ValueError(f"Rota com {len(rota)} nós não cabe na arena (max_len={self.max_len})")
+        self._buffers[self.atual][i, :len(rota)] = rota
+        self._comprimentos[self.atual][i] = len(rota)
+
+    def _garantir_capacidade(self, n):
+        """Aumenta os dois buffers para pelo menos n linhas (ao menos dobrando), copiando o conteúdo."""
+        if n <= self.capacidade:
+            return
+        if self._memorias:
+            raise ValueError(f"Arena compartilhada cheia (capacidade={self.capacidade})")
+        nova = max(n, 2 * self.capacidade)
+        for b in range(2):
+            buffer = np.zeros((nova, self.max_len), dtype=self.dtype)
+            buffer[:self.capacidade] = self._buffers[b]
+            comprimentos = np.zeros(nova, dtype=np.int64)
+            comprimentos[:self.capacidade] = self._comprimentos[b]
+            self._buffers[b], self._comprimentos[b] = buffer, comprimentos
+        self.capacidade = nova
+
+    def adicionar(self, rota):
+        """Acrescenta a rota depois das linhas ocupadas. Returns: índice da linha."""
+        self._garantir_capacidade(self.n + 1)
+        self.escrever(self.n, rota)
+        self.n += 1
+        return self.n - 1
+
+    def alocar(self, n_linhas, comprimento):
+        """
+        Reserva n_linhas depois das ocupadas, todas com o comprimento dado, para os operadores
+        escreverem no lugar. Returns: views das linhas reservadas.
+        """
+        if comprimento > self.max_len:
+            raise ValueError(f"Rota com {comprimento} nós não cabe na arena (max_len={self.max_len})")
+        self._garantir_capacidade(self.n + n_linhas)
+        inicio, self.n = self.n, self.n + n_linhas
+        self._comprimentos[self.atual][inicio:self.n] = comprimento
+        return [self._buffers[self.atual][i, :comprimento] for i in range(inicio, self.n)]
+
+    def truncar(self, n):
+        """Descarta as linhas a partir de n (ex.: os filhos da geração anterior)."""
+        self.n = min(self.n, n)
+
+    def carregar(self, rotas):
+        """Substitui o conteúdo do buffer atual pelas rotas. Returns: rotas() (views)."""
+        self.n = 0
+        for rota in rotas:
+            self.adicionar(rota)
+        return self.rotas()
+
+    def sobreviventes(self, indices):
+        """
+        Copia as linhas indicadas do buffer atual para o outro buffer, na ordem dada,
+        e troca os buffers (double buffering). Returns: rotas() da nova geração.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        k = len(indices)
+        self._garantir_capacidade(k)
+        destino = 1 - self.atual
+        np.take(self._buffers[self.atual], indices, axis=0, out=self._buffers[destino][:k])
+        np.take(self._comprimentos[self.atual], indices, out=self._comprimentos[destino][:k])
+        self.atual, self.n = destino, k
+        return self.rotas()
+
+    # ----- memória compartilhada -----
+    @property
+    def nomes(self):
+        """Nomes dos blocos de memória compartilhada (para anexar em outro processo)."""
+        return [memoria.name for memoria in self._memorias]
+
+    @classmethod
+    def anexar(cls, nomes, capacidade, max_len, n=0, atual=0, dtype=np.int16):
+        """
+        Abre, em outro processo, a arena compartilhada criada com os mesmos parâmetros.
+        n e atual (linhas ocupadas e buffer da geração) não ficam na memória
+        compartilhada e são informados pelo processo dono.
+        """
+        arena = cls(capacidade, max_len, dtype, _nomes=nomes)
+        arena.n, arena.atual = n, atual
+        return arena
+
+    def fechar(self, liberar=False):
+        """Fecha a memória compartilhada; liberar=True a remove (no processo que a criou)."""
+        self._buffers, self._comprimentos = [], []
+        for memoria in self._memorias:
+            memoria.close()
+            if liberar:
+                memoria.unlink()
+        self._memorias = []
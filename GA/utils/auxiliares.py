@@ -1,11 +1,14 @@
 import random
 import numpy as np
 import math
+from .file import compilar_instancia
 
 def criar_rota_nn_inteligente_com_rotas_minimas(data, num_rotas_min=3):
+    instancia = compilar_instancia(data)
+    distancias = instancia.distancias
+    demandas = instancia.demanda
     depósito = 1
-    clientes_nao_visitados = [i for i in range(2, data['DIMENSION'] + 1) 
-                             if i not in data['STATIONS_COORD_SECTION']]
+    clientes_nao_visitados = [int(i) for i in instancia.clientes]
     rotas = []
     
     for _ in range(num_rotas_min):
@@ -22,10 +25,8 @@ def criar_rota_nn_inteligente_com_rotas_minimas(data, num_rotas_min=3):
             melhor_distância = float('inf')
             
             for cliente in clientes_nao_visitados:
-                x1, y1 = data['NODE_COORD_SECTION'][último_ponto]
-                x2, y2 = data['NODE_COORD_SECTION'][cliente]
-                dist = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-                demanda = data['DEMAND_SECTION'][cliente]
+                dist = distancias[último_ponto, cliente]
+                demanda = demandas[cliente]
                 
                 if (bateria - data['ENERGY_CONSUMPTION'] * dist > 0) and (carga - demanda > 0):
                     if dist < melhor_distância:
@@ -35,18 +36,11 @@ def criar_rota_nn_inteligente_com_rotas_minimas(data, num_rotas_min=3):
             if melhor_cliente:
                 rota.append(melhor_cliente)
                 bateria -= data['ENERGY_CONSUMPTION'] * melhor_distância
-                carga -= data['DEMAND_SECTION'][melhor_cliente]
+                carga -= demandas[melhor_cliente]
                 clientes_nao_visitados.remove(melhor_cliente)
             else:
                 # Recarrega ou volta ao depósito se não houver clientes viáveis
-                estações = data['STATIONS_COORD_SECTION'] + [depósito]
-                estação_próxima = min(
-                    estações,
-                    key=lambda e: math.sqrt(
-                        (data['NODE_COORD_SECTION'][último_ponto][0] - data['NODE_COORD_SECTION'][e][0])**2 +
-                        (data['NODE_COORD_SECTION'][último_ponto][1] - data['NODE_COORD_SECTION'][e][1])**2
-                    )
-                )
+                estação_próxima = int(instancia.recarga_mais_proxima[último_ponto])
                 rota.append(estação_próxima)
                 bateria = data['ENERGY_CAPACITY']
                 if estação_próxima == depósito:
@@ -63,21 +57,12 @@ def criar_rota_nn_inteligente_com_rotas_minimas(data, num_rotas_min=3):
         carga = data['CAPACITY']
         
         # Pega os clientes mais próximos do depósito para a nova rota
-        clientes_restantes = sorted(
-            clientes_nao_visitados,
-            key=lambda c: math.sqrt(
-                (data['NODE_COORD_SECTION'][depósito][0] - data['NODE_COORD_SECTION'][c][0])**2 +
-                (data['NODE_COORD_SECTION'][depósito][1] - data['NODE_COORD_SECTION'][c][1])**2
-            )
-        )
+        clientes_restantes = sorted(clientes_nao_visitados, key=lambda c: distancias[depósito, c])
         
         for cliente in clientes_restantes[:10]:  # Limita a 10 clientes por rota (ajuste conforme necessário)
             if cliente in clientes_nao_visitados:
-                dist = math.sqrt(
-                    (data['NODE_COORD_SECTION'][rota[-1]][0] - data['NODE_COORD_SECTION'][cliente][0])**2 +
-                    (data['NODE_COORD_SECTION'][rota[-1]][1] - data['NODE_COORD_SECTION'][cliente][1])**2
-                )
-                demanda = data['DEMAND_SECTION'][cliente]
+                dist = distancias[rota[-1], cliente]
+                demanda = demandas[cliente]
                 
                 if (bateria - data['ENERGY_CONSUMPTION'] * dist > 0) and (carga - demanda > 0):
                     rota.append(cliente)
@@ -200,25 +185,15 @@ def calcular_distancia_total(data, rota):
     Calcula a distância total percorrida em uma rota com múltiplos trajetos.
     
     Parâmetros:
-    - data: dicionário contendo 'NODE_COORD_SECTION' com as coordenadas dos nós
+    - data: EVRPInstance (ou dicionário com 'NODE_COORD_SECTION') com as coordenadas dos nós
     - rota: lista representando a rota completa com múltiplos trajetos (ex: [1,2,3,1,4,5,1])
     
     Retorna:
     - Distância total percorrida
     """
-    coords = data['NODE_COORD_SECTION']
-    distancia_total = 0.0
-    
-    for i in range(len(rota) - 1):
-        node_atual = rota[i]
-        node_proximo = rota[i+1]
-        
-        x1, y1 = coords[node_atual]
-        x2, y2 = coords[node_proximo]
-        
-        distancia_total += math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-    
-    return distancia_total
+    rota = np.asarray(rota)
+    distancias = compilar_instancia(data).distancias
+    return float(distancias[rota[:-1], rota[1:]].sum())
 
 #Codifica a rota
 def codificar_rota_binaria(rota, evrp_data, bits_cidade=5, bits_deposito=1):
@@ -226,50 +201,40 @@ def codificar_rota_binaria(rota, evrp_data, bits_cidade=5, bits_deposito=1):
     Codifica uma rota EVRP em representação binária
     
     Parâmetros:
-    - rota: array numpy com a rota (começa/termina com 1)
+    - rota: array numpy com a rota (começa/termina com 1), ou matriz com uma rota
+      de mesmo tamanho por linha (a codificação é feita linha a linha)
     - evrp_data: dicionário com dados do problema
     - bits_cidade: número de bits para ID de clientes/estações
     - bits_deposito: número de bits para flag de depósito (default=1)
     
     Retorna:
-    - Array numpy com representação binária
+    - Array numpy com representação binária (uma linha por rota, se rota for matriz)
     """
     # Remove primeiro e último depósito
-    rota_limpa = rota[1:-1]
+    rota_limpa = np.asarray(rota, dtype=np.int64)[..., 1:-1]
     
-    if len(rota_limpa) == 0:
-        return np.array([], dtype=int)
-    
-    # Calcula bits necessários por elemento
-    bits_por_elemento = bits_deposito + bits_cidade
+    if rota_limpa.shape[-1] == 0:
+        return np.zeros(rota_limpa.shape, dtype=int)
     
     # Verifica capacidade de representação
     max_clientes = 2**bits_cidade - 1
-    clientes_validos = set(range(2, evrp_data['DIMENSION'] + 1))
-    
-    if max(clientes_validos) > max_clientes:
-        raise ValueError(f"bits_cidade={bits_cidade} insuficiente para {max(clientes_validos)} clientes")
-    
-    # Inicializa array binário
-    codigo = np.zeros(len(rota_limpa) * bits_por_elemento, dtype=int)
-    
-    for i, elemento in enumerate(rota_limpa):
-        pos = i * bits_por_elemento
-        
-        # Bit de depósito (próximo é depósito?)
-        if i < len(rota_limpa) - 1 and rota_limpa[i+1] == 1:
-            codigo[pos:pos+bits_deposito] = 1  # Ativa flag de depósito
-        
-        # Bits de identificação
-        id_bin = [int(b) for b in bin(elemento)[2:].zfill(bits_cidade)]
-        codigo[pos+bits_deposito:pos+bits_por_elemento] = id_bin
-    
-    # Força depósito após último elemento
-    if rota_limpa[-1] != 1:
-        ult_pos = (len(rota_limpa) - 1) * bits_por_elemento
-        codigo[ult_pos:ult_pos+bits_deposito] = 1
-    
-    return codigo
+    if evrp_data['DIMENSION'] > max_clientes:
+        raise ValueError(f"bits_cidade={bits_cidade} insuficiente para {evrp_data['DIMENSION']} clientes")
+    if rota_limpa.max() > max_clientes:
+        raise ValueError(f"bits_cidade={bits_cidade} insuficiente para o nó {rota_limpa.max()}")
+    
+    # Bit de depósito (próximo é depósito?); força depósito após o último elemento
+    flags = np.empty(rota_limpa.shape, dtype=bool)
+    flags[..., :-1] = rota_limpa[..., 1:] == 1
+    flags[..., -1] = rota_limpa[..., -1] != 1
+    
+    # Bits de identificação (mais significativo primeiro), por deslocamento
+    deslocamentos = np.arange(bits_cidade - 1, -1, -1)
+    id_bits = (rota_limpa[..., None] >> deslocamentos) & 1
+    flag_bits = np.repeat(flags[..., None], bits_deposito, axis=-1)
+    
+    codigo = np.concatenate([flag_bits, id_bits], axis=-1).astype(int)
+    return codigo.reshape(rota_limpa.shape[:-1] + (-1,))
 
 #Decodifica a rota
 def decodificar_rota_binaria(codigo_binario, evrp_data, bits_cidade=5, bits_deposito=1):
@@ -277,60 +242,69 @@ def decodificar_rota_binaria(codigo_binario, evrp_data, bits_cidade=5, bits_depo
     Decodifica uma rota binária de volta para o formato array de inteiros
     
     Parâmetros:
-    - codigo_binario: array numpy com a representação binária
+    - codigo_binario: array numpy com a representação binária (ou matriz, uma rota por linha)
     - evrp_data: dicionário com dados do problema
     - bits_cidade: número de bits usados para ID de clientes/estações
     - bits_deposito: número de bits usados para flag de depósito
     
     Retorna:
     - Array numpy com a rota no formato [1, clientes, 1, clientes, ..., 1]
+      (lista de rotas, se codigo_binario for matriz)
     """
+    codigo = np.asarray(codigo_binario, dtype=np.int64)
     bits_por_elemento = bits_deposito + bits_cidade
     
-    if len(codigo_binario) % bits_por_elemento != 0:
+    if codigo.shape[-1] % bits_por_elemento != 0:
         raise ValueError("Tamanho do código incompatível com bits especificados")
+    if codigo.ndim > 1:
+        return [decodificar_rota_binaria(linha, evrp_data, bits_cidade, bits_deposito) for linha in codigo]
     
-    num_elementos = len(codigo_binario) // bits_por_elemento
-    rota = [1]  # Inicia no depósito
+    blocos = codigo.reshape(-1, bits_por_elemento)
     
-    i = 0
-    while i < num_elementos:
-        inicio = i * bits_por_elemento
-        fim = inicio + bits_por_elemento
-        bloco = codigo_binario[inicio:fim]
-        
-        # Extrai flag de depósito
-        flag_deposito = bloco[:bits_deposito]
-        
-        # Extrai ID (bits_cidade bits)
-        id_bits = bloco[bits_deposito:bits_por_elemento]
-        id_cliente = int(''.join(map(str, id_bits)), 2)
-        
-        # Verificação de ID válido
-        if id_cliente == 1:  # Ignora depósitos codificados como cliente
-            i += 1
-            continue
-            
-        # clientes_validos = set(range(2, evrp_data['DIMENSION'] + 1))
-        # estacoes_validas = set(evrp_data['STATIONS_COORD_SECTION'])
-        
-        # if id_cliente not in clientes_validos.union(estacoes_validas):
-        #     print(f"ID {id_cliente} inválido")
-        #     #raise ValueError(f"ID {id_cliente} inválido")
-        # else:
-        rota.append(id_cliente)
-        
-        # Adiciona depósito apenas se a flag estiver ativada
-        if any(flag_deposito):
-            rota.append(1)
-        
-        i += 1
+    # ID: produto escalar dos bits com as potências de 2; flag: algum bit de depósito ligado
+    potencias = 1 << np.arange(bits_cidade - 1, -1, -1)
+    ids = blocos[:, bits_deposito:] @ potencias
+    flags = blocos[:, :bits_deposito].any(axis=1)
+    
+    # Ignora depósitos codificados como cliente; cada elemento vira [id] ou [id, 1] (flag)
+    manter = ids != 1
+    pares = np.column_stack([ids[manter], np.ones(manter.sum(), dtype=ids.dtype)])
+    presentes = np.column_stack([np.ones(manter.sum(), dtype=bool), flags[manter]])
+    rota = np.concatenate([[1], pares[presentes]])
     
     # Garante terminar com depósito
     if rota[-1] != 1:
-        rota.append(1)
+        rota = np.append(rota, 1)
     
-    return np.array(rota)
+    return rota
+
+#Compacta o cromossomo binário
+def compactar_binario(codigo):
+    """
+    Empacota um cromossomo binário (um bit por inteiro) em bytes: 8 bits por uint8
+    (np.packbits, bit mais significativo primeiro). Matrizes são empacotadas linha a linha.
+    Os bits de preenchimento do último byte ficam em 0.
+    """
+    return np.packbits(np.asarray(codigo, dtype=np.uint8), axis=-1)
+
+def descompactar_binario(palavras, n_bits):
+    """Inverso de compactar_binario: devolve os n_bits primeiros bits como array de int."""
+    return np.unpackbits(np.asarray(palavras, dtype=np.uint8), axis=-1, count=n_bits).astype(int)
+
+#Empilha rotas de tamanhos diferentes
+def empacotar_populacao(populacao, preenchimento=0):
+    """
+    Empacota a população (rotas ou sequências de tamanhos variados) em uma matriz 2D de inteiros.
+    - Posições após o fim de cada rota recebem `preenchimento` (o padrão 0 não é um nó válido,
+      então o reparo o descarta).
+    - Retorna: (matriz n_individuos x maior_rota, vetor com o tamanho de cada rota)
+    """
+    tamanhos = np.fromiter((len(rota) for rota in populacao), dtype=np.int64, count=len(populacao))
+    matriz = np.full((len(populacao), tamanhos.max(initial=0)), preenchimento, dtype=np.int64)
+    if len(populacao):
+        ocupadas = np.arange(matriz.shape[1]) < tamanhos[:, None]
+        matriz[ocupadas] = np.concatenate([np.asarray(rota, dtype=np.int64) for rota in populacao])
+    return matriz, tamanhos
 
 #Parametros de problema
 def parametros_problema(evrp_data, binario, restricoes):
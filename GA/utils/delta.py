@@ -0,0 +1,77 @@
+"""
+Avaliação incremental (delta) de movimentos sobre uma rota.
+
+Cada função recebe a rota, as posições do movimento e a matriz de distâncias da instância,
+e devolve a variação da distância total olhando só para os arcos afetados (O(1)).
+Posições fora da rota (antes do início ou depois do fim) são tratadas como ausência de arco,
+então as mesmas funções servem para rotas completas e para caminhos abertos (sub-rotas).
+"""
+
+def _arco(rota, a, b, distancias):
+    """Distância do arco entre as posições a e b (0 se alguma delas está fora da rota)."""
+    if a < 0 or b < 0 or a >= len(rota) or b >= len(rota):
+        return 0.0
+    return distancias[rota[a], rota[b]]
+
+def delta_2opt(rota, i, j, distancias):
+    """
+    Variação da distância ao inverter o trecho rota[i..j] (i < j).
+    Troca os arcos (i-1, i) e (j, j+1) por (i-1, j) e (i, j+1); distâncias simétricas.
+    """
+    antes = _arco(rota, i - 1, i, distancias) + _arco(rota, j, j + 1, distancias)
+    depois = 0.0
+    if i > 0:
+        depois += distancias[rota[i - 1], rota[j]]
+    if j < len(rota) - 1:
+        depois += distancias[rota[i], rota[j + 1]]
+    return depois - antes
+
+def delta_inversao(rota, i, j, distancias):
+    """Variação da distância da mutação por inversão de rota[i..j] (equivale a um 2-opt)."""
+    return delta_2opt(rota, min(i, j), max(i, j), distancias)
+
+def delta_swap(rota, i, j, distancias):
+    """Variação da distância ao trocar os nós das posições i e j."""
+    if i == j:
+        return 0.0
+    i, j = min(i, j), max(i, j)
+    if j == i + 1:  # Vizinhos: só os arcos externos mudam
+        antes = _arco(rota, i - 1, i, distancias) + _arco(rota, j, j + 1, distancias)
+        depois = 0.0
+        if i > 0:
+            depois += distancias[rota[i - 1], rota[j]]
+        if j < len(rota) - 1:
+            depois += distancias[rota[i], rota[j + 1]]
+        return depois - antes
+
+    antes = (_arco(rota, i - 1, i, distancias) + _arco(rota, i, i + 1, distancias) +
+             _arco(rota, j - 1, j, distancias) + _arco(rota, j, j + 1, distancias))
+    depois = distancias[rota[j], rota[i + 1]] + distancias[rota[j - 1], rota[i]]
+    if i > 0:
+        depois += distancias[rota[i - 1], rota[j]]
+    if j < len(rota) - 1:
+        depois += distancias[rota[i], rota[j + 1]]
+    return depois - antes
+
+def delta_insercao(rota, i, j, distancias):
+    """
+    Variação da distância ao remover o nó da posição i e inseri-lo na posição j
+    da rota já sem ele (mesma convenção de np.insert usada em mutacao_insercao).
+    """
+    no = rota[i]
+    # Remoção: (i-1, i) + (i, i+1) viram (i-1, i+1)
+    remocao = _arco(rota, i - 1, i, distancias) + _arco(rota, i, i + 1, distancias)
+    if 0 < i < len(rota) - 1:
+        remocao -= distancias[rota[i - 1], rota[i + 1]]
+
+    # Inserção entre s[j-1] e s[j] da rota sem o nó (s[k] = rota[k] se k < i, senão rota[k+1])
+    anterior = j - 1 if j - 1 < i else j
+    proximo = j if j < i else j + 1
+    insercao = 0.0
+    if anterior >= 0:
+        insercao += distancias[rota[anterior], no]
+    if proximo < len(rota):
+        insercao += distancias[no, rota[proximo]]
+    if anterior >= 0 and proximo < len(rota):
+        insercao -= distancias[rota[anterior], rota[proximo]]
+    return insercao - remocao
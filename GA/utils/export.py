@@ -10,4 +10,9 @@ from .auxiliares import *
 from .file import *
 from .repair import *
 from .rest import *
-from .matrix import *
\ No newline at end of file
+from .matrix import *
+from .delta import *
+from .perfil import *
+from .split import *
+from .arena import *
+from .visao import *
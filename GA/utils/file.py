@@ -1,8 +1,205 @@
 import matplotlib.pyplot as plt
+import numpy as np
 import csv
 import os
+from functools import cached_property
 
-#Le o arquivo EVRP, e armazena suas informações em um dicionario data
+# Códigos de tipo de nó usados em EVRPInstance.tipo_no
+TIPO_INVALIDO = -1
+TIPO_DEPOSITO = 0
+TIPO_CLIENTE = 1
+TIPO_ESTACAO = 2
+
+class EVRPInstance(dict):
+    """
+    Instância EVRP compilada.
+
+    Continua sendo o dicionário de read_evrp_file (data['NODE_COORD_SECTION'], data['CAPACITY'], ...),
+    então qualquer operador antigo a aceita, mas também guarda arrays NumPy contíguos
+    indexados diretamente pelo ID do nó (a posição 0 não é usada):
+    - coords: matriz (n_nos + 1, 2) com as coordenadas
+    - demanda: vetor de demandas (0 para depósito e estações)
+    - tipo_no: código do tipo do nó (TIPO_DEPOSITO, TIPO_CLIENTE, TIPO_ESTACAO)
+    - eh_estacao / eh_recarga: máscaras booleanas (recarga = estação ou depósito)
+    - capacidade, energia_capacidade, consumo_energia: escalares do veículo
+    - distancias / energia: matrizes de distância e consumo entre todos os pares de nós,
+      calculadas na primeira vez que são usadas e reaproveitadas por todos os operadores
+    - vizinhos_proximos(k): listas dos k clientes mais próximos de cada nó (guardadas por k)
+    - estacoes_por_distancia / estacao_mais_proxima: estações ordenadas pela distância a cada nó
+    - recarga_mais_proxima: estação ou depósito mais próximo de cada nó
+    - estacao_desvio / custo_desvio / ida_estacao_viavel / volta_estacao_viavel: para cada par (i, j),
+      a estação de menor desvio entre i e j, o desvio e se cada perna cabe numa bateria cheia
+    - melhor_estacao_entre / distancia_via_estacao: a melhor estação entre i e j entre as que
+      têm as duas pernas viáveis
+    - _visoes: VisaoRota já calculadas (visao_rota), uma por rota
+
+    As seções do dicionário não devem ser alteradas depois da compilação.
+    """
+    def __init__(self, data):
+        super().__init__(data)
+        coords_dict = self['NODE_COORD_SECTION']
+        self.n_nos = max(coords_dict)
+        self.deposito = self['DEPOT_SECTION'] if self['DEPOT_SECTION'] is not None else 1
+        self.dimensao = self['DIMENSION']
+        self.capacidade = self['CAPACITY']
+        self.energia_capacidade = self['ENERGY_CAPACITY']
+        self.consumo_energia = self['ENERGY_CONSUMPTION']
+
+        self.coords = np.zeros((self.n_nos + 1, 2), dtype=np.float64)
+        for node_id, (x, y) in coords_dict.items():
+            self.coords[node_id] = (x, y)
+
+        self.demanda = np.zeros(self.n_nos + 1, dtype=np.int64)
+        for node_id, demanda in self['DEMAND_SECTION'].items():
+            self.demanda[node_id] = demanda
+
+        self.tipo_no = np.full(self.n_nos + 1, TIPO_INVALIDO, dtype=np.int8)
+        self.tipo_no[list(coords_dict)] = TIPO_CLIENTE
+        self.tipo_no[self['STATIONS_COORD_SECTION']] = TIPO_ESTACAO
+        self.tipo_no[self.deposito] = TIPO_DEPOSITO
+        self.demanda[self.tipo_no != TIPO_CLIENTE] = 0
+
+        self.eh_estacao = self.tipo_no == TIPO_ESTACAO
+        self.eh_recarga = self.eh_estacao | (self.tipo_no == TIPO_DEPOSITO)
+        self.clientes = np.flatnonzero(self.tipo_no == TIPO_CLIENTE)
+        self.estacoes = np.flatnonzero(self.eh_estacao)
+        self._vizinhos = {}
+        self._visoes = {}  # Cache de visao_rota (GA/utils/visao.py), chaveado pelos bytes da rota
+
+    @cached_property
+    def distancias(self):
+        """Matriz (n_nos + 1) x (n_nos + 1) de distâncias euclidianas (broadcast, sem laços)."""
+        delta = self.coords[np.newaxis, :, :] - self.coords[:, np.newaxis, :]
+        distancias = np.sqrt((delta ** 2).sum(axis=-1))
+        distancias.setflags(write=False)
+        return distancias
+
+    @cached_property
+    def energia(self):
+        """Matriz de consumo de energia de cada arco (distância x ENERGY_CONSUMPTION)."""
+        energia = self.consumo_energia * self.distancias
+        energia.setflags(write=False)
+        return energia
+
+    @cached_property
+    def estacoes_por_distancia(self):
+        """
+        Matriz (n_nos + 1) x n_estacoes: para cada nó, as estações da mais próxima à mais distante
+        (empates na ordem de STATIONS_COORD_SECTION).
+        """
+        estacoes = np.asarray(self['STATIONS_COORD_SECTION'], dtype=np.int64)
+        ordem = np.argsort(self.distancias[:, estacoes], axis=1, kind='stable')
+        tabela = estacoes[ordem]
+        tabela.setflags(write=False)
+        return tabela
+
+    @cached_property
+    def estacao_mais_proxima(self):
+        """Estação mais próxima de cada nó (vetor indexado pelo ID do nó)."""
+        return self.estacoes_por_distancia[:, 0]
+
+    @cached_property
+    def recarga_mais_proxima(self):
+        """Ponto de recarga (estação ou depósito) mais próximo de cada nó; empates favorecem as estações."""
+        candidatos = np.asarray(list(self['STATIONS_COORD_SECTION']) + [self.deposito], dtype=np.int64)
+        mais_proxima = candidatos[np.argmin(self.distancias[:, candidatos], axis=1)]
+        mais_proxima.setflags(write=False)
+        return mais_proxima
+
+    @cached_property
+    def estacao_desvio(self):
+        """
+        Matriz (n_nos + 1) x (n_nos + 1): a estação s que minimiza o desvio d(i, s) + d(s, j) - d(i, j)
+        para parar entre i e j, sem olhar a bateria (-1 se a instância não tem estações).
+        """
+        return self._estacoes_entre['desvio'][0]
+
+    @cached_property
+    def custo_desvio(self):
+        """Desvio d(i, s) + d(s, j) - d(i, j) de s = estacao_desvio[i, j] (inf sem estações)."""
+        return self._estacoes_entre['desvio'][1]
+
+    @cached_property
+    def ida_estacao_viavel(self):
+        """Máscara (i, j): a perna i -> estacao_desvio[i, j] cabe numa bateria cheia."""
+        return self._estacoes_entre['desvio'][2]
+
+    @cached_property
+    def volta_estacao_viavel(self):
+        """Máscara (i, j): a perna estacao_desvio[i, j] -> j cabe numa bateria cheia."""
+        return self._estacoes_entre['desvio'][3]
+
+    @cached_property
+    def melhor_estacao_entre(self):
+        """
+        Matriz (n_nos + 1) x (n_nos + 1): a estação s que minimiza d(i, s) + d(s, j) entre as que
+        a bateria cheia alcança a partir de i e de onde alcança j (-1 se nenhuma serve).
+        """
+        return self._estacoes_entre['viavel'][0]
+
+    @cached_property
+    def distancia_via_estacao(self):
+        """Matriz com d(i, s) + d(s, j) para s = melhor_estacao_entre[i, j] (inf se não há estação)."""
+        return self._estacoes_entre['viavel'][1]
+
+    @cached_property
+    def _estacoes_entre(self):
+        """Tabelas de estação intermediária de todos os pares, num passo O(n²) por estação."""
+        limite = self.energia_capacidade + 1e-9
+        forma = (self.n_nos + 1, self.n_nos + 1)
+        desvio = np.full(forma, -1, dtype=np.int64)
+        via_desvio = np.full(forma, np.inf)
+        melhor = np.full(forma, -1, dtype=np.int64)
+        via_melhor = np.full(forma, np.inf)
+        for estacao in self['STATIONS_COORD_SECTION']:  # Sem tensor n x S x n
+            via = self.distancias[:, estacao, np.newaxis] + self.distancias[np.newaxis, estacao, :]
+            melhora = via < via_desvio
+            desvio[melhora] = estacao
+            via_desvio[melhora] = via[melhora]
+
+            alcancavel = self.energia[:, estacao] <= limite
+            via[~alcancavel, :] = np.inf
+            via[:, ~alcancavel] = np.inf
+            melhora = via < via_melhor
+            melhor[melhora] = estacao
+            via_melhor[melhora] = via[melhora]
+
+        s = np.maximum(desvio, 0)
+        linhas = np.arange(self.n_nos + 1)[:, np.newaxis]
+        colunas = np.arange(self.n_nos + 1)[np.newaxis, :]
+        tem_estacao = desvio >= 0
+        ida_viavel = tem_estacao & (self.energia[linhas, s] <= limite)
+        volta_viavel = tem_estacao & (self.energia[s, colunas] <= limite)
+        custo = via_desvio - self.distancias
+
+        tabelas = {'desvio': (desvio, custo, ida_viavel, volta_viavel), 'viavel': (melhor, via_melhor)}
+        for grupo in tabelas.values():
+            for tabela in grupo:
+                tabela.setflags(write=False)
+        return tabelas
+
+    def vizinhos_proximos(self, k=10):
+        """
+        Matriz (n_nos + 1) x k com os k clientes mais próximos de cada nó, do mais próximo
+        ao mais distante (o próprio nó nunca aparece). k é limitado ao número de clientes - 1.
+        """
+        k = max(min(k, len(self.clientes) - 1), 0)
+        if k not in self._vizinhos:
+            distancias = self.distancias[:, self.clientes].copy()
+            distancias[self.clientes, np.arange(len(self.clientes))] = np.inf
+            ordem = np.argsort(distancias, axis=1, kind='stable')[:, :k]
+            vizinhos = self.clientes[ordem]
+            vizinhos.setflags(write=False)
+            self._vizinhos[k] = vizinhos
+        return self._vizinhos[k]
+
+def compilar_instancia(data):
+    """Retorna a EVRPInstance de data (sem recompilar se já for uma)."""
+    if isinstance(data, EVRPInstance):
+        return data
+    return EVRPInstance(data)
+
+#Le o arquivo EVRP, e armazena suas informações em uma EVRPInstance (dicionario data compilado)
 def read_evrp_file(file_path):
     data = {
         'COMMENT': '',
@@ -82,7 +279,7 @@ def read_evrp_file(file_path):
                     if line.strip() != '-1':
                         data['DEPOT_SECTION'] = int(line.strip())
     
-    return data
+    return EVRPInstance(data)
 
 #Gera o grafico padrão do dataset
 def plot_evrp_instance(data):
@@ -138,22 +335,9 @@ def plot_single_route_with_trips(data, single_route, id = None, arq = "", params
     depot_id = data['DEPOT_SECTION']
     station_ids = data['STATIONS_COORD_SECTION']
     
-    # Divide a rota única em trajetos separados
-    trips = []
-    current_trip = []
-    
-    for node in single_route:
-        if node == 1 and current_trip:
-            current_trip.append(1)  # Fecha o trajeto
-            trips.append(current_trip)
-            current_trip = [1]  # Começa novo trajeto
-        else:
-            current_trip.append(node)
-    
-    # Adiciona o último trajeto se necessário
-    if len(current_trip) > 1:
-        current_trip.append(1)
-        trips.append(current_trip)
+    # Divide a rota única em trajetos separados (viagens da VisaoRota)
+    from .visao import visao_rota  # visao importa este módulo
+    trips = [trip.tolist() for trip in visao_rota(single_route, data).viagens()]
     
     # Separa clientes visitados/não visitados
     all_customers = [node_id for node_id in coords.keys() 
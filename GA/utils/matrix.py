@@ -2,6 +2,7 @@ import numpy as np
 import random
 from copy import deepcopy
 import math
+from .file import compilar_instancia
 
 def calcular_matriz_prioridade(evrp_data):
     """
@@ -10,7 +11,7 @@ def calcular_matriz_prioridade(evrp_data):
     
     Inclui TODOS os nós como índices de origem, mas apenas clientes como destinos prioritários.
     """
-    node_coords = evrp_data['NODE_COORD_SECTION']
+    instancia = compilar_instancia(evrp_data)
     dimension = evrp_data['DIMENSION']
     stations = evrp_data['STATIONS_COORD_SECTION']
     depot = 1
@@ -18,17 +19,8 @@ def calcular_matriz_prioridade(evrp_data):
     # Identifica os nós de clientes (exclui depósito e estações)
     clientes = [i for i in range(2, dimension + 1) if i not in stations]
     
-    # Inicializa a matriz de distâncias
-    distancias = np.zeros((dimension + 1, dimension + 1))  # +1 porque os nós começam em 1
-    
-    # Calcula todas as distâncias
-    for i in range(1, dimension + 1):
-        for j in range(i + 1, dimension + 1):
-            x1, y1 = node_coords[i]
-            x2, y2 = node_coords[j]
-            distancia = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-            distancias[i][j] = distancia
-            distancias[j][i] = distancia
+    # Matriz de distâncias da instância (calculada uma única vez, indexada pelo ID do nó)
+    distancias = instancia.distancias
     
     # Converte distâncias para prioridades
     matriz_prioridade = {}
@@ -44,7 +36,7 @@ def calcular_matriz_prioridade(evrp_data):
             continue
         
         # Pares (nó, distância) para destinos válidos
-        dists = [(j, distancias[i][j]) for j in destinos_validos]
+        dists = [(j, distancias[i, j]) for j in destinos_validos]
         dists.sort(key=lambda x: x[1])  # Ordena por distância
         
         # Probabilidades (inverso da distância)
@@ -0,0 +1,144 @@
+"""
+Perfis acumulados de sub-rotas
+
+PerfilRota guarda, para cada posição de uma sequência de nós, a carga, o número de clientes,
+a distância percorrida e a energia gasta desde o último ponto de recarga (prefixos), além da
+energia que falta até o próximo ponto de recarga (sufixo). Com isso inserir um cliente entre
+duas posições, remover um trecho ou concatenar o início de uma sub-rota com o fim de outra é verificado
+(capacidade e bateria) em O(1), sem simular a sub-rota de novo.
+"""
+from .file import compilar_instancia
+
+class PerfilRota:
+    """
+    Perfil de uma sequência de nós (viagem depósito -> depósito ou sub-rota aberta).
+    Atributos por posição p:
+        carga_prefixo[p]: demanda acumulada de nos[0..p]
+        clientes_prefixo[p]: número de clientes em nos[0..p]
+        distancia_prefixo[p]: distância de nos[0] até nos[p]
+        energia_chegada[p]: energia gasta desde o último ponto de recarga ao chegar em nos[p]
+        energia_desde[p]: energia gasta desde o último ponto de recarga ao sair de nos[p] (0 em recarga)
+        energia_ate[p]: energia de nos[p] até o próximo ponto de recarga (0 em recarga)
+    """
+    def __init__(self, nos, data):
+        self.instancia = compilar_instancia(data)
+        self.atualizar(nos)
+
+    def atualizar(self, nos):
+        """Recalcula o perfil inteiro (O(n)) para a nova sequência de nós."""
+        self.nos = []
+        self.carga_prefixo = []
+        self.clientes_prefixo = []
+        self.distancia_prefixo = []
+        self.energia_chegada = []
+        self.energia_desde = []
+        self.energia_pico = 0.0
+        self._energia_ate = None
+        for no in nos:
+            self.anexar(no)
+
+    def anexar(self, no):
+        """Acrescenta um nó no fim da sequência em O(1)."""
+        instancia = self.instancia
+        no = int(no)
+        recarga = bool(instancia.eh_recarga[no])
+        if self.nos:
+            anterior = self.nos[-1]
+            chegada = self.energia_desde[-1] + instancia.energia[anterior, no]
+            self.carga_prefixo.append(self.carga_prefixo[-1] + int(instancia.demanda[no]))
+            self.clientes_prefixo.append(self.clientes_prefixo[-1] + (not recarga))
+            self.distancia_prefixo.append(self.distancia_prefixo[-1] + instancia.distancias[anterior, no])
+        else:
+            chegada = 0.0
+            self.carga_prefixo.append(int(instancia.demanda[no]))
+            self.clientes_prefixo.append(int(not recarga))
+            self.distancia_prefixo.append(0.0)
+        self.nos.append(no)
+        self.energia_chegada.append(chegada)
+        self.energia_desde.append(0.0 if recarga else chegada)
+        self.energia_pico = max(self.energia_pico, chegada)
+        self._energia_ate = None
+
+    def __len__(self):
+        return len(self.nos)
+
+    @property
+    def energia_ate(self):
+        """Sufixo de energia até o próximo ponto de recarga (recalculado só depois de mudanças)."""
+        if self._energia_ate is None:
+            energia, eh_recarga, nos = self.instancia.energia, self.instancia.eh_recarga, self.nos
+            ate = [0.0] * len(nos)
+            for p in range(len(nos) - 2, -1, -1):
+                if not eh_recarga[nos[p]]:
+                    ate[p] = ate[p+1] + energia[nos[p], nos[p+1]]
+            self._energia_ate = ate
+        return self._energia_ate
+
+    @property
+    def carga(self):
+        return self.carga_prefixo[-1] if self.nos else 0
+
+    @property
+    def n_clientes(self):
+        return self.clientes_prefixo[-1] if self.nos else 0
+
+    @property
+    def distancia(self):
+        return self.distancia_prefixo[-1] if self.nos else 0.0
+
+    @property
+    def viavel_bateria(self):
+        """Nenhuma perna entre pontos de recarga passa da capacidade da bateria."""
+        return self.energia_pico <= self.instancia.energia_capacidade + 1e-9
+
+    @property
+    def viavel_carga(self):
+        return self.carga <= self.instancia.capacidade
+
+    def carga_trecho(self, i, j):
+        """Demanda de nos[i..j]."""
+        return self.carga_prefixo[j] - (self.carga_prefixo[i-1] if i > 0 else 0)
+
+    def distancia_trecho(self, i, j):
+        """Distância percorrida de nos[i] até nos[j]."""
+        return self.distancia_prefixo[j] - self.distancia_prefixo[i]
+
+    def pode_inserir_trecho(self, q, outro, i, j):
+        """
+        Inserir outro.nos[i..j] (trecho sem pontos de recarga) entre nos[q] e nos[q+1]
+        respeita carga e bateria?
+        """
+        instancia = self.instancia
+        carga_trecho = outro.carga_prefixo[j] - (outro.carga_prefixo[i-1] if i > 0 else 0)
+        if self.carga_prefixo[-1] + carga_trecho > instancia.capacidade:
+            return False
+        energia_arco = instancia.energia
+        energia = (self.energia_desde[q] + energia_arco[self.nos[q], outro.nos[i]] +
+                   outro.energia_desde[j] - outro.energia_desde[i] +
+                   energia_arco[outro.nos[j], self.nos[q+1]] + self.energia_ate[q+1])
+        return energia <= instancia.energia_capacidade + 1e-9
+
+    def pode_anexar(self, no, fechar=True):
+        """Acrescentar no ao fim (e, com fechar, voltar dele ao depósito) respeita carga e bateria?"""
+        instancia = self.instancia
+        if self.carga + instancia.demanda[no] > instancia.capacidade:
+            return False
+        anterior = self.nos[-1] if self.nos else instancia.deposito
+        desde = self.energia_desde[-1] if self.nos else 0.0
+        energia = desde + instancia.energia[anterior, no]
+        if fechar and not instancia.eh_recarga[no]:
+            energia += instancia.energia[no, instancia.deposito]
+        return energia <= instancia.energia_capacidade + 1e-9
+
+    def pode_concatenar(self, p, outro, q, capacidade=None):
+        """
+        A sequência self.nos[..p] + outro.nos[q..] respeita carga e bateria na ligação?
+        outro pode ser o próprio perfil (remoção de nos[p+1..q-1]).
+        capacidade: limite de carga (padrão: a capacidade do veículo)
+        """
+        instancia = self.instancia
+        carga = self.carga_prefixo[p] + outro.carga - (outro.carga_prefixo[q-1] if q > 0 else 0)
+        if carga > (instancia.capacidade if capacidade is None else capacidade):
+            return False
+        energia = self.energia_desde[p] + instancia.energia[self.nos[p], outro.nos[q]] + outro.energia_ate[q]
+        return energia <= instancia.energia_capacidade + 1e-9
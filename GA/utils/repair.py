@@ -1,156 +1,84 @@
+import heapq
 import numpy as np
 from .rest import aplicar_restricao
+from .visao import visao_rota
+
+def _primeiras_ocorrencias(nos):
+    """Elementos distintos de nos na ordem da primeira ocorrência (O(n log n) em numpy)."""
+    _, primeiras = np.unique(nos, return_index=True)
+    return nos[np.sort(primeiras)]
 
 def reparar_filho(filho, pai, evrp_data, num_rotas_min=3, estacao=False):
     """
     Corrige uma rota filho com base no pai para atender às restrições do EVRP.
-    
+
     Args:
         filho: Rota filho a ser reparada (array numpy).
-        pai: Rota pai usada como referência (array numpy).
+        pai: Rota pai usada como referência (array numpy, começando e terminando no depósito).
         evrp_data: Dicionário com dados do problema.
         num_rotas_min: Número mínimo de rotas exigido.
-        estacao: Se True, inclui estações de recarga como nós válidos.
-    
+        estacao: Mantido por compatibilidade; as estações do filho são descartadas e
+            recolocadas por aplicar_restricao.
+
     Returns:
         Rota filho reparada (array numpy).
     """
-    # Converte para lista para facilitar manipulação
-    if not isinstance(filho, list):
-        filho_list = filho.tolist() if hasattr(filho, 'tolist') else list(filho)
-    else:
-        filho_list = filho.copy()  # Cria uma cópia para evitar modificar a original
-
-    if not isinstance(pai, list):
-        pai_list = pai.tolist() if hasattr(pai, 'tolist') else list(pai)
-    else:
-        pai_list = pai.copy()
-    
-    # 1. Garante que começa e termina com 1
-    if filho_list[0] != 1:
-        filho_list.insert(0, 1)
-    if filho_list[-1] != 1:
-        filho_list.append(1)
-    
-    # 2. Remove 1s consecutivos (rotas vazias)
-    i = 1
-    while i < len(filho_list) - 1:
-        if filho_list[i] == 1 and filho_list[i+1] == 1:
-            filho_list.pop(i)
-        else:
-            i += 1
-    
-    # 3. Identifica elementos válidos e clientes faltantes
     dimension = evrp_data['DIMENSION']
-    clientes_validos = set(range(2, dimension + 1))
-    estacoes_validas = set(evrp_data['STATIONS_COORD_SECTION']) if estacao else set()
-    elementos_validos = clientes_validos.union(estacoes_validas)
-    
-    # 4. Remove clientes inválidos (0, IDs maiores que DIMENSION)
-    visitas_presentes = []
-    for node in filho_list[1:-1]:  # Ignora o primeiro e último 1
-        if node in elementos_validos:
-            visitas_presentes.append(node)
-    
-    # 5. Remove duplicatas mantendo a ordem de primeira ocorrência
-    clientes_unicos = []
-    seen = set()
-    for node in visitas_presentes:
-        if node in clientes_validos and node not in seen:
-            seen.add(node)
-            clientes_unicos.append(node)
-    
-    # 6. Completa com clientes faltantes do pai (se necessário)
-        clientes_faltantes = list(clientes_validos - set(clientes_unicos))
-        # Adiciona clientes faltantes do pai que não estão no filho
-        for node in pai_list[1:-1]:
-            if node in clientes_faltantes and node not in clientes_unicos:
-                clientes_unicos.append(node)
-                clientes_faltantes.remove(node)
-    
-    # 7. Reconstroi a rota com os clientes válidos
-    # Divide em rotas baseado nos 1s do pai (estrutura herdada)
-    rotas_pai = []
-    current_route = []
-    for node in pai_list[1:-1]:  # Ignora o primeiro e último 1
-        if node == 1:
-            if current_route:
-                rotas_pai.append(current_route)
-                current_route = []
-        else:
-            current_route.append(node)
-    if current_route:
-        rotas_pai.append(current_route)
-    
-    # Distribui os clientes válidos nas rotas do pai
-    filho_reparado = [1]
-    clientes_alocados = 0
-    
-    for rota_pai in rotas_pai:
-        if not clientes_unicos:
+    filho = np.asarray(filho, dtype=np.int64).ravel()
+    pai = np.asarray(pai, dtype=np.int64).ravel()
+
+    # 1. Clientes do filho na ordem da primeira ocorrência: descarta depósitos, estações,
+    #    IDs inválidos (0, maiores que DIMENSION) e duplicatas
+    clientes = _primeiras_ocorrencias(filho[(filho >= 2) & (filho <= dimension)])
+
+    # 2. Completa com os clientes faltantes, na ordem em que aparecem no pai (máscara de presença)
+    presente = np.zeros(dimension + 1, dtype=bool)
+    presente[clientes] = True
+    do_pai = pai[(pai >= 2) & (pai <= dimension)]
+    faltantes = _primeiras_ocorrencias(do_pai[~presente[do_pai]])
+    clientes = np.concatenate([clientes, faltantes]).tolist()
+
+    # 3. Distribui os clientes nas viagens do pai (estrutura herdada): tamanho de cada viagem
+    #    do pai (VisaoRota, reaproveitada entre os filhos do mesmo pai), sem as vazias
+    tamanhos = visao_rota(pai, evrp_data).tamanhos
+    viagens = []
+    alocados = 0
+    for tamanho in tamanhos[tamanhos > 0].tolist():
+        if alocados >= len(clientes):
             break
-            
-        # Pega os clientes necessários para esta rota
-        num_clientes_rota = min(len(rota_pai), len(clientes_unicos) - clientes_alocados)
-        rota_filho = clientes_unicos[clientes_alocados:clientes_alocados + num_clientes_rota]
-        filho_reparado.extend(rota_filho)
-        filho_reparado.append(1)
-        clientes_alocados += num_clientes_rota
-    
-    # Adiciona clientes restantes (se houver) em novas rotas
-    while clientes_alocados < len(clientes_unicos):
-        num_restante = len(clientes_unicos) - clientes_alocados
-        rota_filho = clientes_unicos[clientes_alocados:clientes_alocados + min(num_restante, 10)]  # Máx 10 clientes por rota
-        filho_reparado.extend(rota_filho)
-        filho_reparado.append(1)
-        clientes_alocados += len(rota_filho)
-    
-    # 8. Garante número mínimo de rotas
-    num_rotas = filho_reparado.count(1) - 1
+        viagens.append(clientes[alocados:alocados + tamanho])
+        alocados += len(viagens[-1])
+    # Clientes restantes (se houver) em novas viagens de no máximo 10 clientes
+    for inicio in range(alocados, len(clientes), 10):
+        viagens.append(clientes[inicio:inicio + 10])
+
+    # 4. Garante número mínimo de rotas dividindo sempre a maior viagem ao meio.
+    #    Heap por tamanho; a chave de posição (tupla) mantém a ordem e desempata pela primeira
+    if len(viagens) < num_rotas_min:
+        heap = [(-len(viagem), (i,), viagem) for i, viagem in enumerate(viagens)]
+        heapq.heapify(heap)
+        while len(heap) < num_rotas_min and heap and -heap[0][0] >= 2:
+            _, posicao, maior = heapq.heappop(heap)
+            meio = len(maior) // 2
+            heapq.heappush(heap, (-meio, posicao + (0,), maior[:meio]))
+            heapq.heappush(heap, (meio - len(maior), posicao + (1,), maior[meio:]))
+        viagens = [viagem for _, _, viagem in sorted(heap, key=lambda item: item[1])]
 
-    if num_rotas < num_rotas_min:
-        # Divide a maior rota em duas para aumentar o número de rotas
-        rotas = []
-        current = []
-        for node in filho_reparado:
-            if node == 1:
-                if current:
-                    rotas.append(current)
-                    current = []
-            else:
-                current.append(node)
-        
-        while len(rotas) < num_rotas_min and len(rotas) > 0:
-            # Encontra a rota mais longa
-            maior_rota_idx = max(range(len(rotas)), key=lambda i: len(rotas[i]))
-            maior_rota = rotas[maior_rota_idx]
-            
-            if len(maior_rota) >= 2:
-                # Divide no meio
-                meio = len(maior_rota) // 2
-                nova_rota1 = maior_rota[:meio]
-                nova_rota2 = maior_rota[meio:]
-                
-                # Substitui a rota original pelas duas novas
-                rotas.pop(maior_rota_idx)
-                rotas.insert(maior_rota_idx, nova_rota1)
-                rotas.insert(maior_rota_idx + 1, nova_rota2)
-        
-        # Reconstrói o filho
-        filho_reparado = [1]
-        for rota in rotas:
-            filho_reparado.extend(rota)
-            filho_reparado.append(1)
-    # else:
-    #     if num_rotas > 1:
-    #         newFilhos = [ x for x in filho_reparado[1:-1] if x != 1]
-    #         if newFilhos[0] != 1:
-    #             newFilhos.insert(0, 1)
-    #         if newFilhos[-1] != 1:
-    #             newFilhos.append(1)
-    #         filho_reparado = newFilhos
-    #print(f"Antes: {[x for x in range(2, 24) if x not in filho_reparado]}")
+    # 5. Reconstrói o filho e aplica capacidade, bateria e estações
+    filho_reparado = [1]
+    for viagem in viagens:
+        filho_reparado.extend(viagem)
+        filho_reparado.append(1)
     filho_reparado = aplicar_restricao(filho_reparado, evrp_data, num_rotas_min)
-    #print(f"Depois: {[x for x in range(2, 24) if x not in filho_reparado]}")
-    #print()
-    return np.array(filho_reparado)
\ No newline at end of file
+    return np.array(filho_reparado)
+
+def reparar_lote(filhos, comprimentos, pais, evrp_data, num_rotas_min=3, estacao=False):
+    """
+    Etapa de reparo do pipeline em lote: repara cada linha da matriz de filhos
+    (empacotar_populacao, sem o preenchimento) com o pai correspondente.
+
+    Returns:
+        Lista de rotas reparadas (arrays numpy), na ordem das linhas.
+    """
+    return [reparar_filho(filho[:comprimento], pai, evrp_data, num_rotas_min, estacao)
+            for filho, comprimento, pai in zip(filhos, comprimentos, pais)]
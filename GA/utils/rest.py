@@ -1,7 +1,13 @@
 import numpy as np
-import math
+from .file import compilar_instancia
+from .perfil import PerfilRota
+from .visao import visao_rota
 
-def aplicar_restricao(rota, evrp_data, num_rotas_min=3):
+# Contadores dos casos degenerados de aplicar_restricao (a rota segue e a avaliação penaliza):
+# 'sem_estacao': nenhuma posição anterior alcança uma estação; 'sem_retorno': nenhuma alcança o depósito
+falhas_restricao = {'sem_estacao': 0, 'sem_retorno': 0}
+
+def aplicar_restricao(rota, evrp_data, num_rotas_min=3, estacoes_otimas=True):
     """
     Transforma uma rota em uma solução válida para o EVRP, aplicando todas as restrições:
     1. Todos os VEs começam e terminam no depósito.
@@ -15,30 +21,33 @@ def aplicar_restricao(rota, evrp_data, num_rotas_min=3):
         rota: Array numpy representando a rota (ex: [1, 24, 21, ..., 1]).
         evrp_data: Dicionário com os dados do problema.
         num_rotas_min: Número mínimo de rotas exigido.
+        estacoes_otimas: Depois da inserção gulosa, refaz as estações de cada viagem com
+            otimizar_estacoes (mantém a gulosa quando ela é melhor ou a ótima é inviável).
     
     Returns:
         Rota válida (array numpy) com todas as restrições aplicadas.
     """
     # --- 0. Prepara a rota ---
+    instancia = compilar_instancia(evrp_data)
+    energia = instancia.energia
+    eh_estacao = instancia.eh_estacao
     # Se a rota for uma lista contendo um array, pega o array
     if isinstance(rota, list) and len(rota) == 1 and isinstance(rota[0], np.ndarray):
         rota = rota[0]
     
     # --- 1. Pré-processamento: Divide a rota em sub-rotas por veículo ---
+    # A partir dos depósitos da VisaoRota: cada depósito fecha a sub-rota atual se ela já tem
+    # algum nó depois do depósito de abertura (um 1 logo após o outro fica dentro da sub-rota)
+    visao = visao_rota(rota, instancia)
+    nos = visao.rota.tolist()
     rotas = []
-    current_route = [1]  # Todas as rotas começam no depósito (1)
-    
-    for node in rota[1:]:  # Ignora o primeiro 1 (já adicionado)
-        if node == 1 and len(current_route) > 1:  # Encontrou um novo depósito (fim da rota atual)
-            current_route.append(1)
-            rotas.append(current_route)
-            current_route = [1]
-        else:
-            current_route.append(node)
-    
-    if len(current_route) > 1:  # Adiciona a última rota se não terminou com 1
-        current_route.append(1)
-        rotas.append(current_route)
+    abertura = 0  # Todas as rotas começam no depósito (1), mesmo que rota[0] não seja 1
+    for deposito in visao.depositos.tolist():
+        if deposito >= abertura + 2:  # Encontrou um novo depósito (fim da rota atual)
+            rotas.append([1] + nos[abertura+1:deposito] + [1])
+            abertura = deposito
+    if len(nos) - 1 > abertura:  # Adiciona a última rota se não terminou com 1
+        rotas.append([1] + nos[abertura+1:] + [1])
     
     
     # --- 2. Garante o número mínimo de rotas ---
@@ -78,114 +87,213 @@ def aplicar_restricao(rota, evrp_data, num_rotas_min=3):
         rota_final.extend(rota)
 
     # 5. Remove 1s consecutivos (rotas vazias)
-    i = 1
-    while i < len(rota_final) - 1:
-        if rota_final[i] == 1 and rota_final[i+1] == 1:
-            rota_final.pop(i)
-        else:
-            i += 1
+    rota_final = [node for i, node in enumerate(rota_final)
+                  if not (0 < i < len(rota_final) - 1 and node == 1 and rota_final[i+1] == 1)]
 
     # --- 6. Aplica restrições de capacidade e bateria ---
-    carga = [evrp_data['CAPACITY']]
+    # Uma passada para frente: saida é a rota já validada (com carga/bateria depois de cada nó)
+    # e pendentes é uma pilha com o resto da rota. Ao inserir uma estação ou depósito mais atrás,
+    # só os nós retrocedidos voltam para a pilha, sem list.insert nem cópias do histórico.
+    capacidade = evrp_data['CAPACITY']
+    energia_cheia = evrp_data['ENERGY_CAPACITY']
+    demanda = instancia.demanda
+    estacao_mais_proxima = instancia.estacao_mais_proxima if evrp_data['STATIONS_COORD_SECTION'] else None
+
+    saida = rota_final[:1]
+    pendentes = rota_final[:0:-1]
+    carga = [capacidade]
     carga_atual = carga[-1]
-    bateria = [evrp_data['ENERGY_CAPACITY']]
-    atual = 1
-
-    #print(f"Antes da bomba: {tuple(int(node) for node in rota_final)}")
-    while atual < len(rota_final):
-        #Define o atual como destino, e verifica se ele pode entrar
-        # print(f"Sit: {tuple(int(node) for node in rota_final[:atual])}")
-        origem = rota_final[atual-1]
-        destino = rota_final[atual]
-        x1, y1 = evrp_data['NODE_COORD_SECTION'][origem]
-        x2, y2 = evrp_data['NODE_COORD_SECTION'][destino]
-        distancia = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-        consumo = evrp_data['ENERGY_CONSUMPTION'] * distancia
-        if destino not in evrp_data['STATIONS_COORD_SECTION']:
-            carga_atual = carga[-1] - evrp_data['DEMAND_SECTION'][destino]
+    bateria = [energia_cheia]
+
+    def aceitar(destino, bateria_atual, carga_atual):
+        """Move o destino da pilha para a saída, registrando carga e bateria depois dele."""
+        saida.append(pendentes.pop())
+        if destino == 1:
+            bateria.append(energia_cheia)
+            carga.append(capacidade)
+        elif eh_estacao[destino]:
+            bateria.append(energia_cheia)
+            carga.append(carga[-1])
+        else:
+            bateria.append(bateria_atual)
+            carga.append(carga_atual)
+
+    def retroceder(k):
+        """Devolve saida[k:] para a pilha de pendentes e descarta o histórico dessas posições."""
+        while len(saida) > k:
+            pendentes.append(saida.pop())
+            carga.pop()
+            bateria.pop()
+
+    while pendentes:
+        #Define o próximo pendente como destino, e verifica se ele pode entrar
+        origem = saida[-1]
+        destino = pendentes[-1]
+        consumo = energia[origem, destino]
+        if not eh_estacao[destino]:
+            carga_atual = carga[-1] - demanda[destino]
         bateria_atual = bateria[-1] - consumo
 
         #Se o destino não quebra restrições, passamos para o proximo, armazenando os valores de bateria e carga
-        # print(f"Atual: {atual}, Destino: {rota_final[atual]}")
-        # print(f"CAntes: {carga[-1]}, CDepois {carga_atual}")
-        # print(f"BAntes: {bateria[-1]}, BDepois {bateria_atual}")
-        # print(f"Tamanhos: A{atual}, C{len(carga)}, B{len(bateria)}")
-        # print()
         if bateria_atual > 0 and carga_atual > 0:
-            if rota_final[atual] == 1:
-                bateria.append(evrp_data['ENERGY_CAPACITY'])
-                carga.append(evrp_data['CAPACITY'])
-            elif rota_final[atual] in evrp_data['STATIONS_COORD_SECTION']:
-                bateria.append(evrp_data['ENERGY_CAPACITY'])
-                carga.append(carga[-1])
-            else:
-                bateria.append(bateria_atual)
-                carga.append(carga_atual)
-            atual += 1
+            aceitar(destino, bateria_atual, carga_atual)
 
         elif bateria_atual < 0: #Se não tiver bateria, vai retrocedendo ate conseguir colocar a estação mais proxima
-            estacao_encontrada = None
-            while atual >= 0 and estacao_encontrada is None:
-                # Ponto atual para procurar estação mais próxima
-                ponto_atual = rota_final[atual-1]
-                xp, yp = evrp_data['NODE_COORD_SECTION'][ponto_atual]
-                
-                # Encontra estação mais próxima deste ponto, e define o consumo ate ela
-                estacoes = evrp_data['STATIONS_COORD_SECTION']
-                if estacoes:
-                    estacao_proxima = min(
-                        estacoes,
-                        key=lambda e: math.sqrt(
-                            (xp - evrp_data['NODE_COORD_SECTION'][e][0])**2 +
-                            (yp - evrp_data['NODE_COORD_SECTION'][e][1])**2
-                        )
-                    )
-                    xe, ye = evrp_data['NODE_COORD_SECTION'][estacao_proxima]
-                    distancia_e = math.sqrt((xe - xp)**2 + (ye - yp)**2)
-                    consumo_e = evrp_data['ENERGY_CONSUMPTION'] * distancia_e
-
-                    #Se não tem energia, retrocede um cliente e tenta denovo, caso contrario, achamos a estação
-                    #print(f"BatNeg: {atual-1}, size: {len(bateria)}, ponto {ponto_atual}, est: {estacao_proxima}, last: {bateria[-1]}, gasto: {consumo_e}")
-                    if bateria[atual-1] - consumo_e < 0:
-                        atual -= 1
-                    else:
-                        estacao_encontrada = estacao_proxima
-            if estacao_encontrada is None:
-                print("Fudeu de maneiras que eu não sei explicar") #Como caralhos que uma rota que esta na porra do deposito não consegue ir para nenhum lugar sem gastar energia e loucura
-            else: 
-                bateria = bateria[:atual]
-                carga = carga[:atual]
-
-                rota_final.insert(atual, estacao_encontrada)
-                bateria.append(evrp_data['ENERGY_CAPACITY'])
+            k = len(saida)
+            if estacao_mais_proxima is not None:
+                while k > 0 and bateria[k-1] - energia[saida[k-1], estacao_mais_proxima[saida[k-1]]] < 0:
+                    k -= 1
+            if k == 0 or estacao_mais_proxima is None:
+                falhas_restricao['sem_estacao'] += 1
+                aceitar(destino, bateria_atual, carga_atual)  # Segue sem estação (a avaliação penaliza a perna)
+            else:
+                estacao_encontrada = int(estacao_mais_proxima[saida[k-1]])
+                retroceder(k)
+                saida.append(estacao_encontrada)
+                bateria.append(energia_cheia)
                 carga.append(carga[-1])
 
-                atual += 1
-        else: #Carga atual negativada
-            end_route = False
-            x2, y2 = evrp_data['NODE_COORD_SECTION'][1]
-            #print(f"{end_route} and {rota_final[atual-1]}")
-            while not end_route and rota_final[atual-1]!=1:
-                x1, y1 = evrp_data['NODE_COORD_SECTION'][rota_final[atual-1]]
-                distancia = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-                consumo = evrp_data['ENERGY_CONSUMPTION'] * distancia
-                bateria_atual = bateria[atual-1] - consumo
-                if bateria_atual > 0:
-                    end_route = True
-                    bateria = bateria[:atual]
-                    carga = carga[:atual]
-
-                    rota_final.insert(atual, 1)
-                    bateria.append(evrp_data['ENERGY_CAPACITY'])
-                    carga.append(evrp_data['CAPACITY'])
-                    atual +=1
-                else:
-                    atual -= 1
-            if rota_final[atual] == 1:
-                print("Vou me matar as 23:45")
-    #print(f"Depois da bomba: {tuple(int(node) for node in rota_final)}")
+        else: #Carga atual negativada: retrocede até um ponto de onde dá para voltar ao depósito
+            k = len(saida)
+            while saida[k-1] != 1 and not bateria[k-1] - energia[saida[k-1], 1] > 0:
+                k -= 1
+            if saida[k-1] == 1:
+                falhas_restricao['sem_retorno'] += 1
+                aceitar(destino, bateria_atual, carga_atual)  # Nenhum ponto alcança o depósito: segue (a avaliação penaliza)
+            else:
+                retroceder(k)
+                saida.append(1)
+                bateria.append(energia_cheia)
+                carga.append(capacidade)
+    rota_final = saida
 
-    
+    if estacoes_otimas:
+        return otimizar_estacoes(rota_final, evrp_data)
     return np.array(rota_final)
 
-# 1, 2, 25, 3, 1, 11, 18, 20, 30, 1
\ No newline at end of file
+def inserir_estacoes_otimas(clientes, data):
+    """
+    Escolhe, para a sequência fixa de clientes de uma viagem depósito -> depósito, as paradas em
+    estações de menor distância total que respeitam a bateria.
+    Programação dinâmica sobre os arcos da viagem: em cada arco (i, i+1) pode entrar a estação
+    melhor_estacao_entre[i, i+1]; F[k] é a menor distância até chegar à estação do arco k, vinda
+    do depósito ou da estação de um arco anterior cuja perna cabe na bateria. Com as energias
+    acumuladas da sequência, cada perna é testada em O(1) e o laço para assim que a energia
+    entre as duas estações passa da bateria.
+    Args:
+        clientes: Sequência de clientes (sem depósitos nem estações)
+    Returns:
+        (viagem [1, ..., 1] com as estações, distância) ou (None, inf) se nenhuma escolha é viável
+    """
+    instancia = compilar_instancia(data)
+    seq = [instancia.deposito] + [int(c) for c in clientes] + [instancia.deposito]
+    return _estacoes_por_pd(seq, 0, len(seq) - 1, _acumulados_estacoes(seq, instancia),
+                            instancia.energia_capacidade + 1e-9)
+
+def _acumulados_estacoes(seq, instancia):
+    """
+    Acumulados da sequência usados pela programação dinâmica (calculados de uma vez, em NumPy):
+    D/E: distância e energia desde seq[0]; estacao[k]: melhor estação do arco k (-1 se não há);
+    chegada_*[k]: de seq[0] até a estação do arco k; base_*[r]: somado à chegada de uma parada
+    posterior, desconta o trecho até a estação do arco r e soma a saída dela.
+    """
+    seq = np.asarray(seq, dtype=np.int64)
+    origem, destino = seq[:-1], seq[1:]
+    D = np.concatenate([[0.0], np.cumsum(instancia.distancias[origem, destino])])
+    E = np.concatenate([[0.0], np.cumsum(instancia.energia[origem, destino])])
+    estacao = instancia.melhor_estacao_entre[origem, destino]
+    s = np.maximum(estacao, 0)
+    chegada_d = D[:-1] + instancia.distancias[origem, s]
+    chegada_e = E[:-1] + instancia.energia[origem, s]
+    base_d = instancia.distancias[s, destino] - D[1:]
+    base_e = instancia.energia[s, destino] - E[1:]
+    return (D.tolist(), E.tolist(), estacao.tolist(), chegada_d.tolist(), chegada_e.tolist(),
+            base_d.tolist(), base_e.tolist())
+
+def _estacoes_por_pd(seq, a, b, acumulados, limite):
+    """
+    Programação dinâmica de inserir_estacoes_otimas para a viagem seq[a..b].
+    Returns:
+        (viagem com as estações, distância) ou (None, inf)
+    """
+    D, E, estacao, chegada_d, chegada_e, base_d, base_e = acumulados
+    F = {}
+    anterior = {}
+    fim, anterior_fim = np.inf, None
+
+    for k in range(a, b + 1):  # k < b: estação no arco k; k == b: chegada ao depósito final
+        if k < b:
+            if estacao[k] < 0:
+                continue
+            cheg_d, cheg_e = chegada_d[k], chegada_e[k]
+        else:
+            cheg_d, cheg_e = D[b], E[b]
+        # Vinda direto do depósito inicial
+        if cheg_e - E[a] <= limite:
+            total, r_melhor = cheg_d - D[a], -1
+        else:
+            total, r_melhor = np.inf, None
+        for r in range(k - 1, a - 1, -1):
+            if E[k] - E[r+1] > limite:
+                break  # Estações mais antigas só aumentam a energia da perna
+            if r not in F or cheg_e + base_e[r] > limite:
+                continue
+            candidato = F[r] + cheg_d + base_d[r]
+            if candidato < total:
+                total, r_melhor = candidato, r
+        if k == b:
+            fim, anterior_fim = total, r_melhor
+        elif r_melhor is not None:
+            F[k], anterior[k] = total, r_melhor
+
+    if anterior_fim is None:
+        return None, np.inf
+
+    # Reconstrói as paradas seguindo os predecessores
+    arcos = set()
+    r = anterior_fim
+    while r >= 0:
+        arcos.add(r)
+        r = anterior[r]
+    viagem = [seq[a]]
+    for k in range(a, b):
+        if k in arcos:
+            viagem.append(estacao[k])
+        viagem.append(seq[k+1])
+    return viagem, fim
+
+def otimizar_estacoes(rota, data):
+    """
+    Refaz as estações de cada viagem da rota com inserir_estacoes_otimas, mantendo a ordem dos
+    clientes. Uma viagem só é trocada quando a versão ótima é viável e a atual é mais longa
+    ou estoura a bateria.
+    Returns:
+        Rota (array numpy)
+    """
+    instancia = compilar_instancia(data)
+    rota = np.asarray(rota, dtype=np.int64)
+    if len(rota) < 2 or rota[0] != 1 or rota[-1] != 1:
+        return rota
+
+    # Todas as viagens sem estações numa sequência só, para calcular os acumulados de uma vez
+    sem_estacoes = rota[~instancia.eh_estacao[rota]]
+    depositos = np.flatnonzero(sem_estacoes == 1)
+    acumulados = _acumulados_estacoes(sem_estacoes, instancia)
+    limite = instancia.energia_capacidade + 1e-9
+    seq = sem_estacoes.tolist()
+
+    acumulada = np.concatenate([[0.0], np.cumsum(instancia.distancias[rota[:-1], rota[1:]])]).tolist()
+    fronteiras = np.flatnonzero(rota == 1).tolist()
+    rota = rota.tolist()
+    nova = [rota[0]]
+    for (inicio, fim), (a, b) in zip(zip(fronteiras[:-1], fronteiras[1:]), zip(depositos[:-1], depositos[1:])):
+        viagem = rota[inicio:fim+1]
+        otima = None
+        if b - a > 1:
+            otima, distancia = _estacoes_por_pd(seq, a, b, acumulados, limite)
+        if otima is not None:
+            atual = acumulada[fim] - acumulada[inicio]
+            if not (distancia < atual - 1e-9 or not PerfilRota(viagem, instancia).viavel_bateria):
+                otima = None
+        nova.extend((otima if otima is not None else viagem)[1:])
+    return np.array(nova)
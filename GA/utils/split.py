@@ -0,0 +1,83 @@
+"""
+Decodificador do giant tour
+
+No modo giant tour o cromossomo é só a permutação dos clientes. split_prins divide a
+permutação nas viagens de menor distância total que respeitam a capacidade e
+decodificar_giant_tour transforma essas viagens numa rota com depósitos e estações.
+"""
+import numpy as np
+from .file import compilar_instancia
+from .rest import aplicar_restricao, inserir_estacoes_otimas
+
+def split_prins(permutacao, data):
+    """
+    Divide a permutação de clientes nas viagens de menor distância total (Prins, 2004).
+    Caminho mínimo no grafo auxiliar em que o arco (i, j) é a viagem
+    depósito -> clientes i+1..j -> depósito. Cada i só estende j enquanto a carga cabe no
+    veículo, então o custo é O(n·k), com k o máximo de clientes por viagem.
+    Args:
+        permutacao: Sequência de clientes (sem depósitos nem estações)
+    Returns:
+        Lista de viagens (listas de clientes, na ordem da permutação)
+    """
+    instancia = compilar_instancia(data)
+    clientes = np.asarray(permutacao, dtype=np.int64)
+    n = len(clientes)
+    if n == 0:
+        return []
+
+    distancias = instancia.distancias
+    deposito = instancia.deposito
+    capacidade = instancia.capacidade
+    demanda = instancia.demanda[clientes].tolist()
+    ida = distancias[deposito, clientes].tolist()
+    volta = distancias[clientes, deposito].tolist()
+    entre = distancias[clientes[:-1], clientes[1:]].tolist()
+
+    custo_ate = [0.0] + [np.inf] * n  # Menor custo para atender os i primeiros clientes
+    predecessor = [0] * (n + 1)
+    for i in range(n):
+        base = custo_ate[i]
+        carga = 0
+        custo = 0.0
+        for j in range(i, n):
+            carga += demanda[j]
+            if carga > capacidade and j > i:
+                break  # Um cliente sozinho acima da capacidade ainda forma uma viagem
+            custo = ida[i] if j == i else custo + entre[j-1]
+            total = base + custo + volta[j]
+            if total < custo_ate[j+1]:
+                custo_ate[j+1] = total
+                predecessor[j+1] = i
+
+    viagens = []
+    j = n
+    clientes = clientes.tolist()
+    while j > 0:
+        i = predecessor[j]
+        viagens.append(clientes[i:j])
+        j = i
+    viagens.reverse()
+    return viagens
+
+def decodificar_giant_tour(permutacao, data, num_rotas_min=1):
+    """
+    Converte um giant tour na rota completa: split_prins, divisão das maiores viagens até
+    num_rotas_min (como em aplicar_restricao) e inserção ótima de estações em cada viagem.
+    Viagens em que a inserção ótima não acha solução viável passam pela inserção gulosa.
+    Returns:
+        Rota (array numpy) começando e terminando no depósito
+    """
+    viagens = split_prins(permutacao, data)
+    while len(viagens) < num_rotas_min and any(len(v) > 1 for v in viagens):
+        maior = max(range(len(viagens)), key=lambda i: len(viagens[i]))
+        meio = len(viagens[maior]) // 2
+        viagens[maior:maior+1] = [viagens[maior][:meio], viagens[maior][meio:]]
+
+    rota = [compilar_instancia(data).deposito]
+    for clientes in viagens:
+        viagem, _ = inserir_estacoes_otimas(clientes, data)
+        if viagem is None:
+            viagem = aplicar_restricao(np.array([1] + clientes + [1]), data, 1).tolist()
+        rota.extend(viagem[1:])
+    return np.array(rota)
@@ -0,0 +1,139 @@
+"""
+Visão das sub-rotas de uma rota
+
+VisaoRota divide a rota nas viagens uma vez, a partir de np.flatnonzero(rota == 1), e guarda
+por viagem os offsets, a carga, o número de clientes, a distância e o perfil de energia.
+visao_rota(rota, data) reaproveita a visão já calculada para a mesma rota: o cache da
+instância é chaveado pelos bytes da rota, então a visão só deixa de valer quando a rota muda.
+"""
+import numpy as np
+from functools import cached_property
+from .file import compilar_instancia
+from .perfil import PerfilRota
+
+TAMANHO_CACHE_VISOES = 20000
+
+class VisaoRota:
+    """
+    Sub-rotas de uma rota. A viagem k é rota[depositos[k]:depositos[k+1]+1].
+    Atributos:
+        rota: Cópia somente leitura da rota (int64)
+        depositos: Posições dos depósitos na rota (offsets das viagens)
+        tamanhos: Número de nós entre os depósitos de cada viagem (clientes e estações)
+    Calculados na primeira consulta (um passo em NumPy para a rota inteira):
+        carga, n_clientes, distancia: Demanda, clientes e distância de cada viagem
+        energia_chegada: Energia gasta desde o último ponto de recarga ao chegar em cada posição
+        energia_pico: Maior energia_chegada de cada viagem (viagem viável se <= bateria)
+    """
+    def __init__(self, rota, data):
+        self.instancia = compilar_instancia(data)
+        self.rota = np.array(rota, dtype=np.int64).ravel()
+        self.rota.setflags(write=False)
+        self.depositos = np.flatnonzero(self.rota == self.instancia.deposito)
+        self.tamanhos = np.diff(self.depositos) - 1
+        self._perfis = {}
+
+    def __len__(self):
+        return len(self.tamanhos)
+
+    def viagem(self, k):
+        """Viagem k com os depósitos das pontas (view somente leitura)."""
+        return self.rota[self.depositos[k]:self.depositos[k+1] + 1]
+
+    def viagens(self):
+        """Lista das viagens (views), inclusive as vazias [1, 1]."""
+        return [self.viagem(k) for k in range(len(self))]
+
+    def interior(self, k):
+        """Nós da viagem k sem os depósitos das pontas."""
+        return self.rota[self.depositos[k] + 1:self.depositos[k+1]]
+
+    @cached_property
+    def _carga_acumulada(self):
+        return np.concatenate([[0], np.cumsum(self.instancia.demanda[self.rota])])
+
+    @cached_property
+    def carga(self):
+        """Demanda total de cada viagem."""
+        return self._carga_acumulada[self.depositos[1:]] - self._carga_acumulada[self.depositos[:-1] + 1]
+
+    @cached_property
+    def n_clientes(self):
+        acumulado = np.concatenate([[0], np.cumsum(~self.instancia.eh_recarga[self.rota])])
+        return acumulado[self.depositos[1:]] - acumulado[self.depositos[:-1] + 1]
+
+    @cached_property
+    def distancia(self):
+        """Distância de cada viagem."""
+        acumulada = np.concatenate([[0.0], np.cumsum(self.instancia.distancias[self.rota[:-1], self.rota[1:]])])
+        return acumulada[self.depositos[1:]] - acumulada[self.depositos[:-1]]
+
+    @cached_property
+    def energia_arcos(self):
+        """Consumo de cada arco rota[i] -> rota[i+1]."""
+        return self.instancia.energia[self.rota[:-1], self.rota[1:]]
+
+    @cached_property
+    def energia_chegada(self):
+        """Energia gasta desde o último ponto de recarga (ou do início da rota) ao chegar em cada posição."""
+        if len(self.rota) == 0:
+            return np.zeros(0)
+        acumulada = np.concatenate([[0.0], np.cumsum(self.energia_arcos)])
+        posicoes = np.arange(len(self.rota) - 1)
+        ultima_recarga = np.maximum.accumulate(np.where(self.instancia.eh_recarga[self.rota[:-1]], posicoes, 0))
+        return np.concatenate([[0.0], acumulada[1:] - acumulada[ultima_recarga]])
+
+    @cached_property
+    def energia_pico(self):
+        """Maior energia gasta entre dois pontos de recarga em cada viagem."""
+        if len(self) == 0:
+            return np.zeros(0)
+        chegada = self.energia_chegada[:self.depositos[-1] + 1]
+        return np.maximum.reduceat(chegada, self.depositos[:-1] + 1)
+
+    @property
+    def viavel_carga(self):
+        """Máscara das viagens dentro da capacidade."""
+        return self.carga <= self.instancia.capacidade
+
+    @property
+    def viavel_bateria(self):
+        """Máscara das viagens em que nenhuma perna entre recargas passa da bateria."""
+        return self.energia_pico <= self.instancia.energia_capacidade + 1e-9
+
+    @cached_property
+    def trechos(self):
+        """
+        Trechos de clientes entre pontos de recarga (estações ou depósito), sem contar as
+        pontas da rota: lista de (início, fim) com fim exclusivo, só os não vazios.
+        """
+        recargas = np.flatnonzero(self.instancia.eh_recarga[self.rota[1:-1]]) + 1
+        limites = np.concatenate([[0], recargas, [len(self.rota) - 1]]).tolist()
+        return [(a + 1, b) for a, b in zip(limites[:-1], limites[1:]) if b > a + 1]
+
+    def carga_trecho(self, inicio, fim):
+        """Demanda de rota[inicio:fim]."""
+        return self._carga_acumulada[fim] - self._carga_acumulada[inicio]
+
+    def perfil(self, k):
+        """PerfilRota da viagem k (criado na primeira consulta e guardado)."""
+        if k not in self._perfis:
+            self._perfis[k] = PerfilRota(self.viagem(k), self.instancia)
+        return self._perfis[k]
+
+def visao_rota(rota, data):
+    """
+    VisaoRota da rota, reaproveitada entre os operadores: o cache fica na instância e é
+    chaveado pelos bytes da rota (uma rota alterada gera outra visão). Com um dicionário
+    simples em data (sem EVRPInstance) a visão é criada sem cache.
+    """
+    instancia = compilar_instancia(data)
+    if instancia is not data:
+        return VisaoRota(rota, instancia)
+    chave = np.asarray(rota, dtype=np.int64).tobytes()
+    visao = instancia._visoes.get(chave)
+    if visao is None:
+        if len(instancia._visoes) >= TAMANHO_CACHE_VISOES:
+            instancia._visoes.clear()
+        visao = instancia._visoes[chave] = VisaoRota(rota, instancia)
+    return visao
@@ -33,7 +33,11 @@ class EVRP_GA:
         self.selection_methods = {
             'roleta': selecao_roleta,
             'torneio': selecao_torneio, #
-            'rank': selecao_rank
+            'rank': selecao_rank,
+            'roleta_alias': selecao_roleta_alias,
+            'rank_alias': selecao_rank_alias,
+            'sus': selecao_sus,
+            'rank_sus': selecao_rank_sus
         }
         
         self.crossover_methods = {
@@ -70,16 +74,28 @@ class EVRP_GA:
 
     def selection(self):
         metodo = self.selection_methods[self.config['selection']]
-        self.pais = metodo(self.population, self.fitness, self.param_ga['n_pais'])
+        if self.config['selection'] == 'torneio':
+            self.pais = metodo(self.population, self.fitness, self.param_ga['n_pais'], self.config.get('tamanho_torneio', 2))
+        else:
+            self.pais = metodo(self.population, self.fitness, self.param_ga['n_pais'])
         #print(f"Seleciou {len(self.pais)} pais")
 
     def crossover(self):
-        self.filhos = crossover_completo(self.pais, self.evrp_data, n_filhos = self.param_ga['n_filhos'], num_rotas_min=self.param_problema['num_rotas_min'], tipo_crossover=self.config['crossover'], taxa_crossover=1, estacao=self.param_problema['restricoes'])
+        # config['lote']: cruza todos os pares de uma vez (crossover_completo_lote)
+        metodo = crossover_completo_lote if self.config.get('lote', False) else crossover_completo
+        self.filhos = metodo(self.pais, self.evrp_data, n_filhos = self.param_ga['n_filhos'], num_rotas_min=self.param_problema['num_rotas_min'], tipo_crossover=self.config['crossover'], taxa_crossover=1, estacao=self.param_problema['restricoes'])
         #print(f"Gerou {len(self.filhos)} filhos")
 
     def mutation(self):
         if self.config['mutation'] == '': return
-        self.filhos = aplicar_mutacao(self.filhos, self.evrp_data, self.param_problema['num_rotas_min'], metodo=self.config['mutation'], taxa_mutacao=0.1, estacao=self.param_problema['restricoes'])
+        # config['somente_melhoria']: swap/inversao/insercao só aceitam movimentos que não aumentam
+        # a distância (delta em O(1)); usa o caminho por rota, pois o lote não avalia movimentos
+        somente_melhoria = self.config.get('somente_melhoria', False)
+        if self.config.get('lote', False) and not somente_melhoria:
+            self.filhos = aplicar_mutacao_lote(self.filhos, self.evrp_data, self.param_problema['num_rotas_min'], metodo=self.config['mutation'], taxa_mutacao=0.1, estacao=self.param_problema['restricoes'])
+        else:
+            self.filhos = aplicar_mutacao(self.filhos, self.evrp_data, self.param_problema['num_rotas_min'], metodo=self.config['mutation'], taxa_mutacao=0.1, estacao=self.param_problema['restricoes'],
+                                          somente_melhoria=somente_melhoria)
         #print(f"Mutação em {len(self.filhos)} filhos")
 
     def replacement(self):
@@ -149,7 +165,7 @@ class EVRP_GA:
     
 
     def escolher_metodo(self,probabilidades):
-        return random.choices(range(4), weights=probabilidades, k=1)[0]
+        return random.choices(range(len(probabilidades)), weights=probabilidades, k=1)[0]
 
     def atualizar_pesos(self,sucessos, tentativas):
         base = 0.01  # para evitar pesos zero
@@ -167,20 +183,21 @@ class EVRP_GA:
 
         # Contadores e estado para controle de convergência
         contador_estagnacao = 0
+        ultimo_bloco = 0  # Bloco de 100 avaliações da última atualização dos pesos
         MAX_ESTAGNACAO = 100  # Número de iterações sem melhoria para considerar convergência
         MELHORIA_MINIMA = 1.0  # Melhoria mínima para resetar contador
         
         # Listas de métodos para rotação
-        crossover_methods = ['one_point', 'two_point', 'uniforme', 'OX']
+        crossover_methods = ['one_point', 'two_point', 'uniforme', 'OX', 'PMX', 'CX', 'ERX']
         mutation_methods = ['swap', 'inversao', 'scramble', 'insercao']
 
-        vetCross = [0.25] * 4
-        vetMut =  [0.25] * 4
-        sucessoCross = [1] * 4  # Começa com 1 para evitar divisão por zero
-        tentativasCross = [1] * 4
+        vetCross = [1 / len(crossover_methods)] * len(crossover_methods)
+        vetMut =  [1 / len(mutation_methods)] * len(mutation_methods)
+        sucessoCross = [1] * len(crossover_methods)  # Começa com 1 para evitar divisão por zero
+        tentativasCross = [1] * len(crossover_methods)
 
-        sucessoMut = [1] * 4
-        tentativasMut = [1] * 4
+        sucessoMut = [1] * len(mutation_methods)
+        tentativasMut = [1] * len(mutation_methods)
 
         idx_cross = self.escolher_metodo(vetCross)
         idx_mut = self.escolher_metodo(vetMut)
@@ -216,7 +233,8 @@ class EVRP_GA:
                 
                 # 1. Mantém os melhores indivíduos (elitismo)
                 elite_size = int(0.2 * self.param_ga['n_pop'])  # 20% da população
-                elite = sorted(self.population, key=lambda x: self.fitness[tuple(x)])[:elite_size]
+                ordem = np.argsort(-fitness_alinhado(self.population, self.fitness), kind='stable')
+                elite = [self.population[i] for i in ordem[:elite_size]]
                 
                 # 2. Gera nova população aleatória para o restante
                 new_random = [criar_rotas_aleatorias(self.evrp_data, 
@@ -266,7 +284,9 @@ class EVRP_GA:
             self.replacement()
             self.population = self.new_pop
             self.evaluate()
-            if self.n_aval % 100 == 0:
+            # Atualiza os pesos a cada 100 avaliações (troca de bloco, vale para qualquer passo de n_aval)
+            if self.n_aval // 100 > ultimo_bloco:
+                ultimo_bloco = self.n_aval // 100
                 vetCross = self.atualizar_pesos(sucessoCross, tentativasCross)
                 vetMut = self.atualizar_pesos(sucessoMut, tentativasMut)
         print(f"Parada atingida: {self.n_aval} avaliações realizadas.")
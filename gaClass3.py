@@ -14,15 +14,30 @@ class EVRP_GA:
         self.best_dist = float('inf')
         self.population = []
         self.fitness = {}
+        self.objetivos = np.zeros(0)  # Objetivo de cada indivíduo (NaN = ainda não avaliado)
         self.pais = []
         self.filhos = []
         self.new_pop = []
+        self.new_objetivos = np.zeros(0)
         self.filename = filename
         # Contadores e histórico
         self.n_aval = 0  # Contador de avaliações
         self.historico_melhor_rota = []
         self.historico_melhor_distancia = []
         self.dist_matrix = {}
+        # Cache LRU de objetivos: rotas repetidas (elitismo, steady-state) não são reavaliadas
+        # Representação: 'rotas' (rota completa com depósitos e estações) ou 'giant_tour'
+        # (permutação dos clientes, decodificada por split + inserção de estações)
+        self.representacao = config.get('representacao', 'rotas')
+        self.decodificadas = {}  # Giant tour (bytes) -> rota decodificada
+        tamanho_cache = param_ga.get('tamanho_cache', 50000)
+        # A chave canônica separa sub-rotas pelos depósitos, que o giant tour não tem
+        canonico = param_ga.get('cache_canonico', False) and self.representacao == 'rotas'
+        self.cache = CacheAvaliacao(tamanho_cache, canonico=canonico) if tamanho_cache else None
+        # param_ga['arena']: população e filhos em buffers int16 pré-alocados (ArenaPopulacao);
+        # os indivíduos passam a ser views das linhas da arena
+        self.arena = None
+        self.filhos_na_arena = False  # Filhos do giant tour escritos direto nas linhas da arena
 
         # Configuração dos operadores
         self.evaluation_methods = {
@@ -31,10 +46,22 @@ class EVRP_GA:
             'rankeamento': avaliacao_rankeamento 
         }
 
+        # Objetivo (menor é melhor) e conversão para fitness de cada avaliação:
+        # o objetivo acompanha o indivíduo, então só indivíduos novos são avaliados
+        self.objective_methods = {
+            'distancia': (avaliar_distancias_lote, fitness_inverso),
+            'restricoes': (objetivo_com_penalidades, fitness_inverso),
+            'rankeamento': (avaliar_distancias_lote, fitness_por_rankeamento)
+        }
+
         self.selection_methods = {
             'roleta': selecao_roleta,
             'torneio': selecao_torneio, #
-            'rank': selecao_rank
+            'rank': selecao_rank,
+            'roleta_alias': selecao_roleta_alias,
+            'rank_alias': selecao_rank_alias,
+            'sus': selecao_sus,
+            'rank_sus': selecao_rank_sus
         }
         
         self.crossover_methods = {
@@ -48,6 +75,7 @@ class EVRP_GA:
             'swap': mutacao_swap,
             'inversao': mutacao_inversao,
             'scramble': mutacao_scramble,
+            'busca_local': mutacao_busca_local,
             '': False
         }
 
@@ -61,21 +89,86 @@ class EVRP_GA:
         self.dist_matrix = calcular_matriz_prioridade(self.evrp_data)
         print(self.dist_matrix)
         n_pop = self.param_ga['n_pop']
-        self.population = [criar_rotas_aleatorias(self.evrp_data, self.param_problema['num_rotas_min'], self.param_problema['restricoes']) for _ in range(n_pop)]
-        #self.population = [criar_rota_nn_inteligente_com_rotas_minimas(self.evrp_data, self.param_problema['num_rotas_min']) for _ in range(n_pop)]
-        self.population = [aplicar_restricao(rotas, self.evrp_data, self.param_problema['num_rotas_min']) for rotas in self.population]
+        if self.representacao == 'giant_tour':
+            self.population = self.novos_individuos(n_pop)
+        else:
+            self.population = [criar_rotas_aleatorias(self.evrp_data, self.param_problema['num_rotas_min'], self.param_problema['restricoes']) for _ in range(n_pop)]
+            #self.population = [criar_rota_nn_inteligente_com_rotas_minimas(self.evrp_data, self.param_problema['num_rotas_min']) for _ in range(n_pop)]
+            self.population = [aplicar_restricao(rotas, self.evrp_data, self.param_problema['num_rotas_min']) for rotas in self.population]
+        if self.param_ga.get('arena', False):
+            # População + um filho por pai; a arena cresce se a substituição pedir mais linhas
+            self.arena = ArenaPopulacao(n_pop + self.param_ga['n_pais'],
+                                        self.param_ga.get('arena_max_len', 4 * self.evrp_data['DIMENSION']))
+            self.population = self.arena.carregar(self.population)
+        self.objetivos = np.full(len(self.population), np.nan)
         #print(f"Iniciou com: {len(self.population)} rotas")
     
+    def novos_individuos(self, n):
+        """Cria n indivíduos aleatórios na representação configurada."""
+        if self.representacao == 'giant_tour':
+            return [criar_giant_tour(self.evrp_data) for _ in range(n)]
+        return [criar_rotas_aleatorias(self.evrp_data, self.param_problema['num_rotas_min'], self.param_problema['restricoes'])
+                for _ in range(n)]
+
+    def rotas(self, individuos):
+        """Rotas completas dos indivíduos (no giant tour, decodificadas e guardadas em memória)."""
+        if self.representacao != 'giant_tour':
+            return individuos
+        if len(self.decodificadas) > self.param_ga.get('tamanho_cache', 50000):
+            self.decodificadas.clear()
+        rotas = []
+        for individuo in individuos:
+            chave = np.asarray(individuo, dtype=np.int64).tobytes()  # Views int16 da arena e arrays int64 com a mesma chave
+            if chave not in self.decodificadas:
+                self.decodificadas[chave] = decodificar_giant_tour(individuo, self.evrp_data, self.param_problema['num_rotas_min'])
+            rotas.append(self.decodificadas[chave])
+        return rotas
+
+    def melhor_rota(self, individuos):
+        """melhor_rota sobre as rotas completas dos indivíduos."""
+        rota, distancia = melhor_rota(self.rotas(individuos), self.evrp_data)
+        if self.arena is not None:
+            rota = np.array(rota)  # A linha da arena é reescrita nas próximas gerações
+        return rota, distancia
+
+    def calcular_objetivos(self, individuos, objetivo=None, contar=True):
+        """
+        Avalia os indivíduos informados e conta as avaliações feitas (acertos no cache não contam).
+        objetivo: função de objetivo em lote (padrão: a da avaliação configurada);
+        contar=False não soma em n_aval (outra medida de indivíduos já contados)
+        """
+        if objetivo is None:
+            objetivo, _ = self.objective_methods[self.config['evaluation']]
+        if self.representacao == 'giant_tour':
+            objetivo_rotas = objetivo
+            def objetivo(giant_tours, data):
+                return objetivo_rotas(self.rotas(giant_tours), data)
+            objetivo.__name__ = objetivo_rotas.__name__ + '_giant_tour'  # Chave do cache
+        if self.cache is None:
+            if contar:
+                self.n_aval += len(individuos)  # Incrementa o contador
+            return objetivo(individuos, self.evrp_data)
+        misses_antes = self.cache.misses
+        objetivos = self.cache.avaliar(individuos, objetivo, self.evrp_data)
+        if contar:
+            self.n_aval += self.cache.misses - misses_antes
+        return objetivos
+
     def evaluate(self):
-        """Avalia a população e atualiza o contador de avaliações."""
-        metodo = self.evaluation_methods[self.config['evaluation']]
-        self.fitness = metodo(self.population, self.evrp_data)
-        self.n_aval += len(self.population)  # Incrementa o contador
+        """Avalia só os indivíduos sem objetivo conhecido e recalcula o fitness da população."""
+        novos = np.flatnonzero(np.isnan(self.objetivos))
+        if len(novos):
+            self.objetivos[novos] = self.calcular_objetivos([self.population[i] for i in novos])
+        _, para_fitness = self.objective_methods[self.config['evaluation']]
+        self.fitness = para_fitness(self.objetivos)
         #print(f"Avaliou {len(self.fitness)} rotas (Total de avaliações: {self.n_aval})")
 
     def selection(self):
         metodo = self.selection_methods[self.config['selection']]
-        self.pais = metodo(self.population, self.fitness, self.param_ga['n_pais'])
+        if self.config['selection'] == 'torneio':
+            self.pais = metodo(self.population, self.fitness, self.param_ga['n_pais'], self.config.get('tamanho_torneio', 2))
+        else:
+            self.pais = metodo(self.population, self.fitness, self.param_ga['n_pais'])
         #print(f"Seleciou {len(self.pais)} pais")
 
     #def crossover(self):
@@ -84,6 +177,18 @@ class EVRP_GA:
         #print(f"Gerou {len(self.filhos)} filhos")
 
     def crossover(self):
+        if self.representacao == 'giant_tour':
+            # O run_2 só sorteia crossovers de permutação; no run os demais nomes configurados usam OX
+            tipo = self.config['crossover'] if self.config['crossover'] in ('OX', 'PMX', 'CX', 'ERX') else 'OX'
+            destino = None
+            if self.arena is not None:
+                # Filhos escritos direto nas linhas depois da população
+                self.arena.truncar(len(self.population))
+                destino = self.arena.alocar(2 * (len(self.pais) // 2), len(self.pais[0]))
+            self.filhos = crossover_giant_tour(self.pais, tipo=tipo, destino=destino)
+            self.filhos_na_arena = destino is not None
+            return
+        self.filhos_na_arena = False
         if random.random() < 0.6:  # 60% chance de usar o balanceador
             self.filhos = []
             for i in range(0, len(self.pais), 2):
@@ -101,6 +206,11 @@ class EVRP_GA:
 
     def mutation(self):
         if self.config['mutation'] == '': return
+        if self.representacao == 'giant_tour':
+            metodo = self.config['mutation'] if self.config['mutation'] in ('swap', 'inversao', 'scramble', 'insercao') else 'inversao'
+            self.filhos = [mutacao_giant_tour(filho, metodo, self.param_ga.get('taxa_mutacao', 0.7), no_lugar=self.filhos_na_arena)
+                           for filho in self.filhos]
+            return
         #self.filhos = aplicar_mutacao(self.filhos, self.evrp_data, self.param_problema['num_rotas_min'], metodo=self.config['mutation'], taxa_mutacao=0.1, estacao=self.param_problema['restricoes'])
         #self.filhos = aplicar_mutacao_rest(self.filhos, self.evrp_data, self.dist_matrix, self.param_problema['num_rotas_min'], metodo=self.config['mutation'], taxa_mutacao=0.1, estacao=self.param_problema['restricoes'])
         self.filhos = [
@@ -113,12 +223,39 @@ class EVRP_GA:
         self.filhos = [mutacao_otimiza_rota(filho, self.evrp_data, self.dist_matrix, taxa_mutacao = 0.7, num_rotas_min=self.param_problema['num_rotas_min']) 
         for filho in self.filhos
         ]
+        # Memético: melhora os filhos com a busca local entre viagens (relocate, swap, 2-opt*, Or-opt).
+        # config['busca_local'] liga a busca também no run_2, que troca config['mutation'] ao longo da execução
+        if self.config['mutation'] == 'busca_local' or self.config.get('busca_local', False):
+            self.filhos = [mutacao_busca_local(filho, self.evrp_data, self.param_ga.get('taxa_busca_local', 0.7), num_rotas_min=self.param_problema['num_rotas_min'])
+            for filho in self.filhos
+            ]
         #print(f"Mutação em {len(self.filhos)} filhos")
 
     def replacement(self):
-        fitness_filhos = avaliacao_com_penalidades(self.filhos, self.evrp_data)
-        self.new_pop = gerar_nova_populacao(self.population, self.filhos, self.fitness, fitness_filhos, metodo=self.config['replacement'], 
-                         n_pop=self.param_ga['n_pop'], n_pais=self.param_ga['n_pais'], n_filhos=self.param_ga['n_filhos'], n_elite=5)
+        objetivos_filhos = self.calcular_objetivos(self.filhos)
+        # Na substituição os filhos competem pelo objetivo com penalidades, qualquer que seja a
+        # avaliação configurada, para que filhos inviáveis não entrem sem custo no modo 'distancia'.
+        # O objetivo guardado (que acompanha o indivíduo) continua sendo o da avaliação configurada
+        if self.objective_methods[self.config['evaluation']][0] is objetivo_com_penalidades:
+            penalizados = objetivos_filhos
+        else:
+            penalizados = self.calcular_objetivos(self.filhos, objetivo_com_penalidades, contar=False)
+        fitness_filhos = fitness_inverso(penalizados)
+        if self.arena is not None:
+            # Filhos nas linhas depois da população (já escritos pelo giant tour, copiados no modo
+            # rotas, cujos operadores geram rotas de tamanho variável); os sobreviventes vão para o outro buffer
+            idx_antigos, idx_filhos = indices_substituicao(self.fitness, fitness_filhos, metodo=self.config['replacement'],
+                                                           n_pop=self.param_ga['n_pop'], n_filhos=self.param_ga['n_filhos'], n_elite=5)
+            if not self.filhos_na_arena:
+                self.arena.truncar(len(self.population))
+                for filho in self.filhos:
+                    self.arena.adicionar(filho)
+            self.new_pop = self.arena.sobreviventes(np.concatenate([idx_antigos, len(self.population) + idx_filhos]))
+            self.new_objetivos = np.concatenate([self.objetivos[idx_antigos], np.asarray(objetivos_filhos)[idx_filhos]])
+            return
+        self.new_pop, self.new_objetivos = gerar_nova_populacao(self.population, self.filhos, self.fitness, fitness_filhos, metodo=self.config['replacement'], 
+                         n_pop=self.param_ga['n_pop'], n_pais=self.param_ga['n_pais'], n_filhos=self.param_ga['n_filhos'], n_elite=5,
+                         registro_antigo=self.objetivos, registro_filhos=objetivos_filhos)
         #print(f"Finalizou com: {len(self.new_pop)} rotas")
 
     def registrar_melhoria_csv(self, onde):
@@ -141,7 +278,7 @@ class EVRP_GA:
         criar_csv_vazio()  # Cria o CSV vazio no início
         contador = 0
         while self.n_aval < self.param_ga['max_aval'] and contador < self.param_ga['max_aval']/250:
-            best_rota, best_dist = melhor_rota(self.population, self.evrp_data)
+            best_rota, best_dist = self.melhor_rota(self.population)
             if self.best_dist > best_dist:
                 print("Pop", self.n_aval, best_dist)
                 self.best_dist = best_dist
@@ -154,7 +291,7 @@ class EVRP_GA:
             
             self.selection()
             self.crossover()
-            best_rota, best_dist = melhor_rota(self.filhos, self.evrp_data)
+            best_rota, best_dist = self.melhor_rota(self.filhos)
             if self.best_dist > best_dist:
                 print("Cross", self.n_aval, best_dist)
                 self.best_dist = best_dist
@@ -163,7 +300,7 @@ class EVRP_GA:
                 contador = 0
                 
             self.mutation()
-            best_rota, best_dist = melhor_rota(self.filhos, self.evrp_data)
+            best_rota, best_dist = self.melhor_rota(self.filhos)
             if self.best_dist > best_dist:
                 print("Mut", self.n_aval, best_dist)
                 self.best_dist = best_dist
@@ -173,6 +310,7 @@ class EVRP_GA:
                 
             self.replacement()
             self.population = self.new_pop
+            self.objetivos = self.new_objetivos
             self.evaluate()
             contador =contador+1
             
@@ -182,7 +320,7 @@ class EVRP_GA:
     
 
     def escolher_metodo(self,probabilidades):
-        return random.choices(range(4), weights=probabilidades, k=1)[0]
+        return random.choices(range(len(probabilidades)), weights=probabilidades, k=1)[0]
 
     def atualizar_pesos(self,sucessos, tentativas):
         base = 0.01  # para evitar pesos zero
@@ -200,20 +338,26 @@ class EVRP_GA:
 
         # Contadores e estado para controle de convergência
         contador_estagnacao = 0
+        ultimo_bloco = 0  # Bloco de 100 avaliações da última atualização dos pesos
         MAX_ESTAGNACAO = 100  # Número de iterações sem melhoria para considerar convergência
         MELHORIA_MINIMA = 1.0  # Melhoria mínima para resetar contador
         
         # Listas de métodos para rotação
-        crossover_methods = ['one_point', 'two_point', 'uniforme', 'OX']
+        # No giant tour só os crossovers de permutação; no modo rotas crossover() usa balanceador/NN
+        # e o nome sorteado não muda o operador (PMX/CX/ERX ficam na rotação do gaClass)
+        if self.representacao == 'giant_tour':
+            crossover_methods = ['OX', 'PMX', 'CX', 'ERX']
+        else:
+            crossover_methods = ['one_point', 'two_point', 'uniforme', 'OX']
         mutation_methods = ['swap', 'inversao', 'scramble', 'insercao']
 
-        vetCross = [0.25] * 4
-        vetMut =  [0.25] * 4
-        sucessoCross = [1] * 4  # Começa com 1 para evitar divisão por zero
-        tentativasCross = [1] * 4
+        vetCross = [1 / len(crossover_methods)] * len(crossover_methods)
+        vetMut =  [1 / len(mutation_methods)] * len(mutation_methods)
+        sucessoCross = [1] * len(crossover_methods)  # Começa com 1 para evitar divisão por zero
+        tentativasCross = [1] * len(crossover_methods)
 
-        sucessoMut = [1] * 4
-        tentativasMut = [1] * 4
+        sucessoMut = [1] * len(mutation_methods)
+        tentativasMut = [1] * len(mutation_methods)
 
         idx_cross = self.escolher_metodo(vetCross)
         idx_mut = self.escolher_metodo(vetMut)
@@ -227,7 +371,7 @@ class EVRP_GA:
         
         while self.n_aval < self.param_ga['max_aval']:
             # Etapa normal do GA
-            best_rota, best_dist = melhor_rota(self.population, self.evrp_data)
+            best_rota, best_dist = self.melhor_rota(self.population)
             
             # Verifica melhoria
             if last_best_dist - best_dist > MELHORIA_MINIMA:
@@ -249,16 +393,21 @@ class EVRP_GA:
                 
                 # 1. Mantém os melhores indivíduos (elitismo)
                 elite_size = int(0.2 * self.param_ga['n_pop'])  # 20% da população
-                elite = sorted(self.population, key=lambda x: self.fitness[tuple(x)])[:elite_size]
+                ordem = np.argsort(-fitness_alinhado(self.population, self.fitness), kind='stable')
+                elite = [self.population[i] for i in ordem[:elite_size]]
                 
                 # 2. Gera nova população aleatória para o restante
-                new_random = [criar_rotas_aleatorias(self.evrp_data, 
-                            self.param_problema['num_rotas_min'], 
-                            self.param_problema['restricoes']) 
-                            for _ in range(self.param_ga['n_pop'] - elite_size)]
+                new_random = self.novos_individuos(self.param_ga['n_pop'] - elite_size)
                 
                 # 3. Combina elite + novos indivíduos
-                self.population = elite + new_random
+                if self.arena is not None:
+                    self.arena.sobreviventes(ordem[:elite_size])
+                    for individuo in new_random:
+                        self.arena.adicionar(individuo)
+                    self.population = self.arena.rotas()
+                else:
+                    self.population = elite + new_random
+                self.objetivos = np.concatenate([self.objetivos[ordem[:elite_size]], np.full(len(new_random), np.nan)])
                 self.evaluate()
                 
                 # 4. Rota os métodos de crossover e mutação
@@ -278,7 +427,7 @@ class EVRP_GA:
             self.selection()
             self.crossover()
             
-            best_rota_filhos, best_dist_filhos = melhor_rota(self.filhos, self.evrp_data)
+            best_rota_filhos, best_dist_filhos = self.melhor_rota(self.filhos)
             if self.best_dist > best_dist_filhos:
                 print(f"Melhoria na iteração {self.n_aval}: {best_dist:.2f} , Crossover")
                 self.best_dist = best_dist_filhos
@@ -288,7 +437,7 @@ class EVRP_GA:
             tentativasCross[idx_cross] += 1
     
             self.mutation()
-            best_rota_filhos, best_dist_filhos = melhor_rota(self.filhos, self.evrp_data)
+            best_rota_filhos, best_dist_filhos = self.melhor_rota(self.filhos)
             if self.best_dist > best_dist_filhos:
                 print(f"Melhoria na iteração {self.n_aval}: {best_dist:.2f} , Mutation")
                 self.best_dist = best_dist_filhos
@@ -298,8 +447,12 @@ class EVRP_GA:
             tentativasMut[idx_mut] += 1
             self.replacement()
             self.population = self.new_pop
+            self.objetivos = self.new_objetivos
             self.evaluate()
-            if self.n_aval % 100 == 0:
+            # Atualiza os pesos a cada 100 avaliações: n_aval cresce de forma irregular
+            # (só avaliações novas), então o gatilho é a troca de bloco, não n_aval % 100 == 0
+            if self.n_aval // 100 > ultimo_bloco:
+                ultimo_bloco = self.n_aval // 100
                 vetCross = self.atualizar_pesos(sucessoCross, tentativasCross)
                 vetMut = self.atualizar_pesos(sucessoMut, tentativasMut)
         print(f"Parada atingida: {self.n_aval} avaliações realizadas.")